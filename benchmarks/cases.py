@@ -0,0 +1,118 @@
+"""Benchmark cases shared by the standalone runner and the pytest-benchmark suite.
+
+Each case is a function that performs any setup and returns the zero-argument callable to be timed.
+Everything talking to devices runs against the simulated bus, so no hardware is needed."""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from elliptec import Controller, Rotator, scan_for_devices
+from elliptec.simulator import SimulatedBus, SimulatedDevice
+from elliptec.tools import parse
+
+
+def _controller(*devices: SimulatedDevice, time_scale: float = 0.0, timeout: float = 0.1) -> Controller:
+    return Controller(transport=SimulatedBus(devices, time_scale=time_scale, timeout=timeout), debug=False)
+
+
+class _LoopbackPort:
+    """Stands in for a serial port and answers every write instantly with the same response."""
+
+    timeout = 0.1
+    in_waiting = 0
+    is_open = True
+    port = "loopback://"
+
+    def __init__(self, response: bytes) -> None:
+        self.response = response
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def read_until(self, expected: bytes = b"\n", size: int | None = None) -> bytes:
+        return self.response
+
+
+def parse_position() -> Callable[[], object]:
+    return lambda: parse(b"0PO00008C00\r\n", debug=False)
+
+
+def parse_status() -> Callable[[], object]:
+    return lambda: parse(b"0GS00\r\n", debug=False)
+
+
+def parse_info() -> Callable[[], object]:
+    return lambda: parse(b"0IN0E1140012320230101016800023000\r\n", debug=False)
+
+
+def encode_move() -> Callable[[], object]:
+    controller = _controller()
+    return lambda: controller._encode(b"ma", "0", 35840)
+
+
+def send_command_debug() -> Callable[[], object]:
+    """Python-side cost of a command and its response, with the default (debug) settings."""
+    controller = Controller(transport=_LoopbackPort(b"0PO00008C00\r\n"))
+    return lambda: controller.send_instruction(b"ma", "0", 35840)
+
+
+def send_command_production() -> Callable[[], object]:
+    """Python-side cost of a command and its response, with debug=False."""
+    controller = Controller(transport=_LoopbackPort(b"0PO00008C00\r\n"), debug=False)
+    return lambda: controller.send_instruction(b"ma", "0", 35840)
+
+
+def rotator_conversions() -> Callable[[], object]:
+    rotator = Rotator(_controller(SimulatedDevice(14)), debug=False)
+
+    def convert() -> None:
+        rotator._pos_to_unit(rotator._unit_to_pos(123.4567))
+
+    return convert
+
+
+def scan_bus() -> Callable[[], object]:
+    """Scans four addresses at real wire speed, one of them empty."""
+    controller = _controller(SimulatedDevice(14, address="0"),
+                             SimulatedDevice(6, address="1"),
+                             SimulatedDevice(20, address="2"),
+                             time_scale=1.0)
+    return lambda: scan_for_devices(controller, start_address=0, stop_address=3, debug=False)
+
+
+def move_readback_host() -> Callable[[], object]:
+    """A move followed by a position readback with instantaneous devices, i.e. the host-side cost only."""
+    rotator = Rotator(_controller(SimulatedDevice(14)), debug=False)
+    angles = iter(range(1 << 62))
+
+    def move() -> None:
+        rotator.set_angle(next(angles) % 360)
+        rotator.get_angle()
+
+    return move
+
+
+def move_readback_wire() -> Callable[[], object]:
+    """A small move followed by a position readback at real wire and motor speed."""
+    rotator = Rotator(_controller(SimulatedDevice(14), time_scale=1.0), debug=False)
+    angles = iter(range(1 << 62))
+
+    def move() -> None:
+        rotator.set_angle(next(angles) % 2)
+        rotator.get_angle()
+
+    return move
+
+
+cases: dict[str, Callable[[], Callable[[], object]]] = {
+    "parse_position": parse_position,
+    "parse_status": parse_status,
+    "parse_info": parse_info,
+    "encode_move": encode_move,
+    "send_command_debug": send_command_debug,
+    "send_command_production": send_command_production,
+    "rotator_conversions": rotator_conversions,
+    "scan_bus": scan_bus,
+    "move_readback_host": move_readback_host,
+    "move_readback_wire": move_readback_wire,
+}
@@ -0,0 +1,94 @@
+"""Standalone benchmark runner, writing machine-readable results that can be compared across releases.
+
+Usage:
+    python benchmarks/run_benchmarks.py --json results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+from cases import cases
+
+
+def measure(fn, min_time: float, repeat: int) -> dict[str, float]:
+    """Times fn, returning statistics of the duration of a single call (in seconds)."""
+    # Find a number of calls per sample that takes at least min_time / repeat
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops": 1 / statistics.median(samples),
+        "rounds": repeat,
+        "iterations": number,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare against results previously written with --json")
+    parser.add_argument("--min-time", type=float, default=1.0, help="minimum time spent per case (s)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of samples per case")
+    parser.add_argument("-k", dest="selection", help="only run cases containing this string")
+    args = parser.parse_args()
+
+    try:
+        package_version = version("elliptec")
+    except PackageNotFoundError:
+        package_version = None
+
+    results = {
+        "machine_info": {"python": platform.python_version(), "platform": platform.platform()},
+        "elliptec": package_version,
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "benchmarks": {},
+    }
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["benchmarks"]
+
+    for name, case in cases.items():
+        if args.selection and args.selection not in name:
+            continue
+        stats = measure(case(), args.min_time, args.repeat)
+        results["benchmarks"][name] = stats
+        line = f"{name:<24} {stats['median'] * 1e6:>12.2f} us {stats['ops']:>12.1f} ops/s"
+        if name in baseline:
+            line += f" {stats['median'] / baseline[name]['median']:>8.2f}x"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
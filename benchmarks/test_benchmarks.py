@@ -0,0 +1,13 @@
+"""pytest-benchmark entry point: pytest benchmarks/ --benchmark-json=results.json"""
+from __future__ import annotations
+
+import pytest
+
+from cases import cases
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("name", sorted(cases))
+def test_benchmark(benchmark, name):
+    benchmark(cases[name]())
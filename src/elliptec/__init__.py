@@ -1,11 +1,20 @@
 """The Elliptec Python Library"""
+from .cache import InfoCache
+from .calibration import CalibrationStore, MoveModel, calibrate
 from .cmd import commands
 from .devices import devices
 from .errors import ExternalDeviceNotFound
-from .scan import find_ports, scan_for_devices
+from .metrics import CommandEvent, Metrics
+from .planner import Plan, plan_visits
+from .recording import ReplayPort, TrafficRecorder, read_recording
+from .scheduler import Priority
+from .scan import DeviceRecord, discover_devices, find_ports, probe_bus, probe_ports, scan_for_devices
+from .state import StateCache
+from .timing import Exposure, ShutterTiming
 
 # Classes for controllers
 from .controller import Controller
+from .async_controller import AsyncController
 
 # General class for all motors
 from .motor import Motor
@@ -18,11 +27,35 @@ from .rotator import Rotator
 from .linear import Linear
 from .iris import Iris
 
+# Moves in the background, executing sequences of moves and moving several devices together
+from .moves import MoveHandle
+from .trajectory import Trajectory, TrajectoryPoint
+from .group import MotorGroup
+
+# Devices on several buses
+from .rig import Rig
+
 __all__ = [
     "commands",
     "devices",
     "ExternalDeviceNotFound",
+    "InfoCache",
+    "CalibrationStore",
+    "MoveModel",
+    "calibrate",
+    "Metrics",
+    "CommandEvent",
+    "Plan",
+    "plan_visits",
+    "StateCache",
+    "Exposure",
+    "ShutterTiming",
+    "TrafficRecorder",
+    "ReplayPort",
+    "read_recording",
+    "Priority",
     "Controller",
+    "AsyncController",
     "Motor",
     "ContinuousMotor",
     "Shutter",
@@ -30,6 +63,15 @@ __all__ = [
     "Rotator",
     "Linear",
     "Iris",
+    "MoveHandle",
+    "Trajectory",
+    "TrajectoryPoint",
+    "MotorGroup",
+    "Rig",
     "find_ports",
     "scan_for_devices",
+    "DeviceRecord",
+    "discover_devices",
+    "probe_bus",
+    "probe_ports",
 ]
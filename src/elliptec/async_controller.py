@@ -0,0 +1,78 @@
+"""This module contains the AsyncController class, an asyncio-native variant of the Controller."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+
+from .controller import Controller
+from .tools import Status
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncController(Controller):
+    """Controller that can be awaited from an event loop without blocking it.
+
+    Reads are performed on a non-blocking basis: only bytes already waiting in the
+    serial buffer are read, and the event loop is yielded to in between polls. Like the
+    blocking methods, responses are matched to requests by the address they come from. The
+    blocking methods inherited from Controller keep working (they are used, for
+    example, when a Motor loads its info on creation)."""
+
+    def __init__(self, *args, poll_interval: float = 0.001, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.poll_interval = poll_interval
+        # Serializes whole transactions, so that several tasks can share one bus
+        self._bus_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
+
+    async def read_response_async(self, address: str | None = None, timeout: float | None = None) -> Status | None:
+        """Reads the next response from an address (the oldest from any address if None) without blocking
+        the event loop. Responses from other addresses are filed for later, as by wait_response().
+        Waits timeout seconds, as long as the read timeout of the port if None."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ((self.timeout if timeout is None else timeout) or 0)
+        while (status := self._pop_filed(address)) is None:
+            # Files the responses already waiting, unless the reader thread or another thread reads the port
+            if self.poll_responses():
+                continue
+            if loop.time() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+        return status
+
+    async def _prepare_async(self, address: str) -> None:
+        """Like _prepare(), but awaits a move in progress at the address instead of blocking the event loop."""
+        move = self.moves.get(address)
+        while move is not None and not move.done():
+            await asyncio.sleep(self.poll_interval)
+        self._prepare(address)
+
+    async def send_instruction_async(self,
+                                     instruction: bytes,
+                                     address: str = "0",
+                                     message: int | str | None = None,
+                                     timeout: float | None = None) -> Status | None:
+        """Sends an instruction to the controller and awaits the response, which is returned.
+        The response is awaited timeout seconds, as long as the read timeout of the port if None."""
+        command = self._encode(instruction, address, message)
+        responding = self._responding(instruction, address, message)
+
+        loop = asyncio.get_running_loop()
+        bus_lock = self._bus_locks.setdefault(loop, asyncio.Lock())
+
+        async with bus_lock:
+            await self._prepare_async(address)
+            if responding != address:
+                await self._prepare_async(responding)
+            sent = time.perf_counter()
+            self._write_request(command, {address: instruction})
+            try:
+                response = await self.read_response_async(responding, timeout)
+            finally:
+                self._end_request((address,))
+        if self.metrics is not None:
+            self.metrics.record(self.port, address, instruction, time.perf_counter() - sent, len(command), response)
+
+        return response
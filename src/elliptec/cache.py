@@ -0,0 +1,107 @@
+"""On-disk cache of device info, which lets devices be created without waiting for an info response."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir() -> Path:
+    """Returns the directory for elliptec cache files."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "elliptec"
+
+
+def load_json(path: Path, description: str) -> dict[str, dict[str, object]]:
+    """Reads entries stored by save_json(). A missing or unreadable file (described as description in the
+    log) results in no entries."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning("Could not read %s %s, starting empty.", description, path)
+        return {}
+
+
+def save_json(path: Path, entries: dict[str, dict[str, object]], description: str) -> None:
+    """Writes entries to a JSON file, replacing it atomically so that readers never see it half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, path)
+    except OSError:
+        logger.warning("Could not write %s %s.", description, path)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class InfoCache:
+    """Device info stored on disk per port and address, along with the serial number of the device.
+
+    Pass an InfoCache to a device (e.g. Rotator(controller, info_cache=InfoCache())) to create it from
+    the cached info. The cached info is validated against the device on the first command it is sent."""
+
+    def __init__(self, path: str | os.PathLike | None = None) -> None:
+        self.path = Path(path) if path is not None else default_cache_dir() / "device_info.json"
+        self.entries: dict[str, dict[str, object]] = {}
+        self.load()
+
+    @staticmethod
+    def key(port: str | None, address: str) -> str:
+        """Returns the key under which the info of a device is stored."""
+        return f"{port}/{address}"
+
+    def get(self, port: str | None, address: str, serial_no: str | None = None) -> dict[str, object] | None:
+        """Returns the cached info of a device, None if there is none (or it is for another serial number)."""
+        info = self.entries.get(self.key(port, address))
+        if info is None or (serial_no is not None and info["Serial No."] != serial_no):
+            return None
+        return dict(info)
+
+    def put(self, port: str | None, info: dict[str, object]) -> None:
+        """Stores the info of a device and saves the cache."""
+        self.entries[self.key(port, info["Address"])] = dict(info)
+        self.save()
+
+    def invalidate(self, port: str | None, address: str) -> None:
+        """Removes the info of a device from the cache."""
+        if self.entries.pop(self.key(port, address), None) is not None:
+            self.save()
+
+    def clear(self) -> None:
+        """Removes all entries from the cache."""
+        self.entries.clear()
+        self.save()
+
+    def load(self) -> None:
+        """Loads the cache from disk. A missing or unreadable file results in an empty cache."""
+        self.entries = load_json(self.path, "device info cache")
+
+    def save(self) -> None:
+        """Saves the cache to disk, replacing the file atomically."""
+        save_json(self.path, self.entries, "device info cache")
+
+
+class MemoryInfoCache(InfoCache):
+    """Device info kept in memory only, given as (port, info) pairs, e.g. the info found by probing a bus
+    (see scan.probe_bus()), so that devices can be created from it without asking for it again."""
+
+    def __init__(self, infos: Iterable[tuple[str | None, dict[str, object]]] = ()) -> None:
+        self.entries: dict[str, dict[str, object]] = {}
+        for port, info in infos:
+            self.put(port, info)
+
+    def load(self) -> None:
+        """Does nothing, the cache is not stored on disk."""
+
+    def save(self) -> None:
+        """Does nothing, the cache is not stored on disk."""
@@ -0,0 +1,228 @@
+"""Calibration of the timing of devices: round trip of commands and duration of moves, stored on disk per
+serial number (see calibrate() and Motor.estimate_move_time())."""
+from __future__ import annotations
+
+import logging
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from .cache import default_cache_dir, load_json, save_json
+from .cmd import get_, mov_
+from .devices import devices
+
+if TYPE_CHECKING:
+    from .motor import Motor
+
+logger = logging.getLogger(__name__)
+
+# Kinds of moves calibrated, by the instruction (without the direction of homing)
+MOVE_KINDS = ("ma", "mr", "fw", "bw", "ho")
+# Positions moved to, as fractions of the range of continuous motors (sliders move to each slot)
+FRACTIONS = (0.125, 0.25, 0.5, 1.0)
+
+
+def move_kind(instruction: bytes) -> str:
+    """Kind of a move instruction, e.g. "ho" for both directions of homing."""
+    return instruction[:2].decode()
+
+
+class MoveFit(NamedTuple):
+    """Time (in seconds) from writing a move until its response has arrived, as offset + per_pulse * distance,
+    fitted to the given number of samples whose residuals have the standard deviation jitter."""
+
+    offset: float
+    per_pulse: float
+    jitter: float
+    samples: int
+
+    def estimate(self, distance: int) -> float:
+        """Time a move over the distance (in pulses) takes."""
+        return self.offset + self.per_pulse * abs(distance)
+
+    @classmethod
+    def fit(cls, samples: list[tuple[int, float]]) -> MoveFit:
+        """Fits a straight line to (distance, duration) samples, a constant if all have the same distance."""
+        distances = [distance for distance, _ in samples]
+        durations = [duration for _, duration in samples]
+        if len(set(distances)) > 1:
+            per_pulse, offset = statistics.linear_regression(distances, durations)
+        else:
+            per_pulse, offset = 0.0, statistics.fmean(durations)
+        residuals = [duration - (offset + per_pulse * distance) for distance, duration in samples]
+        jitter = statistics.stdev(residuals) if len(residuals) > 1 else 0.0
+        return cls(offset, per_pulse, jitter, len(samples))
+
+
+@dataclass
+class MoveModel:
+    """Timing of a device: the round trip of a query ("gs") and the duration of each kind of move (see
+    MoveFit), measured at the given velocity (in percent, None if unknown). Times are in seconds."""
+
+    serial_no: str
+    motor_type: int
+    velocity: int | None
+    rtt: float
+    rtt_jitter: float
+    moves: dict[str, MoveFit] = field(default_factory=dict)
+    created: float = field(default_factory=time.time)
+
+    def estimate(self, kind: str, distance: int, velocity: int | None = None) -> float | None:
+        """Time a move of the given kind over the distance (in pulses) takes at the given velocity (the
+        calibrated one if None). None if that kind of move has not been calibrated."""
+        fit = self.moves.get(kind)
+        if fit is None:
+            return None
+        per_pulse = fit.per_pulse
+        if velocity and self.velocity:
+            per_pulse *= self.velocity / velocity
+        return fit.offset + per_pulse * abs(distance)
+
+    def to_dict(self) -> dict[str, object]:
+        """Compact representation for storing as JSON."""
+        return {"motor_type": self.motor_type,
+                "velocity": self.velocity,
+                "rtt": [self.rtt, self.rtt_jitter],
+                "moves": {kind: list(fit) for kind, fit in self.moves.items()},
+                "created": self.created}
+
+    @classmethod
+    def from_dict(cls, serial_no: str, data: dict[str, object]) -> MoveModel:
+        """Inverse of to_dict()."""
+        rtt, rtt_jitter = data["rtt"]
+        return cls(serial_no=serial_no,
+                   motor_type=data["motor_type"],
+                   velocity=data["velocity"],
+                   rtt=rtt,
+                   rtt_jitter=rtt_jitter,
+                   moves={kind: MoveFit(*fit) for kind, fit in data["moves"].items()},
+                   created=data["created"])
+
+
+class CalibrationStore:
+    """Timing models of devices (see MoveModel) stored on disk by serial number.
+
+    Load the model of a device with Motor.load_calibration(store), calibrate() stores new ones."""
+
+    def __init__(self, path: str | os.PathLike | None = None) -> None:
+        self.path = Path(path) if path is not None else default_cache_dir() / "calibration.json"
+        self.entries: dict[str, dict[str, object]] = {}
+        self.load()
+
+    def get(self, serial_no: str) -> MoveModel | None:
+        """Returns the model of a device, None if it has not been calibrated (or the entry is unreadable)."""
+        data = self.entries.get(serial_no)
+        if data is None:
+            return None
+        try:
+            return MoveModel.from_dict(serial_no, data)
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring unreadable calibration of device %s.", serial_no)
+            return None
+
+    def put(self, model: MoveModel) -> None:
+        """Stores the model of a device and saves the store."""
+        self.entries[model.serial_no] = model.to_dict()
+        self.save()
+
+    def invalidate(self, serial_no: str) -> None:
+        """Removes the model of a device."""
+        if self.entries.pop(serial_no, None) is not None:
+            self.save()
+
+    def load(self) -> None:
+        """Loads the store from disk. A missing or unreadable file results in an empty store."""
+        self.entries = load_json(self.path, "calibration store")
+
+    def save(self) -> None:
+        """Saves the store to disk, replacing the file atomically."""
+        save_json(self.path, self.entries, "calibration store")
+
+
+class _Calibration:
+    """Runs the moves of calibrate() and collects their samples."""
+
+    def __init__(self, motor: Motor) -> None:
+        self.motor = motor
+        self.samples: dict[str, list[tuple[int, float]]] = {kind: [] for kind in MOVE_KINDS}
+        self.position: int | None = None
+
+    def jog_distance(self, start: int, end: int) -> int:
+        """Distance (in pulses) of a jog from start to end, which may take rotators past their zero."""
+        distance = abs(end - start)
+        if self.motor.motor_type in (14, 18):
+            distance = min(distance, self.motor.pulse_per_rev - distance)
+        return distance
+
+    def move(self, req: str, data: int | str = "") -> None:
+        """Times a move and records it as a sample of its kind."""
+        instruction = mov_[req]
+        written = time.perf_counter()
+        status = self.motor.send_instruction(instruction, message=data if data != "" else None)
+        elapsed = time.perf_counter() - written
+        if not isinstance(status, tuple) or status[1] != "PO":
+            logger.warning("Move %s of motor at address %s failed during calibration: %s", req, self.motor.address, status)
+            self.position = None
+            return
+        if self.position is not None:
+            if req == "relative":
+                distance = abs(data)
+            elif req in ("forward", "backward"):
+                distance = self.jog_distance(self.position, status[2])
+            else:
+                distance = abs(status[2] - self.position)
+            self.samples[move_kind(instruction)].append((distance, elapsed))
+        self.position = status[2]
+
+    def targets(self) -> list[int]:
+        """Positions to move to."""
+        slots = devices.get(self.motor.motor_type, {}).get("positions")
+        if slots:
+            return list(slots[1:])
+        maximum = self.motor.max_position
+        # A full revolution of a rotator would end where it started
+        return [min(int(maximum * fraction), maximum - 1) for fraction in FRACTIONS]
+
+
+def calibrate(motor: Motor, store: CalibrationStore | None = None, repeats: int = 2) -> MoveModel:
+    """Measures the timing of a motor (see MoveModel) and uses it from now on (see Motor.estimate_move_time()).
+    The model is also put into the store, if one is given.
+
+    The motor is homed and moved back and forth over its range: absolute and relative moves to several
+    positions (every slot of sliders), jogs both ways and homing, each repeated the given number of
+    times. This takes a few seconds per repeat."""
+    rtts = []
+    for _ in range(5 * repeats):
+        sent = time.perf_counter()
+        motor.send_instruction(get_["status"])
+        rtts.append(time.perf_counter() - sent)
+    velocity = motor.get_velocity()
+
+    run = _Calibration(motor)
+    run.move("home_clockwise")
+    targets = run.targets()
+    for _ in range(repeats):
+        for target in targets:
+            run.move("absolute", target)
+            run.move("absolute", 0)
+        for target in targets:
+            run.move("relative", target)
+            run.move("relative", -target)
+        run.move("forward")
+        run.move("backward")
+        run.move("absolute", targets[len(targets) // 2])
+        run.move("home_clockwise")
+
+    model = MoveModel(serial_no=motor.serial_no,
+                      motor_type=motor.motor_type,
+                      velocity=velocity,
+                      rtt=statistics.median(rtts),
+                      rtt_jitter=statistics.stdev(rtts) if len(rtts) > 1 else 0.0,
+                      moves={kind: MoveFit.fit(samples) for kind, samples in run.samples.items() if samples})
+    motor.calibration = model
+    if store is not None:
+        store.put(model)
+    return model
@@ -13,9 +13,17 @@ get_: dict[str, bytes] = {
     "home_offset": b"go",
     "motor_1_info": b"i1",
     "motor_2_info": b"i2",
+    "velocity": b"gv",
 }
 
-set_: dict[str, bytes] = {"stepsize": b"sj", "isolate": b"is", "address": b"ca", "home_offset": b"so"}
+set_: dict[str, bytes] = {
+    "stepsize": b"sj",
+    "isolate": b"is",
+    "address": b"ca",
+    "home_offset": b"so",
+    "group_address": b"ga",
+    "velocity": b"sv",
+}
 
 mov_: dict[str, bytes] = {
     "home_clockwise": b"ho0",
@@ -28,6 +36,7 @@ mov_: dict[str, bytes] = {
 
 do_: dict[str, bytes] = {
     "save_user_data": b"us",
+    "stop": b"st",
     }
 
 
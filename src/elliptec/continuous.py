@@ -2,9 +2,40 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING
 
 from .motor import Motor
+from .planner import Plan, plan_visits, wraps
 from .tools import Status
+from .trajectory import Trajectory, TrajectoryPoint
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import ArrayLike
+
+
+def _import_numpy():
+    """Imports numpy, which is only needed for array conversions."""
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError("Array conversions require numpy, install it with: pip install elliptec[numpy]") from exc
+    return numpy
+
+
+def _round_like_python(np, values: np.ndarray, ndigits: int) -> np.ndarray:
+    """Rounds like the built-in round() does for each element.
+
+    numpy.round() scales by 10**ndigits before rounding, so it can round the other way than round()
+    for values within a rounding error of a tie. Those few values are rounded with round() instead."""
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0**ndigits
+    distance_to_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    near_tie = distance_to_tie <= np.abs(scaled) * 1e-15 + 1e-12
+    if near_tie.any():
+        rounded[near_tie] = [round(value, ndigits) for value in values[near_tie].tolist()]
+    return rounded
 
 
 class ContinuousMotor(Motor):
@@ -13,8 +44,16 @@ class ContinuousMotor(Motor):
     Subclasses must implement:
         _pos_to_unit(position) -> float: Convert pulse position to user unit
         _unit_to_pos(value) -> int: Convert user unit to pulse position
+
+    Subclasses may implement (to make array conversions fast), and then set _vectorized = True:
+        _pulses_to_units(position): Unrounded _pos_to_unit(), working on scalars and numpy arrays alike
+        _units_to_pulses(value): Untruncated _unit_to_pos(), working on scalars and numpy arrays alike
     """
 
+    # Whether the subclass implements _pulses_to_units() and _units_to_pulses(), else arrays are
+    # converted element by element
+    _vectorized: bool = False
+
     @abstractmethod
     def _pos_to_unit(self, position: int) -> float:
         ...
@@ -23,6 +62,29 @@ class ContinuousMotor(Motor):
     def _unit_to_pos(self, value: float) -> int:
         ...
 
+    def positions_to_units(self, positions: ArrayLike) -> np.ndarray:
+        """Converts an array of positions in pulses to user units at once. Gives the same
+        results as converting the positions one by one. Requires numpy."""
+        np = _import_numpy()
+        positions = np.asarray(positions)
+        if not self._vectorized:
+            return np.vectorize(self._pos_to_unit, otypes=[np.float64])(positions)
+        units = self._pulses_to_units(positions.astype(np.float64))
+        return _round_like_python(np, units, 4)
+
+    def units_to_positions(self, values: ArrayLike) -> np.ndarray:
+        """Converts an array of values in user units to positions in pulses at once. Gives the same
+        results as converting the values one by one. Requires numpy."""
+        np = _import_numpy()
+        values = np.asarray(values, dtype=np.float64)
+        if not self._vectorized:
+            return np.vectorize(self._unit_to_pos, otypes=[np.int64])(values)
+        pulses = self._units_to_pulses(values)
+        if not np.isfinite(pulses).all():
+            raise ValueError("Cannot convert non-finite values to positions.")
+        # int() truncates towards zero
+        return np.trunc(pulses).astype(np.int64)
+
     def _get_unit(self) -> float | None:
         """Gets the current position in user units."""
         status = self.get("position")
@@ -34,12 +96,51 @@ class ContinuousMotor(Motor):
         status = self.move("absolute", position)
         return self._extract_unit_from_status(status)
 
+    async def _set_unit_async(self, value: float) -> float | None:
+        """Asynchronous counterpart of _set_unit()."""
+        await self.validate_info_async()
+        position = self._unit_to_pos(value)
+        status = await self.move_async("absolute", position)
+        return self._extract_unit_from_status(status)
+
     def _shift_unit(self, value: float) -> float | None:
         """Shifts by a relative amount in user units."""
         position = self._unit_to_pos(value)
         status = self.move("relative", position)
         return self._extract_unit_from_status(status)
 
+    def _target_positions(self, targets: Sequence[float] | np.ndarray) -> tuple[list[float], list[int]]:
+        """Converts targets in user units to positions in pulses, returning both as lists."""
+        if hasattr(targets, "dtype"):
+            return targets.tolist(), self.units_to_positions(targets).tolist()
+        return list(targets), [self._unit_to_pos(target) for target in targets]
+
+    def plan_trajectory(self, targets: Sequence[float] | np.ndarray, start: float | None = None) -> Plan:
+        """Plans the order in which to visit positions in user units that takes the least time, starting at
+        start (the current position by default). See plan_visits() for how, and run_trajectory(optimize=True)."""
+        _, positions = self._target_positions(targets)
+        return plan_visits(self, positions, None if start is None else self._unit_to_pos(start))
+
+    def run_trajectory(self,
+                       targets: Sequence[float] | np.ndarray,
+                       callback: Callable[[int, float, float | None], None] | None = None,
+                       overlap: bool = False,
+                       optimize: bool = False) -> list[TrajectoryPoint]:
+        """Moves through a sequence of absolute positions in user units, calling callback(index, target,
+        reached) at each of them. See Trajectory for details. Returns the outcome and timing of each point.
+
+        With optimize=True, the points are visited in the order that takes the least time (see
+        plan_trajectory()), rotators passing through zero if that is shorter. The points are still
+        reported with their indices in targets, in the order they were visited."""
+        targets, positions = self._target_positions(targets)
+        if not optimize:
+            trajectory = Trajectory(self, targets, positions, self._extract_unit_from_status, callback, overlap)
+            return trajectory.run()
+        plan = plan_visits(self, positions)
+        trajectory = Trajectory(self, plan.reorder(targets), plan.positions, self._extract_unit_from_status, callback,
+                                overlap, wrap=self.pulse_per_rev if wraps(self) else None, indices=plan.order)
+        return trajectory.run()
+
     def jog(self, direction: str = "forward") -> float | None:
         """Jogs by the jog distance in a particular direction."""
         if direction in ["backward", "forward"]:
@@ -67,6 +168,10 @@ class ContinuousMotor(Motor):
         position = self._unit_to_pos(value)
         return self.set("stepsize", position)
 
+    def _position_value(self, position: int) -> float:
+        """Streams positions in user units."""
+        return self._pos_to_unit(position)
+
     def _extract_unit_from_status(self, status: Status | None) -> float | None:
         """Extracts user-unit value from a status tuple."""
         if status and status[1] in ["PO", "HO", "GJ"]:
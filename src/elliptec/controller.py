@@ -1,18 +1,48 @@
 """This module contains the Controller class, which is the base class for all devices."""
 from __future__ import annotations
 
+import itertools
 import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from types import TracebackType
+from typing import TYPE_CHECKING
 
 import serial
-from .tools import Status, parse
+from .cmd import do_, mov_, set_
+from .recording import RecordingPort, TrafficRecorder
+from .scheduler import Priority, RequestQueue
+from .tools import Status, parse, status_address
+
+if TYPE_CHECKING:
+    from .metrics import Metrics
+    from .moves import MoveHandle
 
 logger = logging.getLogger(__name__)
 
+_CHANGE_ADDRESS = set_["address"]
+_STOP = do_["stop"]
+_MOVES = frozenset(mov_.values())
+# Time (in seconds) between checks for new bytes while waiting for a response with a deadline of its own
+READ_POLL_INTERVAL = 0.0005
+
 
 class Controller:
     """Class for controlling the Elliptec devices via serial port. This is a general class,
-    subclasses are implemented for each device type."""
+    subclasses are implemented for each device type.
+
+    With reader_thread=True, responses are read by a background thread as they arrive (see
+    start_reader()), instead of right after each command is written. With record set to a path, all
+    traffic on the port is appended to that file, which a ReplayPort can play back later.
+
+    A controller can be shared by several threads: requests to one address are served in turn (see
+    RequestQueue), while requests to different addresses are served at the same time. Whichever
+    thread is waiting reads the port and files the responses for the others. Safety requests (see
+    Priority) are served first and stop a move in progress at their address, see stop_all()."""
 
     def __init__(self,
                  port: str | None = None,
@@ -22,14 +52,50 @@ class Controller:
                  stopbits: float = serial.STOPBITS_ONE,
                  timeout: float = 2,
                  write_timeout: float = 0.5,
-                 debug: bool = True) -> None:
+                 debug: bool = True,
+                 transport: serial.SerialBase | None = None,
+                 reader_thread: bool = False,
+                 metrics: Metrics | None = None,
+                 record: str | os.PathLike | None = None) -> None:
         self.debug = debug
         self.port: str | None = None
         self.last_position: int | str | None = None
         self.last_response: bytes | None = None
         self.last_status: Status | None = None
+        # Addresses that have answered so far
+        self.addresses: set[str] = set()
+        # Statistics of the commands sent (see Metrics), None to collect none
+        self.metrics = metrics
+        # Bytes received but not yet handled (the start of a response, or responses read in bulk)
+        self._rx_buffer = bytearray()
+        # Responses that arrived while waiting for another address, per address, numbered in order of arrival
+        self._inbox: defaultdict[str, deque[tuple[int, Status]]] = defaultdict(deque)
+        self._arrivals = itertools.count()
+        self._filed = threading.Condition()
+        # Reader thread (see start_reader())
+        self._reader: threading.Thread | None = None
+        self._reader_stop = threading.Event()
+        # Encoded address and instruction of the commands sent so far
+        self._prefixes: dict[tuple[str, bytes], bytes] = {}
+        # Moves in progress (see Motor.move(wait=False)), per address
+        self.moves: dict[str, MoveHandle] = {}
+        # Requests of the threads sharing the controller, and who may write to and read from the port
+        self.requests = RequestQueue()
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._waiting_to_read = 0
+        # Instructions written that have not been answered yet, per address
+        self._in_flight: dict[str, bytes] = {}
+        # Addresses to stop for a safety request: as soon as a move is written there, and those where a
+        # stop has been written whose response the safety request collects (see _preempt())
+        self._stops_due: set[str] = set()
+        self._stops_owed: set[str] = set()
 
-        if port is None:
+        if transport is not None:
+            # An already open serial port (or an object behaving like one, e.g. a SimulatedBus)
+            self.s = transport
+            self.port = getattr(transport, "port", port)
+        elif port is None:
             self.__search_and_connect(baudrate,
                                       bytesize,
                                       parity,
@@ -45,6 +111,12 @@ class Controller:
                                    timeout,
                                    write_timeout)
 
+        if record is not None and getattr(self, "s", None) is not None:
+            self.s = RecordingPort(self.s, TrafficRecorder(record))
+
+        if reader_thread and getattr(self, "s", None) is not None:
+            self.start_reader()
+
     def __enter__(self) -> Controller:
         return self
 
@@ -93,12 +165,229 @@ class Controller:
                                    write_timeout)
             break
 
+    @property
+    def timeout(self) -> float | None:
+        """Read timeout of the port, the time to wait for a response unless told otherwise."""
+        return self.s.timeout
+
     def read_response(self) -> Status | None:
-        """Reads the response from the controller."""
-        response = self.s.read_until(b"\r\n")  # Waiting until response read
+        """Reads the response from the controller. With the reader thread running, returns the
+        oldest response that has not been claimed yet."""
+        if self.reader_running:
+            return self._wait_filed(None)
+        with self._read_lock:
+            return self._read_one()
+
+    def _read_one(self) -> Status | None:
+        """Reads a response from the port, the caller holding the read lock."""
+        if not self._rx_buffer:
+            # Nothing buffered, which is the usual case
+            return self._handle_response(self.s.read_until(b"\r\n"))  # Waiting until response read
+        if b"\r\n" not in self._rx_buffer:
+            self._rx_buffer += self.s.read_until(b"\r\n")
+        return self._handle_response(self._take_frame())
+
+    def _take_frame(self) -> bytes:
+        """Takes the first response out of the receive buffer (or all of it, if it is incomplete)."""
+        end = self._rx_buffer.find(b"\r\n")
+        end = len(self._rx_buffer) if end < 0 else end + 2
+        response = bytes(self._rx_buffer[:end])
+        del self._rx_buffer[:end]
+        return response
+
+    def _file(self, status: Status) -> None:
+        """Files a response under the address it came from."""
+        with self._filed:
+            self._inbox[status_address(status)].append((next(self._arrivals), status))
+            self._filed.notify_all()
+
+    def _pop_filed(self, address: str | None) -> Status | None:
+        """Takes the oldest filed response from an address (from any address if None), without waiting."""
+        with self._filed:
+            if address is None:
+                queues = [queue for queue in self._inbox.values() if queue]
+                if not queues:
+                    return None
+                inbox = min(queues, key=lambda queue: queue[0][0])
+            else:
+                inbox = self._inbox.get(address)
+                if not inbox:
+                    return None
+            return inbox.popleft()[1]
+
+    def _wait_filed(self, address: str | None, deadline: float | None = None) -> Status | None:
+        """Waits for the reader thread to file a response from an address (any address if None),
+        until the deadline (by default, the read timeout of the port from now)."""
+        if deadline is None and (timeout := self.timeout) is not None:
+            deadline = time.monotonic() + timeout
+        with self._filed:
+            while (status := self._pop_filed(address)) is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._filed.wait(remaining)
+            return status
+
+    def _read_frames(self, data: bytes) -> int:
+        """Adds received bytes to the receive buffer and files every complete response. Malformed
+        responses (e.g. line noise) are dropped."""
+        self._rx_buffer += data
+        count = 0
+        while b"\r\n" in self._rx_buffer:
+            frame = self._take_frame()
+            try:
+                status = self._handle_response(frame)
+            except ValueError as exc:
+                logger.warning("Dropping malformed response %s: %s", frame, exc)
+                continue
+            if status is not None:
+                self._file(status)
+                count += 1
+        return count
+
+    def poll_responses(self) -> int:
+        """Reads all responses that have arrived, without waiting, and files them by address.
+        Returns the number of responses read (always 0 with the reader thread running, which
+        files responses as they arrive)."""
+        if self.reader_running or not self._read_lock.acquire(blocking=False):
+            # Whoever is reading the port files what arrives
+            return 0
+        try:
+            waiting = self.s.in_waiting
+            return self._read_frames(self.s.read(waiting) if waiting else b"")
+        finally:
+            self._release_read_lock()
+
+    def wait_response(self, address: str, timeout: float | None = None) -> Status | None:
+        """Returns the next response from an address, filing responses from other addresses
+        for later. Returns None if none arrives within timeout seconds (the read timeout of
+        the port if None)."""
+        if timeout is None:
+            timeout = self.timeout
+        return self._wait_response(address, None if timeout is None else time.monotonic() + timeout)
+
+    def _wait_response(self, address: str, deadline: float | None) -> Status | None:
+        """Returns the next response from an address, or None once the deadline has passed."""
+        if self.reader_running:
+            return self._wait_filed(address, deadline)
+        while True:
+            if self._inbox.get(address) and (status := self._pop_filed(address)) is not None:
+                return status
+            if self._read_lock.acquire(blocking=False):
+                try:
+                    # The response may have been filed by the thread that was reading before
+                    status = self._pop_filed(address) if self._inbox.get(address) else self._read_before(deadline)
+                finally:
+                    self._release_read_lock()
+                if status is None or status_address(status) == address:
+                    return status
+                self._file(status)
+                continue
+            # Another thread is reading the port, it files the response or lets go of the port
+            with self._filed:
+                self._waiting_to_read += 1
+                try:
+                    if not self._inbox.get(address) and self._read_lock.locked():
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            return None
+                        self._filed.wait(remaining)
+                finally:
+                    self._waiting_to_read -= 1
+
+    def _release_read_lock(self) -> None:
+        """Lets go of the port, waking up the threads waiting to read it."""
+        self._read_lock.release()
+        # Threads count themselves as waiting before they check the lock, none can be missed
+        if self._waiting_to_read:
+            with self._filed:
+                self._filed.notify_all()
+
+    def _read_before(self, deadline: float | None) -> Status | None:
+        """Reads a response from the port, waiting until the deadline at most. The caller holds the read lock.
+
+        The read timeout of the port is left as it is, as changing it reconfigures a real port. Until another
+        deadline, the port is checked for arriving bytes instead: once a response starts to arrive, the rest
+        of it follows within milliseconds."""
+        timeout = self.s.timeout
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if (remaining is None and timeout is None) or (None not in (remaining, timeout) and abs(remaining - timeout) < 0.01):
+            return self._read_one()
+        while not self._rx_buffer and not self.s.in_waiting:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(READ_POLL_INTERVAL)
+        return self._read_one()
+
+    def take_responses(self, address: str) -> list[Status]:
+        """Returns (and forgets) the responses from an address that have been filed so far."""
+        if not self._inbox.get(address):
+            return []
+        with self._filed:
+            inbox = self._inbox.pop(address, None)
+        return [status for _, status in inbox] if inbox else []
+
+    def _prepare(self, address: str) -> None:
+        """Makes an address ready for a new request: waits for a move in progress and
+        discards responses that arrived too late to be collected."""
+        move = self.moves.get(address)
+        if move is not None:
+            move.wait()
+        for status in self.take_responses(address):
+            logger.debug("Discarding late response: %s", status)
+
+    # Reader thread
+    @property
+    def reader_running(self) -> bool:
+        """Whether the reader thread is running."""
+        return self._reader is not None
+
+    def start_reader(self, interval: float = 0.001) -> None:
+        """Starts a thread that reads responses as they arrive and files them by address, so that
+        callers only ever wait for the responses from their own device. The thread checks for new
+        bytes every interval seconds while the port is quiet."""
+        if self._reader is not None:
+            return
+        self._reader_stop.clear()
+        self._reader = threading.Thread(target=self._read_loop,
+                                        args=(interval,),
+                                        name=f"elliptec-reader-{self.port}",
+                                        daemon=True)
+        self._reader.start()
+
+    def stop_reader(self) -> None:
+        """Stops the reader thread. Responses it has filed can still be claimed afterwards."""
+        reader = self._reader
+        if reader is None:
+            return
+        self._reader_stop.set()
+        reader.join()
+        self._reader = None
+
+    def _read_loop(self, interval: float) -> None:
+        """Body of the reader thread."""
+        try:
+            while not self._reader_stop.is_set():
+                try:
+                    waiting = self.s.in_waiting
+                    data = self.s.read(waiting) if waiting else b""
+                except (serial.SerialException, OSError) as exc:
+                    logger.error("Reader thread for port %s stopped: %s", self.port, exc)
+                    break
+                if data:
+                    self._read_frames(data)
+                else:
+                    self._reader_stop.wait(interval)
+        finally:
+            # Responses are read by the callers again once the thread has stopped
+            self._reader = None
 
+    def _handle_response(self, response: bytes) -> Status | None:
+        """Parses a raw response and records it as the last response/status/position."""
         if self.debug:
             logger.debug("RX: %s", response)
+        if self.metrics is not None:
+            self.metrics.record_received(self.port, len(response))
 
         status = parse(response, debug=self.debug)
 
@@ -106,39 +395,288 @@ class Controller:
         self.last_response = response
         self.last_status = status
         if status is not None:
+            self.addresses.add(status_address(status))
             if not isinstance(status, dict):
                 if status[1] == "PO":
                     self.last_position = status[2]
 
         return status
 
-    def send_instruction(self, instruction: bytes, address: str = "0", message: int | str | None = None) -> Status | None:
-        """Sends an instruction to the controller. Expects a response which is returned."""
-        # Encode inputs
-        addr = address.encode("utf-8")
-        inst = instruction  # .encode('utf-8') # Already encoded
-        # Compose command
-        command = addr + inst
-        # Append command if necessary
-        if message is not None:
-            # Convert to hex if the message is a number
-            if isinstance(message, int):
-                mesg = message.to_bytes(4, "big", signed=True).hex().upper()
-            else:
-                mesg = message
+    def _encode(self, instruction: bytes, address: str = "0", message: int | str | None = None) -> bytes:
+        """Composes the bytes of a command from address, instruction and optional message."""
+        # Address and instruction are encoded once per combination
+        try:
+            prefix = self._prefixes[address, instruction]
+        except KeyError:
+            prefix = self._prefixes[address, instruction] = address.encode("utf-8") + instruction
+        if message is None:
+            return prefix
+        if isinstance(message, int):
+            # 32bit signed hex (two's complement), in upper case
+            if not -0x80000000 <= message <= 0x7FFFFFFF:
+                raise OverflowError("int too big to convert")
+            return prefix + b"%08X" % (message & 0xFFFFFFFF)
+        return prefix + message.encode("utf-8")
 
-            command += mesg.encode("utf-8")
+    def write_command(self, command: bytes) -> None:
+        """Writes already encoded command(s) to the serial port, without waiting for a response."""
+        with self._write_lock:
+            self._write(command)
 
+    def _write(self, command: bytes) -> None:
+        """Writes to the serial port, the caller holding the write lock."""
         if self.debug:
             logger.debug("TX: %s", command)
-        # Execute the command and wait for a response
-        self.s.write(command)  # This actually executes the command
-        response = self.read_response()
+        if self.metrics is not None:
+            self.metrics.record_sent(self.port, len(command))
+        self.s.write(command)
+
+    def _write_request(self, command: bytes, instructions: dict[str, bytes]) -> None:
+        """Writes the command(s) of a request, given the instruction sent to each address, which are in
+        flight until _end_request(). A move to an address that is due to stop is followed by the stop."""
+        with self._write_lock:
+            stops = [address for address, instruction in instructions.items()
+                     if instruction in _MOVES and address in self._stops_due]
+            for address in stops:
+                self._stops_due.discard(address)
+                self._stops_owed.add(address)
+                command += self._encode(_STOP, address)
+            self._in_flight.update(instructions)
+            self._write(command)
+
+    def _end_request(self, addresses: Iterable[str]) -> None:
+        """Marks the instructions sent to the addresses as answered (or timed out)."""
+        for address in addresses:
+            self._in_flight.pop(address, None)
+
+    def _preempt(self, addresses: Iterable[str], stop: Sequence[str] = ()) -> None:
+        """Makes way for a safety request to the addresses. Moves in progress there are stopped: right away
+        if they have been written, otherwise as soon as they are (see _write_request()). Stops for the
+        addresses in stop, which the caller holds, are written in the same go."""
+        thread = threading.get_ident()
+        commands = [self._encode(_STOP, address) for address in stop]
+        interrupted = []
+        with self._write_lock:
+            for address in addresses:
+                if address in self.moves:
+                    interrupted.append(self.moves[address])
+                    continue
+                holder = self.requests.holder(address)
+                if holder is None or holder == thread or address in self._stops_due or address in self._stops_owed:
+                    # Free, or already being stopped for another safety request
+                    continue
+                if self._in_flight.get(address) in _MOVES:
+                    commands.append(self._encode(_STOP, address))
+                    self._stops_owed.add(address)
+                else:
+                    self._stops_due.add(address)
+            if commands:
+                self._write(b"".join(commands))
+        for move in interrupted:
+            move.interrupt()
+
+    def _take_stop(self, address: str) -> bool:
+        """Ends the stop of an address for a safety request. Returns whether its response is still to be read."""
+        with self._write_lock:
+            self._stops_due.discard(address)
+            if address in self._stops_owed:
+                self._stops_owed.discard(address)
+                return True
+            return False
+
+    @contextmanager
+    def request(self, addresses: Sequence[str], priority: Priority = Priority.USER) -> Iterator[None]:
+        """Holds addresses for a request of several commands (see RequestQueue) and makes them ready for it
+        (see _prepare()). A safety request first stops the moves in progress at the addresses, see stop_all().
+        Moves are written within the request with start_move()."""
+        if priority == Priority.SAFETY:
+            self._preempt(addresses)
+        with self.requests.hold(addresses, priority):
+            for address in dict.fromkeys(addresses):
+                if priority == Priority.SAFETY and self._take_stop(address):
+                    # The response to the stop written ahead of the request
+                    self.wait_response(address)
+                self._prepare(address)
+            yield
+
+    def start_move(self, command: bytes, instructions: dict[str, bytes], move: MoveHandle | None = None) -> bool:
+        """Writes the command(s) of a move within a request (see request()), given the instruction sent to each
+        address, which are in flight until end_move(). A move to an address that is due to stop for a safety
+        request is followed by the stop.
+
+        A move running in the background (see MoveHandle) is given as move instead: requests to its address wait
+        for it from now on (see _prepare()). Such a move is not stopped here, returns whether it is due to."""
+        if move is None:
+            self._write_request(command, instructions)
+            return False
+        with self._write_lock:
+            self._write(command)
+            self._in_flight.update(instructions)
+            for address in instructions:
+                self.moves[address] = move
+            stop = not self._stops_due.isdisjoint(instructions)
+            self._stops_due.difference_update(instructions)
+        return stop
+
+    def end_move(self, addresses: Iterable[str], move: MoveHandle | None = None) -> None:
+        """Marks the moves to the addresses as answered (or timed out). A move running in the background hands
+        its addresses back to other requests."""
+        addresses = list(addresses)
+        self._end_request(addresses)
+        if move is not None:
+            for address in addresses:
+                if self.moves.get(address) is move:
+                    del self.moves[address]
+
+    def stop_requested(self, address: str) -> bool:
+        """Whether a safety request is waiting to stop the motor at an address. Requests that hold an
+        address for several commands (e.g. a Trajectory) end early when it is."""
+        return address in self._stops_due or address in self._stops_owed
+
+    @staticmethod
+    def _responding(instruction: bytes, address: str, message: int | str | None) -> str:
+        """The address the response to an instruction comes from: a device answers a change of address
+        from its new address."""
+        if instruction == _CHANGE_ADDRESS and isinstance(message, str) and message:
+            return message
+        return address
+
+    def send_instruction(self,
+                         instruction: bytes,
+                         address: str = "0",
+                         message: int | str | None = None,
+                         timeout: float | None = None,
+                         priority: Priority = Priority.USER) -> Status | None:
+        """Sends an instruction to the controller. Expects a response which is returned.
+        The response is waited for timeout seconds, as long as the read timeout of the port if None.
+
+        Requests are served by priority (see Priority). A safety request also stops the move in progress
+        at the address, if any, before its own instruction is sent."""
+        command = self._encode(instruction, address, message)
+        responding = self._responding(instruction, address, message)
+        if priority == Priority.SAFETY:
+            self._preempt((address,))
+        with self.requests.hold((address, responding), priority):
+            if priority == Priority.SAFETY and self._take_stop(address):
+                # The response to the stop written ahead of the request
+                stopped = self.wait_response(address)
+                if instruction == _STOP:
+                    return stopped
+            self._prepare(address)
+            if responding != address:
+                self._prepare(responding)
+
+            # Execute the command and wait for a response
+            sent = time.perf_counter()
+            self._write_request(command, {address: instruction})  # This actually executes the command
+            try:
+                response = self.wait_response(responding, timeout)
+            finally:
+                self._end_request((address,))
+        if self.metrics is not None:
+            self.metrics.record(self.port, address, instruction, time.perf_counter() - sent, len(command), response)
 
         return response
 
+    def stop_all(self, addresses: Iterable[str] | None = None) -> dict[str, Status | None]:
+        """Stops the motors at the given addresses (by default, all that have answered so far, or all 16 if
+        none has), jumping the queue of requests. Returns the response of each motor to the stop, for moves
+        started with wait=False the response to the move (the position it stopped at).
+
+        The stop is written to every address in one go: to free ones and to those with a move in flight
+        right away, to the others as soon as their move is written."""
+        if addresses is None:
+            addresses = sorted(self.addresses) or "0123456789ABCDEF"
+        addresses = list(dict.fromkeys(addresses))
+        responses: dict[str, Status | None] = {}
+        with self.requests.hold_available(addresses, Priority.SAFETY) as hold:
+            free = [address for address in hold.addresses if address not in self.moves]
+            for address in free:
+                self.take_responses(address)
+            self._preempt([address for address in addresses if address not in free], stop=free)
+            responses.update(self.collect_responses(free))
+        for address in addresses:
+            if address in responses:
+                continue
+            move = self.moves.get(address)
+            if move is not None:
+                move.wait()
+                responses[address] = move.status
+            else:
+                responses[address] = self.send_instruction(_STOP, address, priority=Priority.SAFETY)
+        return {address: responses[address] for address in addresses}
+
+    def send_many(self, requests: Iterable[tuple[str, bytes, int | str | None]]) -> list[Status | None]:
+        """Sends instructions to several addresses back to back and returns their responses.
+
+        Expects an iterable of (address, instruction, message) tuples. Commands to different
+        addresses are written in one go and the responses are matched to the requests by the
+        address they come from, so that a whole bus is served in roughly one round trip.
+        Requests repeating an address are sent in a later batch. The returned list is in the
+        order of the requests; missing responses are None, as are those of requests not sent
+        because a safety request stopped their address (see stop_requested())."""
+        pending = list(enumerate(requests))
+        results: list[Status | None] = [None] * len(pending)
+        with self.requests.hold(address for _, (address, _, _) in pending):
+            self._send_batches(pending, results)
+        return results
+
+    def _send_batches(self, pending: list[tuple[int, tuple[str, bytes, int | str | None]]], results: list[Status | None]) -> None:
+        """Sends the requests of send_many() in batches of one request per address, storing the responses in results."""
+        while pending:
+            # Each batch holds at most one request per address
+            batch: dict[str, int] = {}
+            instructions: dict[str, bytes] = {}
+            commands = []
+            postponed = []
+            for index, (address, instruction, message) in pending:
+                if address in batch:
+                    postponed.append((index, (address, instruction, message)))
+                    continue
+                if self.stop_requested(address):
+                    continue
+                batch[address] = index
+                instructions[address] = instruction
+                self._prepare(address)
+                commands.append(self._encode(instruction, address, message))
+            if not batch:
+                break
+
+            sent = time.perf_counter()
+            self._write_request(b"".join(commands), instructions)
+            try:
+                responses = self.collect_responses(batch)
+            finally:
+                self._end_request(batch)
+            latency = time.perf_counter() - sent
+            for (address, status), command in zip(responses.items(), commands):
+                results[batch[address]] = status
+                if self.metrics is not None:
+                    self.metrics.record(self.port, address, command[1:3], latency, len(command), status)
+            pending = postponed
+
+    def collect_responses(self, addresses: Sequence[str]) -> dict[str, Status | None]:
+        """Reads responses until every given address has answered or the read times out.
+        Responses from other addresses are filed for later."""
+        timeout = self.timeout
+        # The time left is shared by all addresses
+        deadline = None if timeout is None else time.monotonic() + timeout
+        responses = {address: self._wait_response(address, deadline) for address in dict.fromkeys(addresses)}
+        return {address: responses[address] for address in addresses}
+
+    @contextmanager
+    def read_timeout(self, timeout: float) -> Iterator[None]:
+        """Temporarily changes the read timeout of the serial port."""
+        previous = self.s.timeout
+        self.s.timeout = timeout
+        try:
+            yield
+        finally:
+            self.s.timeout = previous
+
     def close_connection(self) -> None:
         """Closes the serial connection."""
+        self.stop_reader()
         if self.s.is_open:
             self.s.close()
             logger.debug("Connection is closed!")
@@ -1,9 +1,13 @@
 """ This devices serves as a database of supported devices and stores their
-    properties, which are unavailable from the info of the device itself. """
+    properties, which are unavailable from the info of the device itself.
+
+    travel_time is the approximate time (in seconds) a move across the full range
+    takes at full velocity. The read timeouts of moves are derived from it. """
 
 devices = {
     6: {
         "name": "ELL6",
+        "travel_time": 0.2,
         "description": "Dual-Position Slider",
         "slots": 2,
         "positions": [0, 31],
@@ -12,6 +16,7 @@ devices = {
     },
     9: {
         "name": "ELL9",
+        "travel_time": 0.6,
         "description": "Four-Position Slider",
         "slots": 4,
         "positions": [0, 32, 64, 96],
@@ -20,6 +25,7 @@ devices = {
     },
     14: {
         "name": "ELL14",
+        "travel_time": 0.85,
         "description": "Rotation Mount",
         "commands": ["info", "status", "position", "home", "forward", "backward", "stepsize", "home_offset"],
         "todo": ["open", "close", "disconnect", "isolate", "set_f_fwd", "set_f_bck", "fix_freqs", "search_freqs"],
@@ -27,6 +33,7 @@ devices = {
     
     15: {
         "name": "ELL15",
+        "travel_time": 0.5,
         "description": "Motorized Iris",
         "min_aperture": 1,
         "max_aperture": 11.5,
@@ -36,12 +43,14 @@ devices = {
     
     18: {
         "name": "ELL18",
+        "travel_time": 1.5,
         "description": "Rotation Stage",
         "commands": ["info", "status", "position", "home", "forward", "backward", "stepsize", "home_offset"],
         "todo": ["open", "close", "disconnect", "isolate", "set_f_fwd", "set_f_bck", "fix_freqs", "search_freqs"],
     },
     20: {
         "name": "ELL20",
+        "travel_time": 0.6,
         "description": "Linear Stage",
         "commands": ["info", "status", "position", "home", "forward", "backward", "stepsize", "home_offset"],
         "todo": ["open", "close", "disconnect", "isolate", "set_f_fwd", "set_f_bck", "fix_freqs", "search_freqs"],
@@ -16,4 +16,6 @@ error_codes = {
     "11": "Motor Error",
     "12": "Out of Range",
     "13": "Over Current Error",
-}
\ No newline at end of file
+}
+# Status code of a device that is still executing a move
+BUSY = "9"
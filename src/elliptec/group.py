@@ -0,0 +1,143 @@
+"""Module for moving several motors on one bus simultaneously, using the group address command."""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Sequence
+
+from .cmd import mov_
+from .continuous import ContinuousMotor
+from .errors import ExternalDeviceNotFound
+from .motor import Motor
+from .scan import ADDRESSES
+from .tools import Status, move_check
+
+logger = logging.getLogger(__name__)
+
+
+def _has_moved(status: Status | None) -> bool:
+    """Whether a response reports a completed move."""
+    return status is not None and not isinstance(status, dict) and status[1] in ("PO", "BO")
+
+
+class MotorGroup:
+    """A group of motors on the same controller that start their moves together.
+
+    For every move, each member is told to also listen to the group address ("ga" command). A single
+    move command is then sent to the group address, every member executes it and answers with its own
+    address, and reverts to listening to its own address only. Members that did not move are
+    released explicitly, so the group address is free again after every move.
+
+    Any device at the group address would execute the moves as well. By default, the highest address
+    no device on the bus has answered from is used. Devices that have not been talked to yet are not
+    known to the controller, probe the bus first (see probe_bus()) if there may be any."""
+
+    def __init__(self, motors: Sequence[Motor], group_address: str | None = None) -> None:
+        if not motors:
+            raise ValueError("A group needs at least one motor.")
+        controllers = {id(motor.controller) for motor in motors}
+        if len(controllers) > 1:
+            raise ValueError("All motors of a group must share one controller.")
+        addresses = [motor.address for motor in motors]
+        if len(set(addresses)) < len(addresses):
+            raise ValueError("All motors of a group must have different addresses.")
+        self.motors = list(motors)
+        self.controller = motors[0].controller
+        if group_address is None:
+            used = self.controller.addresses.union(addresses)
+            free = [address for address in ADDRESSES if address not in used]
+            if not free:
+                raise ValueError("There is no free address on the bus to use as group address.")
+            group_address = free[-1]
+        self.group_address = group_address
+        self._check_group_address()
+
+    def _check_group_address(self) -> None:
+        """Makes sure no member and no other device that has answered on the bus uses the group address."""
+        if self.group_address in (motor.address for motor in self.motors):
+            raise ValueError(f"Group address {self.group_address} is used by a member of the group.")
+        if self.group_address in self.controller.addresses:
+            raise ValueError(f"Group address {self.group_address} is used by another device on the bus.")
+
+    def _group(self) -> None:
+        """Makes all members listen to the group address."""
+        grouped = []
+        for motor in self.motors:
+            status = motor.set("group_address", self.group_address)
+            if status is None:
+                self._release(grouped)
+                raise ExternalDeviceNotFound(f"Motor at address {motor.address} did not join the group.")
+            grouped.append(motor)
+
+    def _release(self, motors: Sequence[Motor]) -> None:
+        """Makes the given members listen to their own address only."""
+        for motor in motors:
+            motor.set("group_address", motor.address)
+
+    def move(self, req: str = "home_clockwise", data: int | str = "") -> list[Status | None] | None:
+        """Moves all members at once (see Motor.move). Returns the response of each member, in order."""
+        if req not in mov_:
+            logger.error("Invalid Command: %s", req)
+            return None
+
+        # A device may have answered from the group address since the group was created
+        self._check_group_address()
+        addresses = [motor.address for motor in self.motors]
+        with self.controller.request([self.group_address, *addresses]):
+            self._group()
+            responses: dict[str, Status | None] = {}
+            for motor in self.motors:
+                motor.state.invalidate("PO")
+            command = self.controller._encode(mov_[req], self.group_address, data)
+            try:
+                sent = time.perf_counter()
+                self.controller.start_move(command, dict.fromkeys(addresses, mov_[req]))
+                try:
+                    responses = self.controller.collect_responses(addresses)
+                finally:
+                    self.controller.end_move(addresses)
+                latency = time.perf_counter() - sent
+            finally:
+                # Members that did not move are still grouped
+                self._release([motor for motor in self.motors if not _has_moved(responses.get(motor.address))])
+
+        statuses = [responses[motor.address] for motor in self.motors]
+        metrics = self.controller.metrics
+        for motor, status in zip(self.motors, statuses):
+            motor.state.update(status)
+            if metrics is not None:
+                metrics.record(self.controller.port, motor.address, mov_[req], latency, len(command), status)
+            if motor.debug:
+                move_check(status)
+        return statuses
+
+    def home(self, clockwise: bool = True) -> list[Status | None] | None:
+        """Homes all members at once."""
+        return self.move("home_clockwise" if clockwise else "home_anticlockwise")
+
+    def move_absolute(self, position: int) -> list[Status | None] | None:
+        """Moves all members to the same absolute position in pulses."""
+        return self.move("absolute", position)
+
+    def move_relative(self, position: int) -> list[Status | None] | None:
+        """Moves all members by the same number of pulses."""
+        return self.move("relative", position)
+
+    def _unit_position(self, value: float) -> int:
+        """Converts a value in user units to pulses, which must be the same for all members."""
+        if not all(isinstance(motor, ContinuousMotor) for motor in self.motors):
+            raise TypeError("Moves in user units require continuous motors.")
+        positions = {motor._unit_to_pos(value) for motor in self.motors}
+        if len(positions) > 1:
+            raise ValueError("Members convert the value to different positions, move them in pulses instead.")
+        return positions.pop()
+
+    def set_unit(self, value: float) -> list[float | None]:
+        """Moves all members to the same absolute position in user units (e.g. an angle for rotators)."""
+        statuses = self.move_absolute(self._unit_position(value))
+        return [motor._extract_unit_from_status(status) for motor, status in zip(self.motors, statuses)]
+
+    def shift_unit(self, value: float) -> list[float | None]:
+        """Shifts all members by the same amount in user units."""
+        statuses = self.move_relative(self._unit_position(value))
+        return [motor._extract_unit_from_status(status) for motor, status in zip(self.motors, statuses)]
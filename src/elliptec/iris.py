@@ -1,14 +1,21 @@
 """Module for motorized iris (ELL15). Inherits from elliptec.ContinuousMotor."""
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from .continuous import ContinuousMotor
 from .devices import devices
 from .tools import Status
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class Iris(ContinuousMotor):
     """Iris class for elliptec motorized iris."""
 
+    _vectorized = True
+
     def check_move(self, target_aperture: float) -> bool:
         min_aperture = devices[self.motor_type]["min_aperture"]
         max_aperture = devices[self.motor_type]["max_aperture"]
@@ -16,13 +23,21 @@ class Iris(ContinuousMotor):
 
     def _pos_to_unit(self, position: int) -> float:
         """Converts position in pulses to aperture in millimeters."""
-        pulse_range = self.pulse_per_rev * self.range
-        return round(position / pulse_range * self.range, 4)
+        return round(self._pulses_to_units(position), 4)
 
     def _unit_to_pos(self, value: float) -> int:
         """Converts aperture in millimeters to position in pulses."""
+        return int(self._units_to_pulses(value))
+
+    def _pulses_to_units(self, position: float | np.ndarray) -> float | np.ndarray:
+        """Converts positions in pulses to millimeters without rounding, also numpy arrays."""
+        pulse_range = self.pulse_per_rev * self.range
+        return position / pulse_range * self.range
+
+    def _units_to_pulses(self, value: float | np.ndarray) -> float | np.ndarray:
+        """Converts millimeters to positions in pulses without truncating, also numpy arrays."""
         pulse_range = self.pulse_per_rev * self.range
-        return int(value / self.range * pulse_range)
+        return value / self.range * pulse_range
 
     # Public API (with bounds checking)
     def get_aperture(self) -> float | None:
@@ -1,22 +1,37 @@
 """Module for linear stages. Inherits from elliptec.ContinuousMotor."""
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from .continuous import ContinuousMotor
 from .tools import Status
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class Linear(ContinuousMotor):
     """Elliptec Linear Motor class."""
 
+    _vectorized = True
+
     def _pos_to_unit(self, position: int) -> float:
         """Converts position in pulses to distance in millimeters."""
-        pulse_range = self.pulse_per_rev * self.range
-        return round(position / pulse_range * self.range, 4)
+        return round(self._pulses_to_units(position), 4)
 
     def _unit_to_pos(self, value: float) -> int:
         """Converts distance in millimeters to position in pulses."""
+        return int(self._units_to_pulses(value))
+
+    def _pulses_to_units(self, position: float | np.ndarray) -> float | np.ndarray:
+        """Converts positions in pulses to millimeters without rounding, also numpy arrays."""
+        pulse_range = self.pulse_per_rev * self.range
+        return position / pulse_range * self.range
+
+    def _units_to_pulses(self, value: float | np.ndarray) -> float | np.ndarray:
+        """Converts millimeters to positions in pulses without truncating, also numpy arrays."""
         pulse_range = self.pulse_per_rev * self.range
-        return int(value / self.range * pulse_range)
+        return value / self.range * pulse_range
 
     # Public API
     def get_distance(self) -> float | None:
@@ -0,0 +1,235 @@
+"""Instrumentation of the commands sent to the devices: counts, errors, timeouts, latencies and bytes on the wire."""
+from __future__ import annotations
+
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+
+from .errcodes import error_codes
+from .tools import Status
+
+# Upper bounds (in seconds) of the latency histogram buckets, the last bucket is unbounded
+DEFAULT_BUCKETS: tuple[float, ...] = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Counts of latencies (in seconds) falling into buckets with the given upper bounds."""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        # One count per bound, plus one for latencies above the last bound
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, latency: float) -> None:
+        """Adds a latency to the histogram."""
+        self.counts[bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.sum += latency
+
+    @property
+    def mean(self) -> float | None:
+        """Mean latency, None if nothing has been observed."""
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> float | None:
+        """Estimates a quantile (0 <= q <= 1), interpolating linearly within the bucket it falls into.
+        Quantiles in the unbounded bucket are reported as the last bound."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+    def snapshot(self) -> dict[str, object]:
+        """Returns the histogram as a JSON-compatible dict, with cumulative bucket counts."""
+        cumulative = 0
+        buckets = []
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+@dataclass
+class CommandStats:
+    """Statistics of one command sent to one address."""
+
+    count: int = 0
+    timeouts: int = 0
+    # Number of error responses by error name (see errcodes.py)
+    errors: Counter[str] = field(default_factory=Counter)
+    bytes_sent: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+@dataclass(frozen=True)
+class CommandEvent:
+    """A command and its outcome, as passed to the hooks of Metrics."""
+
+    port: str | None
+    address: str
+    command: str
+    latency: float
+    bytes_sent: int
+    status: Status | None
+
+    @property
+    def timed_out(self) -> bool:
+        """Whether no response arrived."""
+        return self.status is None
+
+    @property
+    def error(self) -> str | None:
+        """Name of the error reported by the device (see errcodes.py), None if there was none."""
+        status = self.status
+        if status is None or isinstance(status, dict) or status[1] != "GS" or status[2] == "0":
+            return None
+        return error_codes.get(status[2], f"Unknown error {status[2]}")
+
+
+def _labels(**labels: object) -> str:
+    """Formats Prometheus labels."""
+    def escape(value: object) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Metrics:
+    """Collects statistics of every command sent through the controllers it is given to.
+
+    Pass the same Metrics to several controllers (Controller(port, metrics=metrics)) to collect
+    those of a whole rig, the statistics are kept per port, address and command. Hooks are called
+    with a CommandEvent after every command, e.g. to forward it to another monitoring system."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.commands: dict[tuple[str | None, str, str], CommandStats] = {}
+        # Bytes written to and read from each port
+        self.bytes_sent: Counter[str | None] = Counter()
+        self.bytes_received: Counter[str | None] = Counter()
+        self.hooks: list[Callable[[CommandEvent], None]] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[CommandEvent], None]) -> None:
+        """Registers a function to be called with a CommandEvent after every command."""
+        self.hooks.append(hook)
+
+    def record(self,
+               port: str | None,
+               address: str,
+               instruction: bytes,
+               latency: float,
+               bytes_sent: int,
+               status: Status | None) -> None:
+        """Records a command and its response (None if there was none)."""
+        # Only the instruction counts, not its parameter (e.g. the direction of "ho")
+        event = CommandEvent(port, address, instruction[:2].decode(), latency, bytes_sent, status)
+        with self._lock:
+            key = (port, address, event.command)
+            stats = self.commands.get(key)
+            if stats is None:
+                stats = self.commands[key] = CommandStats(latency=LatencyHistogram(self.buckets))
+            stats.count += 1
+            stats.bytes_sent += bytes_sent
+            stats.latency.observe(latency)
+            if event.timed_out:
+                stats.timeouts += 1
+            elif (error := event.error) is not None:
+                stats.errors[error] += 1
+        for hook in self.hooks:
+            hook(event)
+
+    def record_sent(self, port: str | None, count: int) -> None:
+        """Records bytes written to a port."""
+        with self._lock:
+            self.bytes_sent[port] += count
+
+    def record_received(self, port: str | None, count: int) -> None:
+        """Records bytes read from a port."""
+        with self._lock:
+            self.bytes_received[port] += count
+
+    def get(self, address: str, command: str, port: str | None = None) -> CommandStats | None:
+        """Returns the statistics of a command sent to an address, None if it has not been sent.
+        The port can be left out if only one controller reports to these metrics."""
+        for (stats_port, stats_address, stats_command), stats in self.commands.items():
+            if (stats_address, stats_command) == (address, command) and port in (None, stats_port):
+                return stats
+        return None
+
+    def reset(self) -> None:
+        """Forgets all statistics collected so far."""
+        with self._lock:
+            self.commands.clear()
+            self.bytes_sent.clear()
+            self.bytes_received.clear()
+
+    def snapshot(self) -> dict[str, object]:
+        """Returns all statistics as a JSON-compatible dict."""
+        with self._lock:
+            commands = [{"port": port,
+                         "address": address,
+                         "command": command,
+                         "count": stats.count,
+                         "timeouts": stats.timeouts,
+                         "errors": dict(stats.errors),
+                         "bytes_sent": stats.bytes_sent,
+                         "latency": stats.latency.snapshot()}
+                        for (port, address, command), stats in sorted(self.commands.items(), key=lambda item: str(item[0]))]
+            ports = sorted(set(self.bytes_sent) | set(self.bytes_received), key=str)
+            wire = [{"port": port, "bytes_sent": self.bytes_sent[port], "bytes_received": self.bytes_received[port]}
+                    for port in ports]
+        return {"commands": commands, "wire": wire}
+
+    def to_json(self, **kwargs) -> str:
+        """Returns all statistics as JSON, keyword arguments are passed on to json.dumps()."""
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "elliptec") -> str:
+        """Returns all statistics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, description: str) -> str:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            return f"{prefix}_{name}"
+
+        name = metric("commands_total", "counter", "Commands sent.")
+        for entry in snapshot["commands"]:
+            lines.append(f"{name}{_labels(port=entry['port'], address=entry['address'], command=entry['command'])} {entry['count']}")
+        name = metric("command_timeouts_total", "counter", "Commands that got no response.")
+        for entry in snapshot["commands"]:
+            lines.append(f"{name}{_labels(port=entry['port'], address=entry['address'], command=entry['command'])} {entry['timeouts']}")
+        name = metric("command_errors_total", "counter", "Commands answered with an error status.")
+        for entry in snapshot["commands"]:
+            for error, count in sorted(entry["errors"].items()):
+                labels = _labels(port=entry["port"], address=entry["address"], command=entry["command"], error=error)
+                lines.append(f"{name}{labels} {count}")
+        name = metric("command_latency_seconds", "histogram", "Time from sending a command to receiving its response.")
+        for entry in snapshot["commands"]:
+            labels = {"port": entry["port"], "address": entry["address"], "command": entry["command"]}
+            for bound, count in entry["latency"]["buckets"]:
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+            lines.append(f"{name}_sum{_labels(**labels)} {entry['latency']['sum']}")
+            lines.append(f"{name}_count{_labels(**labels)} {entry['latency']['count']}")
+        name = metric("bytes_sent_total", "counter", "Bytes written to the port.")
+        for entry in snapshot["wire"]:
+            lines.append(f"{name}{_labels(port=entry['port'])} {entry['bytes_sent']}")
+        name = metric("bytes_received_total", "counter", "Bytes read from the port.")
+        for entry in snapshot["wire"]:
+            lines.append(f"{name}{_labels(port=entry['port'])} {entry['bytes_received']}")
+        return "\n".join(lines) + "\n"
@@ -1,84 +1,307 @@
 """A module that contains the Motor class, which is the base class for all motors."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from abc import ABC
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable, Iterator
 
+from .cache import InfoCache
+from .calibration import CalibrationStore, MoveModel, move_kind
 from .cmd import get_, set_, mov_, do_
 from .controller import Controller
-from .tools import Status, error_check, move_check
+from .devices import devices
+from .tools import Reply, Status, error_check, move_check
 from .errors import ExternalDeviceNotFound
+from .moves import MoveHandle
+from .scheduler import Priority
+from .state import StateCache
 
 logger = logging.getLogger(__name__)
 
+# Instructions that move the motor, which invalidate its cached position
+_move_instructions = frozenset(mov_.values())
+# Requests that can be answered from the state cache, by the code of their response
+_cached_requests = {"position": "PO", "stepsize": "GJ", "home_offset": "HO"}
+
+# Shortest interval between position requests while the motor stands still
+MIN_IDLE_INTERVAL = 0.01
+
+# Read timeout (in seconds) for instructions that are answered right away
+QUERY_TIMEOUT = 0.25
+# Moves are waited for this many times their expected duration, plus QUERY_TIMEOUT
+MOVE_TIMEOUT_FACTOR = 1.5
+# Instructions that may take longer than a query but do not move the motor, waited for as long as the port's timeout
+_slow_instructions = frozenset({do_["save_user_data"]})
+
+
+def _stop_condition(until: float | Callable[[], bool] | MoveHandle | None) -> Callable[[], bool]:
+    """Turns the until argument of Motor.stream_positions() into a callable."""
+    if until is None:
+        return lambda: False
+    if isinstance(until, MoveHandle):
+        return until.done
+    if callable(until):
+        return until
+    deadline = time.monotonic() + until
+    return lambda: time.monotonic() >= deadline
+
 
 class Motor(ABC):
     """A class that represents a general motor. Each device inherits from this class."""
 
-    def __init__(self, controller: Controller, address: str = "0", debug: bool = True) -> None:
+    def __init__(self, controller: Controller, address: str = "0", debug: bool | None = None, info_cache: InfoCache | None = None, serial_no: str | None = None, state_max_age: float | None = 0.0) -> None:
         # the controller object which services the COM port
         self.controller = controller
         # self.address is kept as a 0-F string and encoded in send_instruction()
         self.address = address
-        self.debug = debug
+        # Logging and checking of every response follows the controller unless given
+        self.debug = controller.debug if debug is None else debug
+        self.info_cache = info_cache
+        # Whether self.info has been confirmed by the device (it has not if it comes from the cache)
+        self.info_validated = True
 
         self.last_position: int | str | None = None
+        # Position, jog step and home offset as last reported by the device (see StateCache)
+        self.state = StateCache(state_max_age)
+        # Velocity in percent of the maximum, None until it has been read or set
+        self.velocity: int | None = None
+        # Measured timing of the motor (see calibrate() and load_calibration()), None if not calibrated
+        self.calibration: MoveModel | None = None
+
+        cached_info = None
+        if info_cache is not None:
+            cached_info = info_cache.get(controller.port, address, serial_no)
 
-        # Load motor info on creation
-        self.load_motor_info()
+        if cached_info is not None:
+            # Use the cached info now, the device is asked for it along with the first command
+            self._apply_info(cached_info)
+            self.info_validated = False
+        else:
+            # Load motor info on creation
+            self.load_motor_info()
 
     def load_motor_info(self) -> None:
         """Asks motor for info and load response into properties other methods can check later."""
+        self.info_validated = True
         info = self.get("info")
+        self._store_info(info)
+
+    def validate_info(self) -> None:
+        """Makes sure info from the cache belongs to the device on the bus, asking the device for it once."""
+        if not self.info_validated:
+            self.load_motor_info()
+
+    async def validate_info_async(self) -> None:
+        """Asynchronous counterpart of validate_info()."""
+        if not self.info_validated:
+            self.info_validated = True
+            info = await self.controller.send_instruction_async(get_["info"], address=self.address)
+            self._store_info(info)
+
+    def _store_info(self, info: Status | None) -> None:
+        """Loads an info response into properties, updating the cache if there is one."""
         if info is None:
+            if self.info_cache is not None:
+                self.info_cache.invalidate(self.controller.port, self.address)
             raise ExternalDeviceNotFound
-        else:
-            self.info = info
+        if self.info_cache is not None:
+            cached_info = self.info_cache.get(self.controller.port, self.address)
+            if cached_info is not None and cached_info["Serial No."] != info["Serial No."]:
+                logger.warning("Cached info for address %s was for device %s, found %s.",
+                               self.address, cached_info["Serial No."], info["Serial No."])
+            if cached_info != info:
+                self.info_cache.put(self.controller.port, info)
+        self._apply_info(info)
+
+    def _apply_info(self, info: dict[str, object]) -> None:
+        """Loads info into properties other methods can check later."""
+        self.info = info
+
+        # TODO: Figure out which variables require extracting from info
+        self._range = self.info["Range"]
+        self._pulse_per_rev = self.info["Pulse/Rev"]
+        self.serial_no = self.info["Serial No."]
+        self._motor_type = self.info["Motor Type"]
+
+    # Positions are converted with these, so cached info is validated before they are used
+    @property
+    def range(self) -> int:
+        """Range of the motor from its info."""
+        self.validate_info()
+        return self._range
+
+    @property
+    def pulse_per_rev(self) -> int:
+        """Pulses per revolution (or per unit of the range) of the motor from its info."""
+        self.validate_info()
+        return self._pulse_per_rev
+
+    @property
+    def motor_type(self) -> int:
+        """Motor type from the info of the motor (see devices.py)."""
+        self.validate_info()
+        return self._motor_type
+
+    def send_instruction(self, instruction: bytes, message: int | str | None = None, priority: Priority = Priority.USER) -> Status | None:
+        """Sends an instruction to the motor, with the given priority (see Priority). Returns the response from the motor."""
+        # Info from the cache must belong to the device on the bus
+        self.validate_info()
+
+        timeout = self.timeout_for(instruction, message)
+        if instruction in _move_instructions:
+            self.state.invalidate("PO")
+        response = self.controller.send_instruction(instruction, address=self.address, message=message, timeout=timeout,
+                                                    priority=priority)
+        self._record(instruction, message, response)
+
+        return response
+
+    def _record(self, instruction: bytes, message: int | str | None, response: Status | None) -> None:
+        """Updates the state cache from the response to an instruction."""
+        self.state.update(response)
+        if not isinstance(response, tuple):
+            return
+        if response[1] == "GV":
+            self.velocity = response[2]
+        elif response[1:] == ("GS", "0"):
+            # Settings are only confirmed, the value is known though
+            if instruction == set_["velocity"] and isinstance(message, str):
+                self.velocity = int(message, 16)
+            elif instruction == set_["stepsize"] and isinstance(message, int):
+                self.state.put(Reply(self.address, "GJ", message))
+            elif instruction == set_["home_offset"] and isinstance(message, int):
+                self.state.put(Reply(self.address, "HO", message))
+
+    # Timing of moves
+    @property
+    def max_position(self) -> int:
+        """Length of the full range of the motor in pulses: the last slot of sliders, one revolution of rotators."""
+        slots = devices.get(self.motor_type, {}).get("positions")
+        if slots:
+            return slots[-1]
+        if self.motor_type in (14, 18):
+            return self.pulse_per_rev
+        return self.pulse_per_rev * self.range
+
+    def move_duration(self, distance: int, velocity: int | None = None) -> float:
+        """Expected duration (in seconds) of a move over the given distance in pulses, at the given velocity
+        (in percent, the motor's velocity if None, 100 if that is unknown). Based on travel_time in devices.py."""
+        travel_time = devices.get(self.motor_type, {}).get("travel_time", 1.0)
+        velocity = velocity or self.velocity or 100
+        return min(abs(distance), self.max_position) / (self.max_position or 1) * travel_time * 100 / velocity
+
+    def load_calibration(self, store: CalibrationStore) -> bool:
+        """Uses the timing model of the motor from the store (see calibrate()). Returns whether there was one.
+        The velocity of the motor is read as well, as it may have changed since the calibration."""
+        self.calibration = store.get(self.serial_no)
+        if self.calibration is None:
+            return False
+        self.get_velocity()
+        return True
+
+    def estimate_move_time(self, target: int, req: str = "absolute") -> float:
+        """Expected time (in seconds) from sending a move until its response arrives: an absolute move to
+        the target position in pulses, or a relative move by target pulses. For other moves (see Motor.move())
+        the target is ignored. Measured by calibrate(), else estimated from travel_time in devices.py."""
+        if req not in mov_:
+            raise ValueError(f"Invalid Command: {req}")
+        return self._move_time(mov_[req], target)
+
+    def _move_time(self, instruction: bytes, message: int | str | None) -> float:
+        """Expected time from sending a move instruction until its response arrives."""
+        return self._distance_time(instruction, self._move_distance(instruction, message))
+
+    def _distance_time(self, instruction: bytes, distance: int) -> float:
+        """Expected time from sending a move instruction over the distance (in pulses) until its response arrives."""
+        if self.calibration is not None:
+            estimate = self.calibration.estimate(move_kind(instruction), distance, self.velocity)
+            if estimate is not None:
+                return estimate
+        return self.move_duration(distance)
 
-            # TODO: Figure out which variables require extracting from info
-            self.range = self.info["Range"]
-            self.pulse_per_rev = self.info["Pulse/Rev"]
-            self.serial_no = self.info["Serial No."]
-            self.motor_type = self.info["Motor Type"]
+    def _move_distance(self, instruction: bytes, message: int | str | None) -> int:
+        """Longest distance (in pulses) a move instruction can take the motor over, as far as it is known."""
+        if instruction == mov_["relative"] and isinstance(message, int):
+            return abs(message)
+        entry = self.state.entries.get("PO")
+        if instruction == mov_["absolute"] and isinstance(message, int) and entry is not None:
+            # The last known position, however old: the motor has not moved since
+            return abs(message - entry[0][2])
+        entry = self.state.entries.get("GJ")
+        if instruction in (mov_["forward"], mov_["backward"]) and entry is not None:
+            return abs(entry[0][2])
+        return self.max_position
 
-    def send_instruction(self, instruction: bytes, message: int | str | None = None) -> Status | None:
-        """Sends an instruction to the motor. Returns the response from the motor."""
-        response = self.controller.send_instruction(instruction, address=self.address, message=message)
+    def timeout_for(self, instruction: bytes, message: int | str | None = None) -> float | None:
+        """Read timeout (in seconds) for the response to an instruction, None to use the port's timeout.
+
+        Queries and settings are answered right away and time out after QUERY_TIMEOUT. Moves time out
+        after MOVE_TIMEOUT_FACTOR times their expected duration (see estimate_move_time()) plus QUERY_TIMEOUT,
+        but not before the port's timeout while the velocity of the motor is not known (calibrated or not)."""
+        if instruction in _slow_instructions:
+            return None
+        if instruction not in _move_instructions:
+            return QUERY_TIMEOUT
+        timeout = QUERY_TIMEOUT + MOVE_TIMEOUT_FACTOR * self._move_time(instruction, message)
+        if self.velocity is None:
+            # The motor may have been set to move slower, and saved that setting, also since its calibration
+            timeout = max(timeout, self.controller.timeout or 0)
+        return timeout
+
+    async def send_instruction_async(self, instruction: bytes, message: int | str | None = None) -> Status | None:
+        """Sends an instruction to the motor without blocking the event loop. Requires an AsyncController."""
+        await self.validate_info_async()
+
+        timeout = self.timeout_for(instruction, message)
+        if instruction in _move_instructions:
+            self.state.invalidate("PO")
+        response = await self.controller.send_instruction_async(instruction, address=self.address, message=message,
+                                                                timeout=timeout)
+        self._record(instruction, message, response)
 
         return response
 
     # Action functions
-    def _execute(self, command_dict: dict[str, bytes], req: str, data: int | str | None = None, check_fn: Callable[[Status | None], None] = error_check) -> Status | None:
+    def _execute(self, command_dict: dict[str, bytes], req: str, data: int | str | None = None, check_fn: Callable[[Status | None], None] = error_check, priority: Priority = Priority.USER) -> Status | None:
         """Looks up and executes a command from the given dictionary."""
         if req not in command_dict:
             logger.error("Invalid Command: %s", req)
             return None
-        status = self.send_instruction(command_dict[req], message=data)
+        status = self.send_instruction(command_dict[req], message=data, priority=priority)
         if self.debug:
             check_fn(status)
         return status
 
-    def move(self, req: str = "home", data: int | str = "") -> Status | None | bool:
+    def move(self, req: str = "home", data: int | str = "", wait: bool = True, priority: Priority = Priority.USER) -> Status | None | bool | MoveHandle:
         """Wrapper function to easily enable access to movement.
         Expects:
         req - Name of request
         data - Parameters to be sent after address and request
+        wait - If False, returns a MoveHandle right away instead of waiting for the move to finish
+        priority - Priority of the move (see Priority), Priority.SAFETY stops the move in progress first
         """
         # Try to translate command to instruction
         if req not in mov_:
             logger.error("Invalid Command: %s", req)
             return False
 
+        if not wait:
+            return MoveHandle(self, req, data, priority=priority)
+
         instruction = mov_[req]
 
-        status = self.send_instruction(instruction, message=data)
+        status = self.send_instruction(instruction, message=data, priority=priority)
         if self.debug:
             move_check(status)
         return status
 
     def get(self, req: str = "status", data: int | str = "") -> Status | None:
-        """Generates get instructions from commands."""
+        """Generates get instructions from commands. The position, jog step and home offset are
+        answered from the state cache while it holds them (see state_max_age)."""
+        if req in _cached_requests and (status := self.state.get(_cached_requests[req])) is not None:
+            return status
         return self._execute(get_, req, data=data)
 
     def set(self, req: str = "", data: int | str = "") -> Status | None:
@@ -89,6 +312,34 @@ class Motor(ABC):
         """Generates do instructions from commands."""
         return self._execute(do_, req)
 
+    # Asynchronous action functions (require an AsyncController)
+    async def _execute_async(self, command_dict: dict[str, bytes], req: str, data: int | str | None = None, check_fn: Callable[[Status | None], None] = error_check) -> Status | None:
+        """Looks up and executes a command from the given dictionary, awaiting the response."""
+        if req not in command_dict:
+            logger.error("Invalid Command: %s", req)
+            return None
+        status = await self.send_instruction_async(command_dict[req], message=data)
+        if self.debug:
+            check_fn(status)
+        return status
+
+    async def move_async(self, req: str = "home", data: int | str = "") -> Status | None | bool:
+        """Asynchronous counterpart of move()."""
+        if req not in mov_:
+            logger.error("Invalid Command: %s", req)
+            return False
+        return await self._execute_async(mov_, req, data=data, check_fn=move_check)
+
+    async def get_async(self, req: str = "status", data: int | str = "") -> Status | None:
+        """Asynchronous counterpart of get()."""
+        if req in _cached_requests and (status := self.state.get(_cached_requests[req])) is not None:
+            return status
+        return await self._execute_async(get_, req, data=data)
+
+    async def set_async(self, req: str = "", data: int | str = "") -> Status | None:
+        """Asynchronous counterpart of set()."""
+        return await self._execute_async(set_, req, data=data)
+
     # Wrapper functions
     def home(self, clockwise: bool = True) -> Status | None | bool:
         """Wrapper function to easily enable access to homing."""
@@ -107,10 +358,119 @@ class Motor(ABC):
             if self.debug:
                 logger.debug("Address successfully changed from %s to %s.", old_address, new_address)
 
+    def stop(self) -> None:
+        """Stops the motor, including a move that was started without waiting for it. The stop jumps the
+        queue of requests to the motor and interrupts a move in progress (see Priority.SAFETY)."""
+        move = self.controller.moves.get(self.address)
+        if move is not None:
+            move.cancel()
+        else:
+            self.state.invalidate("PO")
+            self._execute(do_, "stop", priority=Priority.SAFETY)
+
+    def get_velocity(self) -> int | None:
+        """Reads the velocity of the motor, in percent of the maximum."""
+        status = self.get("velocity")
+        if status and status[1] == "GV":
+            return status[2]
+        return None
+
+    def set_velocity(self, velocity: int) -> int | None:
+        """Sets the velocity of the motor, in percent of the maximum. Returns it once the motor confirms it.
+        Use save_user_data() to keep it after a power cycle."""
+        if not 1 <= velocity <= 100:
+            raise ValueError(f"Velocity must be between 1 and 100 percent, got {velocity}.")
+        status = self.set("velocity", f"{velocity:02X}")
+        if status and status[1:] == ("GS", "0"):
+            return velocity
+        return None
+
     def save_user_data(self) -> None:
         """Saves the user data to the motor."""
         self.do("save_user_data")
 
+    # Monitoring
+    def _position_value(self, position: int) -> float | int:
+        """Converts a position in pulses to the value yielded by stream_positions()."""
+        return position
+
+    def _sample_position(self) -> Status | None:
+        """Gets the position, also while a move started with wait=False is in progress."""
+        move = self.controller.moves.get(self.address)
+        if move is None or not move.request_position():
+            # Monitoring makes way for everything else
+            return self._execute(get_, "position", priority=Priority.BACKGROUND)
+        while not move.positions and not move.done():
+            time.sleep(0.001)
+        return move.positions.popleft() if move.positions else None
+
+    async def _sample_position_async(self) -> Status | None:
+        """Asynchronous counterpart of _sample_position()."""
+        move = self.controller.moves.get(self.address)
+        if move is None or not move.request_position():
+            return await self._execute_async(get_, "position")
+        while not move.positions and not move.done():
+            await asyncio.sleep(0.001)
+        return move.positions.popleft() if move.positions else None
+
+    def _next_interval(self, interval: float, rate: float | None, idle_interval: float, moving: bool) -> float:
+        """Interval until the next position sample: short while moving, growing while standing still."""
+        if moving:
+            return 0.0 if rate is None else 1 / rate
+        return min(max(interval * 2, MIN_IDLE_INTERVAL), idle_interval)
+
+    def stream_positions(self,
+                         rate: float | None = None,
+                         until: float | Callable[[], bool] | MoveHandle | None = None,
+                         idle_interval: float = 1.0) -> Iterator[tuple[float, float | int]]:
+        """Yields (time, position) samples, with the time from time.monotonic().
+
+        While the motor moves, the position is requested rate times per second (as often as the bus
+        allows if rate is None). While it stands still, the interval doubles up to idle_interval.
+        Stops when until is reached: a number of seconds, a callable returning True, or a MoveHandle
+        that has finished (the last sample is taken after that). Runs forever if until is None.
+        Positions are in pulses, or in user units for continuous motors."""
+        finished = _stop_condition(until)
+        interval = 0.0 if rate is None else 1 / rate
+        previous = None
+        while True:
+            stop = finished()
+            start = time.monotonic()
+            status = self._sample_position()
+            timestamp = time.monotonic()
+            position = status[2] if status and status[1] == "PO" else None
+            if position is not None:
+                yield timestamp, self._position_value(position)
+            if stop:
+                return
+            moving = self.address in self.controller.moves or position != previous
+            interval = self._next_interval(interval, rate, idle_interval, moving)
+            previous = position
+            time.sleep(max(start + interval - time.monotonic(), 0))
+
+    async def stream_positions_async(self,
+                                     rate: float | None = None,
+                                     until: float | Callable[[], bool] | MoveHandle | None = None,
+                                     idle_interval: float = 1.0) -> AsyncIterator[tuple[float, float | int]]:
+        """Asynchronous counterpart of stream_positions(). Requires an AsyncController."""
+        finished = _stop_condition(until)
+        interval = 0.0 if rate is None else 1 / rate
+        previous = None
+        while True:
+            stop = finished()
+            start = time.monotonic()
+            status = await self._sample_position_async()
+            timestamp = time.monotonic()
+            position = status[2] if status and status[1] == "PO" else None
+            if position is not None:
+                yield timestamp, self._position_value(position)
+            if stop:
+                return
+            moving = self.address in self.controller.moves or position != previous
+            interval = self._next_interval(interval, rate, idle_interval, moving)
+            previous = position
+            await asyncio.sleep(max(start + interval - time.monotonic(), 0))
+
     # TODO: To be implemented
     # set_forward_frequency(self, motor)
     # set_backward_frequency(self, motor)
@@ -0,0 +1,190 @@
+"""Module for moves that run in the background while the program goes on (see Motor.move(wait=False))."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+from .cmd import do_, get_, mov_
+from .errcodes import BUSY
+from .scheduler import Priority
+from .tools import Status, move_check
+
+if TYPE_CHECKING:
+    from .motor import Motor
+
+logger = logging.getLogger(__name__)
+
+
+class MoveHandle:
+    """A move that has been sent to a motor, but whose response may not have arrived yet.
+
+    The device answers a move only once it has finished, so while the move is in progress the
+    handle asks for the status of the device ("gs" command), which is Busy until then. Moves
+    of several motors on one controller can be in progress at the same time. A command sent
+    to a motor that is still moving waits for the move to finish first, only the position can
+    be asked for in the meantime (see request_position())."""
+
+    def __init__(self,
+                 motor: Motor,
+                 req: str = "home_clockwise",
+                 data: int | str = "",
+                 poll_interval: float = 0.05,
+                 priority: Priority = Priority.USER) -> None:
+        if req not in mov_:
+            raise ValueError(f"Invalid Command: {req}")
+        self.motor = motor
+        self.controller = motor.controller
+        self.address = motor.address
+        self.poll_interval = poll_interval
+        self.status: Status | None = None
+        self.busy = True
+        # Whether the response to the move has arrived, and whether the handle is done with the bus
+        self._answered = False
+        self._done = False
+        # Instructions sent during the move, whose responses have not arrived yet
+        self._expected: deque[bytes] = deque()
+        self._last_sent = 0.0
+        self._last_poll = 0.0
+        # Responses to position requests
+        self.positions: deque[Status] = deque()
+        self._last_sample: Status | None = None
+        # The handle may be checked on and cancelled from different threads
+        self._lock = threading.RLock()
+
+        motor.validate_info()
+        self.instruction = mov_[req]
+        self._command = self.controller._encode(self.instruction, self.address, data)
+        with self.controller.request((self.address,), priority):
+            motor.state.invalidate("PO")
+            self.started = time.perf_counter()
+            # Whether a safety request came in while the move was being prepared
+            stop = self.controller.start_move(self._command, {self.address: self.instruction}, move=self)
+        if stop:
+            self.interrupt()
+
+    def done(self) -> bool:
+        """Returns whether the move has finished, without waiting."""
+        if self._done:
+            return True
+        with self._lock:
+            return self._check()
+
+    def _check(self) -> bool:
+        """Handles the responses that have arrived and polls the device, holding the lock."""
+        if self._done:
+            return True
+
+        self.controller.poll_responses()
+        for status in self.controller.take_responses(self.address):
+            expected = self._expected[0] if self._expected else None
+            if expected == get_["position"] and not isinstance(status, dict) and status[1] == "PO":
+                # Responses arrive in order. Should the response to the move come first, both carry the
+                # same position (the move has ended), so mistaking one for the other does not matter.
+                self._expected.popleft()
+                self.positions.append(status)
+                self._last_sample = status
+            elif isinstance(status, dict) or status[1] != "GS":
+                # The response to the move itself
+                self._answer(status)
+            elif expected is not None and status[2] in (BUSY, "0"):
+                # The response to an instruction sent during the move
+                self._expected.popleft()
+                if expected == get_["position"]:
+                    self.positions.append(status)
+                self.busy = status[2] == BUSY
+                if not self.busy and not self._answered:
+                    # The device is idle, but its response to the move has not been told apart (it was
+                    # taken for the response to a position request, which came after it) or never came
+                    self._answer(self._last_sample or status)
+            elif not self._answered:
+                # The move was refused
+                self._answer(status)
+            else:
+                logger.debug("Discarding late response: %s", status)
+
+        now = time.perf_counter()
+        timeout = self.controller.timeout
+        if self._expected and timeout is not None and now - self._last_sent > timeout:
+            if not self._answered:
+                logger.error("Motor at address %s stopped responding during a move.", self.address)
+                self._answer(None)
+            self._expected.clear()
+        if self._answered and not self._expected:
+            # Only let go of the bus once every response has arrived, so none can be mistaken for another
+            self._finish()
+        elif not self._answered and get_["status"] not in self._expected and now - self._last_poll >= self.poll_interval:
+            self._send(get_["status"])
+            self._last_poll = now
+        return self._done
+
+    def _send(self, instruction: bytes) -> None:
+        """Sends an instruction that the device answers right away."""
+        self.controller.write_command(self.controller._encode(instruction, self.address))
+        self._expected.append(instruction)
+        self._last_sent = time.perf_counter()
+
+    def request_position(self) -> bool:
+        """Asks the moving motor for its position, the response is added to positions once it arrives
+        (see done()). Returns False if the move has already finished."""
+        with self._lock:
+            if self._done:
+                return False
+            self._send(get_["position"])
+            return True
+
+    def _answer(self, status: Status | None) -> None:
+        """Records the outcome of the move."""
+        self.status = status
+        self.busy = False
+        self._answered = True
+        self.finished = time.perf_counter()
+        self.motor.state.update(status)
+        if self.controller.metrics is not None:
+            self.controller.metrics.record(self.controller.port, self.address, self.instruction,
+                                           self.finished - self.started, len(self._command), status)
+        if self.motor.debug:
+            move_check(status)
+
+    def _finish(self) -> None:
+        """Hands the motor back to other commands."""
+        self._done = True
+        self.controller.end_move((self.address,), move=self)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Waits until the move has finished or the timeout (in seconds) expires. Returns whether it finished."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.done():
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(min(self.poll_interval, 0.005))
+        return True
+
+    def result(self, timeout: float | None = None) -> Status | None:
+        """Waits for the move to finish and returns the response of the motor."""
+        if not self.wait(timeout):
+            raise TimeoutError(f"Move of motor at address {self.address} did not finish within {timeout} s.")
+        return self.status
+
+    def interrupt(self) -> bool:
+        """Sends the stop command, without waiting for the motor to stop. Returns False if the move has
+        already finished."""
+        with self._lock:
+            if self.done():
+                return False
+            if do_["stop"] not in self._expected:
+                self._send(do_["stop"])
+            return True
+
+    def cancel(self) -> bool:
+        """Stops the move. Returns False if it had already finished."""
+        if not self.interrupt():
+            return False
+        self.wait()
+        return True
+
+    def __repr__(self) -> str:
+        state = f"done, {self.status}" if self._done else "in progress"
+        return f"<MoveHandle address={self.address} {state}>"
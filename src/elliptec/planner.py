@@ -0,0 +1,130 @@
+"""Module for ordering the points of a sweep so that a motor travels as little as possible between them
+(see ContinuousMotor.plan_trajectory() and Slider.plan_sequence())."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, NamedTuple, TypeVar
+
+from .cmd import mov_
+
+if TYPE_CHECKING:
+    from .motor import Motor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Plan(NamedTuple):
+    """Order in which to visit the points of a sweep: order[k] is the index (in the given sequence) of the
+    k-th point to visit, positions are their positions in pulses in that order. duration is the expected
+    time (in seconds) of all moves, given_duration that of visiting the points in the given order."""
+
+    order: list[int]
+    positions: list[int]
+    duration: float
+    given_duration: float
+
+    def reorder(self, items: Sequence[T]) -> list[T]:
+        """Puts items given for the points (e.g. their targets) into the order they are visited in."""
+        return [items[index] for index in self.order]
+
+
+def shortest_step(step: int, period: int) -> int:
+    """The step (in pulses) between the same two positions of a rotator the shorter way round."""
+    return (step + period // 2) % period - period // 2
+
+
+def wraps(motor: Motor) -> bool:
+    """Whether the positions of a motor wrap around after a revolution (rotators)."""
+    return motor.motor_type in (14, 18)
+
+
+def start_position(motor: Motor) -> int:
+    """The last known position of a motor (however old, it has not moved since), read from it if unknown."""
+    entry = motor.state.entries.get("PO")
+    if entry is not None:
+        return entry[0][2]
+    status = motor.get("position")
+    if isinstance(status, tuple) and status[1] == "PO":
+        return status[2]
+    logger.debug("Position of motor at address %s unknown, planning from 0.", motor.address)
+    return 0
+
+
+def plan_visits(motor: Motor, positions: Sequence[int], start: int | None = None) -> Plan:
+    """Orders positions (in pulses) so that the motor, starting at start (its current position by default),
+    reaches all of them in the shortest time.
+
+    Every move takes a fixed time plus a time per pulse travelled (see Motor.estimate_move_time()), so the
+    shortest order is the one with the least travel. Along a bounded range (linear stages, irises, sliders)
+    that is a sweep to one end of the points and back to the other, whichever end is closer. Rotators may
+    pass through zero, and take each step the shorter way round (see Trajectory, wrap): they sweep around one
+    way and may turn back once, whichever way round is shortest."""
+    positions = [int(position) for position in positions]
+    if start is None:
+        start = start_position(motor)
+    if wraps(motor):
+        order = _circular_order(positions, start, motor.pulse_per_rev)
+        instruction = mov_["relative"]
+    else:
+        order = _linear_order(positions, start)
+        instruction = mov_["absolute"]
+    planned = [positions[index] for index in order]
+    return Plan(order, planned, _duration(motor, instruction, start, planned), _duration(motor, instruction, start, positions))
+
+
+def _linear_order(positions: list[int], start: int) -> list[int]:
+    """Shortest order along a bounded range: down to the lowest point first, or up to the highest first."""
+    ascending = sorted(range(len(positions)), key=lambda index: positions[index])
+    if not ascending:
+        return []
+    lowest, highest = positions[ascending[0]], positions[ascending[-1]]
+    here = [index for index in ascending if positions[index] == start]
+    below = [index for index in ascending if positions[index] < start]
+    above = [index for index in ascending if positions[index] > start]
+    # Going down first travels to the lowest point and back up to the highest (if there is any above start)
+    down_first = (start - lowest) + (highest - lowest if above else 0)
+    up_first = (highest - start) + (highest - lowest if below else 0)
+    if below and down_first < up_first:
+        return here + below[::-1] + above
+    return here + above + below[::-1]
+
+
+def _circular_order(positions: list[int], start: int, period: int) -> list[int]:
+    """Shortest order around a circle: forwards to some point and back the other way to the rest, or the
+    other way round. Every candidate turning point is tried."""
+    if not positions:
+        return []
+    # Distance of each point ahead of the start, going forwards
+    ahead = [(position - start) % period for position in positions]
+    forwards = sorted(range(len(positions)), key=lambda index: ahead[index])
+    distances = [ahead[index] for index in forwards]
+    count = len(forwards)
+    best, best_split, best_forwards_first = None, count, True
+    for split in range(count + 1):
+        # Forwards to the first split points, backwards to the rest (and the other way round)
+        reach_forwards = distances[split - 1] if split else 0
+        reach_backwards = period - distances[split] if split < count else 0
+        for forwards_first in (True, False):
+            first, second = (reach_forwards, reach_backwards) if forwards_first else (reach_backwards, reach_forwards)
+            # The first leg is travelled twice if the motor turns back for a second one
+            travel = first + second + (first if second else 0)
+            if best is None or travel < best:
+                best, best_split, best_forwards_first = travel, split, forwards_first
+    forward_leg, backward_leg = forwards[:best_split], forwards[best_split:][::-1]
+    return forward_leg + backward_leg if best_forwards_first else backward_leg + forward_leg
+
+
+def _duration(motor: Motor, instruction: bytes, start: int, positions: list[int]) -> float:
+    """Expected time of the moves through the positions."""
+    duration = 0.0
+    previous = start
+    for position in positions:
+        step = position - previous
+        if wraps(motor):
+            step = shortest_step(step, motor.pulse_per_rev)
+        duration += motor._distance_time(instruction, abs(step))
+        previous = position
+    return duration
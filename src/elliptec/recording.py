@@ -0,0 +1,204 @@
+"""Recording of the traffic on a port to a file, and replay of such recordings through a Controller.
+
+A recording starts with a header (magic and creation time), followed by one record per chunk of
+bytes written (TX) or read (RX): a fixed-size little-endian header with the timestamp in
+nanoseconds, the direction and the length, then the bytes themselves. Records are only ever
+appended, so a recording can be read (or memory-mapped) while it is still being written."""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import NamedTuple
+
+from .simulator import SimulatedBus
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ELLREC01"
+# Magic and creation time (ns since the epoch)
+HEADER = struct.Struct("<8sq")
+# Timestamp (ns, monotonic), direction and length of the bytes that follow
+RECORD = struct.Struct("<QBH")
+
+TX = 0
+RX = 1
+
+
+class Frame(NamedTuple):
+    """Bytes written to (TX) or read from (RX) a port."""
+
+    timestamp_ns: int
+    direction: int
+    data: bytes
+
+
+class TrafficRecorder:
+    """Appends the traffic on a port to a recording file (see Controller(record=...))."""
+
+    def __init__(self, path: str | os.PathLike, clock: Callable[[], int] = time.monotonic_ns) -> None:
+        self.path = path
+        self.clock = clock
+        # Unbuffered, so that every record reaches the file in one write, even if the program crashes
+        self._file = open(path, "ab", buffering=0)
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, time.time_ns()))
+        else:
+            _check_header(path)
+        # The reader thread records RX while commands are written from other threads
+        self._lock = threading.Lock()
+
+    def record(self, direction: int, data: bytes) -> None:
+        """Appends bytes written (TX) or read (RX), stamped with the current time."""
+        if not data:
+            return
+        timestamp = self.clock()
+        with self._lock:
+            # Chunks longer than a record can hold are split
+            for start in range(0, len(data), 0xFFFF):
+                chunk = data[start:start + 0xFFFF]
+                self._file.write(RECORD.pack(timestamp, direction, len(chunk)) + chunk)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the recording file is closed."""
+        return self._file.closed
+
+    def close(self) -> None:
+        """Closes the recording file."""
+        with self._lock:
+            self._file.close()
+
+
+def _check_header(path: str | os.PathLike) -> None:
+    """Raises ValueError if the file is not a recording."""
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+        raise ValueError(f"{os.fspath(path)} is not a traffic recording.")
+
+
+def read_recording(path: str | os.PathLike) -> list[Frame]:
+    """Returns all frames of a recording, in the order they were recorded. A truncated last record
+    (e.g. after a crash) is left out."""
+    _check_header(path)
+    frames = []
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        offset = HEADER.size
+        while offset + RECORD.size <= len(view):
+            timestamp, direction, length = RECORD.unpack_from(view, offset)
+            offset += RECORD.size
+            if offset + length > len(view):
+                break
+            frames.append(Frame(timestamp, direction, bytes(view[offset:offset + length])))
+            offset += length
+    return frames
+
+
+class RecordingPort:
+    """Wraps a serial port, recording everything written to and read from it.
+
+    Everything else is passed on to the wrapped port."""
+
+    def __init__(self, port, recorder: TrafficRecorder) -> None:
+        object.__setattr__(self, "_port", port)
+        object.__setattr__(self, "recorder", recorder)
+
+    def __getattr__(self, name: str):
+        return getattr(self._port, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        # e.g. the timeout, which Controller.read_timeout() changes
+        setattr(self._port, name, value)
+
+    def write(self, data: bytes) -> int | None:
+        """Writes to the port and records the bytes."""
+        self.recorder.record(TX, data)
+        return self._port.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        """Reads from the port and records the bytes."""
+        data = self._port.read(size)
+        self.recorder.record(RX, data)
+        return data
+
+    def read_until(self, expected: bytes = b"\n", size: int | None = None) -> bytes:
+        """Reads from the port and records the bytes."""
+        data = self._port.read_until(expected, size)
+        self.recorder.record(RX, data)
+        return data
+
+    def close(self) -> None:
+        """Closes the port and the recording."""
+        self._port.close()
+        self.recorder.close()
+
+
+class ReplayPort(SimulatedBus):
+    """A port that answers with the responses of a recording, to replay it through a Controller:
+    Controller(transport=ReplayPort("session.ellrec")).
+
+    Every write is matched against the next TX of the recording and the RX that followed it
+    arrive after the same delays, divided by speed (None to deliver them right away). With
+    strict=True, a write that differs from the recording raises ValueError, otherwise it is only
+    logged. Timeouts are scaled by the speed as well."""
+
+    def __init__(self,
+                 recording: str | os.PathLike | Iterable[Frame],
+                 speed: float | None = 1.0,
+                 strict: bool = True,
+                 timeout: float | None = 2,
+                 port: str = "replay://",
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("The replay speed must be positive.")
+        super().__init__((), time_scale=0.0 if speed is None else 1 / speed, timeout=timeout, port=port, clock=clock)
+        if isinstance(recording, (str, os.PathLike)):
+            recording = read_recording(recording)
+        self.frames = list(recording)
+        self.strict = strict
+        # Index of the next frame to replay
+        self.position = 0
+        # Anything read before the first write arrives right away
+        self._replay_rx(self.clock(), None)
+
+    @property
+    def finished(self) -> bool:
+        """Whether all frames of the recording have been replayed."""
+        return self.position >= len(self.frames)
+
+    def write(self, data: bytes) -> int:
+        """Matches the bytes against the recording and schedules the responses that followed."""
+        with self._condition:
+            now = self.clock()
+            self.bytes_written += len(data)
+            if self.finished:
+                self._mismatch(f"Write of {data!r} past the end of the recording.")
+                return len(data)
+            frame = self.frames[self.position]
+            if frame.data != data:
+                self._mismatch(f"Write of {data!r} where the recording has {frame.data!r}.")
+            self.position += 1
+            self._replay_rx(now, frame.timestamp_ns)
+            self._condition.notify_all()
+        return len(data)
+
+    def _mismatch(self, message: str) -> None:
+        """Reports a write that does not match the recording."""
+        if self.strict:
+            raise ValueError(message)
+        logger.warning(message)
+
+    def _replay_rx(self, now: float, sent_ns: int | None) -> None:
+        """Schedules the RX frames up to the next TX, relative to the TX recorded at sent_ns."""
+        while not self.finished and self.frames[self.position].direction == RX:
+            frame = self.frames[self.position]
+            delay = 0.0 if sent_ns is None else max(frame.timestamp_ns - sent_ns, 0) * 1e-9 * self.time_scale
+            # Kept in the order of the recording
+            arrival = max(now + delay, self._pending[-1][1] if self._pending else now)
+            self._pending.append((arrival, arrival, frame.data, None, arrival))
+            self.position += 1
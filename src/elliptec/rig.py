@@ -0,0 +1,285 @@
+"""Module for driving the devices on several buses (one Controller each) at once."""
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from types import TracebackType
+from typing import TypeVar
+
+from .cache import MemoryInfoCache
+from .calibration import CalibrationStore, MoveModel, calibrate
+from .cmd import get_
+from .controller import Controller
+from .iris import Iris
+from .linear import Linear
+from .motor import Motor
+from .rotator import Rotator
+from .scan import ADDRESSES, PROBE_TIMEOUT, find_ports, probe_bus
+from .shutter import Shutter
+from .slider import Slider
+from .tools import Status
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Class of the device objects created for each motor type found (see devices.py), Motor for others
+device_classes: dict[int, type[Motor]] = {6: Shutter, 9: Slider, 14: Rotator, 15: Iris, 18: Rotator, 20: Linear}
+
+# The bus whose worker the current thread is, if any
+_worker = threading.local()
+
+
+class Rig:
+    """The devices on several buses, each bus with a Controller of its own.
+
+    Every bus has a worker thread, which runs the work submitted for it in order. Operations on many
+    devices (home(), positions(), run()...) are fanned out to the workers, so that all buses are busy
+    at the same time: they take as long as on the slowest bus, not the sum of all. Devices are looked
+    up by name, serial number or port and address ("COM3:0" or ("COM3", "0")), e.g. rig["polarizer"].
+
+    With close_controllers=True, close() (or the end of a with block) closes the controllers as well."""
+
+    def __init__(self, controllers: Iterable[Controller] = (), close_controllers: bool = True) -> None:
+        self.controllers: list[Controller] = []
+        self.close_controllers = close_controllers
+        # Devices by name, in the order they were added
+        self.devices: dict[str, Motor] = {}
+        # Worker of each bus, by id of its controller
+        self._workers: dict[int, ThreadPoolExecutor] = {}
+        for controller in controllers:
+            self.add_controller(controller)
+
+    @classmethod
+    def from_controllers(cls,
+                         controllers: Iterable[Controller],
+                         addresses: str = ADDRESSES,
+                         timeout: float = PROBE_TIMEOUT,
+                         names: Mapping[str, str] | None = None,
+                         close_controllers: bool = True) -> Rig:
+        """Creates a rig with all devices found on the given controllers, which are probed in parallel (one
+        probe per bus, see probe_bus()). names maps serial numbers to the names of the devices, the others are named by port and address."""
+        rig = cls(controllers, close_controllers=close_controllers)
+        names = names or {}
+
+        def find(controller: Controller) -> list[Motor]:
+            records = probe_bus(controller, addresses=addresses, timeout=timeout)
+            # The devices are created from the info just probed, instead of asking each for it again
+            probed = MemoryInfoCache((record.port, record.info) for record in records)
+            devices = []
+            for record in records:
+                device = device_classes.get(record.motor_type, Motor)(controller, address=record.address,
+                                                                      debug=controller.debug, info_cache=probed,
+                                                                      serial_no=record.serial_no)
+                device.info_validated = True
+                devices.append(device)
+            return devices
+
+        for devices in _wait_all(rig.submit(controller, find, controller) for controller in rig.controllers):
+            for device in devices:
+                rig.add(device, names.get(device.serial_no))
+        return rig
+
+    @classmethod
+    def discover(cls,
+                 ports: Iterable[str] | None = None,
+                 addresses: str = ADDRESSES,
+                 timeout: float = PROBE_TIMEOUT,
+                 names: Mapping[str, str] | None = None,
+                 debug: bool = False) -> Rig:
+        """Opens the given ports (all available ones by default) and creates a rig with all devices
+        found behind them (see from_controllers()). Ports that cannot be opened are left out."""
+        if ports is None:
+            ports = find_ports()
+        ports = list(ports)
+        if not ports:
+            return cls()
+        with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+            controllers = list(executor.map(lambda port: Controller(port, debug=debug), ports))
+        return cls.from_controllers([controller for controller in controllers if controller.port is not None],
+                                    addresses=addresses, timeout=timeout, names=names)
+
+    # Buses and devices
+    def add_controller(self, controller: Controller) -> None:
+        """Adds a bus, starting its worker."""
+        if id(controller) in self._workers:
+            return
+        self.controllers.append(controller)
+        self._workers[id(controller)] = ThreadPoolExecutor(max_workers=1,
+                                                           thread_name_prefix=f"elliptec-rig-{controller.port}",
+                                                           initializer=_set_worker,
+                                                           initargs=(id(controller),))
+
+    def add(self, device: Motor, name: str | None = None) -> str:
+        """Adds a device (and its bus, if it is new) under the given name, by default its port and
+        address. Returns the name."""
+        if name is None:
+            name = f"{device.controller.port}:{device.address}"
+        if name in self.devices:
+            raise ValueError(f"There already is a device named {name}.")
+        self.add_controller(device.controller)
+        self.devices[name] = device
+        return name
+
+    def name_of(self, device: Motor) -> str:
+        """Returns the name of a device of the rig."""
+        for name, candidate in self.devices.items():
+            if candidate is device:
+                return name
+        raise KeyError(device)
+
+    def __getitem__(self, key: str | tuple[str, str]) -> Motor:
+        if isinstance(key, tuple):
+            key = f"{key[0]}:{key[1]}"
+        device = self.devices.get(key)
+        if device is not None:
+            return device
+        for device in self.devices.values():
+            if device.serial_no == key or f"{device.controller.port}:{device.address}" == key:
+                return device
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[Motor]:
+        return iter(self.devices.values())
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    # Running work on the buses
+    def submit(self, bus: Controller | Motor | str | tuple[str, str], fn: Callable[..., T], *args, **kwargs) -> Future[T]:
+        """Runs fn(*args, **kwargs) on the worker of a bus, given by its controller or one of its devices.
+        Work submitted from the worker of the bus itself is run right away, as it would wait forever otherwise."""
+        controller = bus if isinstance(bus, Controller) else self._device(bus).controller
+        if getattr(_worker, "bus", None) == id(controller):
+            future: Future[T] = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        return self._workers[id(controller)].submit(fn, *args, **kwargs)
+
+    def _device(self, key: Motor | str | tuple[str, str]) -> Motor:
+        """Looks up a device, which may be given as such."""
+        return key if isinstance(key, Motor) else self[key]
+
+    def _by_bus(self, devices: Iterable[Motor | str | tuple[str, str]] | None) -> dict[int, list[tuple[str, Motor]]]:
+        """Groups the given devices (all by default) by bus, as (name, device) pairs."""
+        if devices is None:
+            selected = list(self.devices.items())
+        else:
+            selected = [(self.name_of(device), device) for device in map(self._device, devices)]
+        buses: dict[int, list[tuple[str, Motor]]] = {}
+        for name, device in selected:
+            buses.setdefault(id(device.controller), []).append((name, device))
+        return buses
+
+    def _fan_out(self,
+                 work: Callable[[list[tuple[str, Motor]]], dict[str, T]],
+                 devices: Iterable[Motor | str | tuple[str, str]] | None,
+                 workers: bool = True) -> dict[str, T]:
+        """Runs work(devices of the bus) for every bus at once, returning the merged results by name.
+        Runs on the workers of the buses, or on threads of their own if workers is False."""
+        buses = self._by_bus(devices)
+        order = [name for members in buses.values() for name, _ in members]
+        if workers:
+            # Work for the bus of the calling worker runs right away, so the other buses get theirs first
+            members_by_bus = sorted(buses.items(), key=lambda item: item[0] == getattr(_worker, "bus", None))
+            futures = [self.submit(members[0][1], work, members) for _, members in members_by_bus]
+            results = _wait_all(futures)
+        else:
+            with ThreadPoolExecutor(max_workers=max(len(buses), 1)) as executor:
+                results = _wait_all(executor.submit(work, members) for members in buses.values())
+        merged = {name: result for bus_results in results for name, result in bus_results.items()}
+        return {name: merged[name] for name in order}
+
+    def run(self, fn: Callable[[Motor], T], devices: Iterable[Motor | str | tuple[str, str]] | None = None) -> dict[str, T]:
+        """Calls fn(device) for the given devices (all by default) and returns the results by name. The
+        devices of a bus take turns on its worker, the buses run in parallel."""
+        return self._fan_out(lambda members: {name: fn(device) for name, device in members}, devices)
+
+    # Operations on many devices
+    def home(self, clockwise: bool = True, devices: Iterable[Motor | str | tuple[str, str]] | None = None) -> dict[str, Status | None]:
+        """Homes the given devices (all by default) and returns their responses by name. All devices
+        move at the same time, also those on one bus."""
+        req = "home_clockwise" if clockwise else "home_anticlockwise"
+
+        def home_bus(members: list[tuple[str, Motor]]) -> dict[str, Status | None]:
+            handles = {name: device.move(req, wait=False) for name, device in members}
+            return {name: handle.result() for name, handle in handles.items()}
+
+        return self._fan_out(home_bus, devices)
+
+    def positions(self, devices: Iterable[Motor | str | tuple[str, str]] | None = None) -> dict[str, Status | None]:
+        """Reads the positions of the given devices (all by default), in pulses. Every bus is asked for
+        the positions of all its devices in one go (see Controller.send_many())."""
+
+        def read_bus(members: list[tuple[str, Motor]]) -> dict[str, Status | None]:
+            controller = members[0][1].controller
+            statuses = controller.send_many([(device.address, get_["position"], None) for _, device in members])
+            for (_, device), status in zip(members, statuses):
+                device.state.update(status)
+            return {name: status for (name, _), status in zip(members, statuses)}
+
+        return self._fan_out(read_bus, devices)
+
+    def calibrate(self,
+                  store: CalibrationStore | None = None,
+                  repeats: int = 2,
+                  devices: Iterable[Motor | str | tuple[str, str]] | None = None) -> dict[str, MoveModel]:
+        """Calibrates the timing of the given devices (all by default, see calibrate()), putting the models
+        into the store if one is given. The devices of a bus are calibrated one after another, so that
+        their moves do not disturb each other's timing."""
+        return self.run(lambda device: calibrate(device, store=store, repeats=repeats), devices)
+
+    def stop_all(self, devices: Iterable[Motor | str | tuple[str, str]] | None = None) -> dict[str, Status | None]:
+        """Stops the given devices (all by default) on all buses at once (see Controller.stop_all()).
+        Does not wait for the workers, which may be busy with the moves to stop."""
+
+        def stop_bus(members: list[tuple[str, Motor]]) -> dict[str, Status | None]:
+            controller = members[0][1].controller
+            responses = controller.stop_all([device.address for _, device in members])
+            return {name: responses[device.address] for name, device in members}
+
+        return self._fan_out(stop_bus, devices, workers=False)
+
+    # Closing
+    def close(self) -> None:
+        """Waits for the work submitted to the buses, stops the workers and closes the controllers
+        (with close_controllers=True)."""
+        for worker in self._workers.values():
+            worker.shutdown()
+        if self.close_controllers:
+            for controller in self.controllers:
+                controller.close_connection()
+
+    def __enter__(self) -> Rig:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<Rig {len(self.controllers)} buses, {len(self.devices)} devices>"
+
+
+def _set_worker(bus: int) -> None:
+    """Marks the current thread as the worker of a bus."""
+    _worker.bus = bus
+
+
+def _wait_all(futures: Iterable[Future[T]]) -> list[T]:
+    """Waits for all futures and returns their results in order. If any failed, its exception is
+    raised once all have finished."""
+    futures = list(futures)
+    wait(futures)
+    return [future.result() for future in futures]
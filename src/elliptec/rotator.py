@@ -1,20 +1,35 @@
 """Module for rotation mount (ELL14) or rotary stage (ELL18). Inherits from elliptec.ContinuousMotor."""
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from .continuous import ContinuousMotor
 from .tools import Status
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class Rotator(ContinuousMotor):
     """Class for rotation mounts such as a rotating mount (ELL14) or rotary stage (ELL18)."""
 
+    _vectorized = True
+
     def _pos_to_unit(self, position: int) -> float:
         """Converts position in pulses to angle in degrees."""
-        return round(position / self.pulse_per_rev * self.range, 4)
+        return round(self._pulses_to_units(position), 4)
 
     def _unit_to_pos(self, value: float) -> int:
         """Converts angle in degrees to position in pulses."""
-        return int(value / self.range * self.pulse_per_rev)
+        return int(self._units_to_pulses(value))
+
+    def _pulses_to_units(self, position: float | np.ndarray) -> float | np.ndarray:
+        """Converts positions in pulses to degrees without rounding, also numpy arrays."""
+        return position / self.pulse_per_rev * self.range
+
+    def _units_to_pulses(self, value: float | np.ndarray) -> float | np.ndarray:
+        """Converts degrees to positions in pulses without truncating, also numpy arrays."""
+        return value / self.range * self.pulse_per_rev
 
     # Public API
     def get_angle(self) -> float | None:
@@ -2,33 +2,123 @@
 from __future__ import annotations
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 
 import serial as s
 import serial.tools.list_ports as listports
+from serial.tools.list_ports_common import ListPortInfo
 from .controller import Controller
+from .devices import devices as device_models
 from .errors import ExternalDeviceNotFound
 from .motor import Motor
+from .timing import byte_time
 
 logger = logging.getLogger(__name__)
 
+# All addresses a device on a bus can have
+ADDRESSES = "0123456789ABCDEF"
+# Read timeout (in seconds) used when probing for devices, a present device answers well within it
+PROBE_TIMEOUT = 0.1
+# Length of the response to an info request ("0IN0E1140TTTTTTTT2019....\r\n")
+INFO_RESPONSE_BYTES = 35
+# USB (vendor ID, product ID) of the Elliptec interface boards (FTDI FT230X)
+ELLIPTEC_USB_IDS = {(0x0403, 0x6015)}
+# Devices found by probe_ports(), keyed by the USB serial number of the port
+_port_cache: dict[str, list[DeviceRecord]] = {}
+
+
+@dataclass(frozen=True)
+class DeviceRecord:
+    """A device found on a bus."""
+
+    port: str | None
+    address: str
+    motor_type: int
+    model: str | None
+    serial_no: str
+    firmware: str
+    info: dict[str, object]
+
+    @classmethod
+    def from_info(cls, port: str | None, info: dict[str, object]) -> DeviceRecord:
+        """Creates a record from a parsed info response."""
+        motor_type = info["Motor Type"]
+        return cls(port=port,
+                   address=info["Address"],
+                   motor_type=motor_type,
+                   model=device_models.get(motor_type, {}).get("name"),
+                   serial_no=info["Serial No."],
+                   firmware=info["Firmware"],
+                   info=info)
+
 # Scanning functions
 
 
-def find_ports() -> list[str]:
-    """Find all available ports with an Elliptec device connected."""
-    avail_ports = []
-    for port in listports.comports():
-        if port.serial_number:
-            try:
-                connection = s.Serial(port.device)
-                connection.close()
-                avail_ports.append(port)
-            except (OSError, s.SerialException):
-                logger.warning("%s unavailable.", port.device)
-    port_names = [port.device for port in avail_ports]
+def _matches_usb_ids(port: ListPortInfo, usb_ids: set[tuple[int, int]] | None) -> bool:
+    """Checks whether the USB vendor and product ID of a port are among the given ones."""
+    return usb_ids is None or (port.vid, port.pid) in usb_ids
+
+
+def _can_open(port: ListPortInfo) -> bool:
+    """Checks whether a port can be opened."""
+    try:
+        connection = s.Serial(port.device)
+        connection.close()
+        return True
+    except (OSError, s.SerialException):
+        logger.warning("%s unavailable.", port.device)
+        return False
+
+
+def find_ports(usb_ids: set[tuple[int, int]] | None = None) -> list[str]:
+    """Find all available ports with an Elliptec device connected. The ports are checked in parallel,
+    optionally only those with one of the given USB (vendor ID, product ID) pairs."""
+    candidates = [port for port in listports.comports() if port.serial_number and _matches_usb_ids(port, usb_ids)]
+    if not candidates:
+        return []
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        available = list(executor.map(_can_open, candidates))
+    port_names = [port.device for port, ok in zip(candidates, available) if ok]
     return port_names
 
 
+def probe_ports(usb_ids: set[tuple[int, int]] | None = ELLIPTEC_USB_IDS,
+                addresses: str = ADDRESSES,
+                timeout: float = PROBE_TIMEOUT,
+                use_cache: bool = False) -> dict[str, list[DeviceRecord]]:
+    """Finds the ports with Elliptec devices by probing the bus behind every candidate port (see probe_bus()),
+    all ports in parallel.
+
+    Returns a map of port names to the devices found behind them. With use_cache=True, ports whose USB
+    serial number has been probed successfully before are not probed again."""
+    candidates = [port for port in listports.comports() if port.serial_number and _matches_usb_ids(port, usb_ids)]
+    found: dict[str, list[DeviceRecord]] = {}
+
+    to_probe = []
+    for port in candidates:
+        if use_cache and port.serial_number in _port_cache:
+            # The port name may have changed since, the USB serial number does not
+            found[port.device] = [replace(record, port=port.device) for record in _port_cache[port.serial_number]]
+        else:
+            to_probe.append(port)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=len(to_probe)) as executor:
+            results = list(executor.map(lambda port: _probe_port(port.device, addresses, timeout), to_probe))
+        for port, records in zip(to_probe, results):
+            if records:
+                found[port.device] = records
+                _port_cache[port.serial_number] = records
+
+    return {port.device: found[port.device] for port in candidates if port.device in found}
+
+
+def clear_port_cache() -> None:
+    """Forgets the results of previous probe_ports(use_cache=True) calls."""
+    _port_cache.clear()
+
+
 def scan_for_devices(controller: Controller, start_address: int = 0, stop_address: int = 0, debug: bool = True) -> list[dict[str, object]]:
     """Scan for devices on a controller. Returns a list of dictionaries with device info and controller object."""
     devices: list[dict[str, object]] = []
@@ -45,3 +135,39 @@ def scan_for_devices(controller: Controller, start_address: int = 0, stop_addres
         except ExternalDeviceNotFound:
             pass
     return devices
+
+
+def probe_bus(controller: Controller, addresses: str = ADDRESSES, timeout: float = PROBE_TIMEOUT) -> list[DeviceRecord]:
+    """Finds the devices on a controller by sending an info request to every address at once.
+
+    The responses share the line back to the host, so the read waits as long as it takes to transfer the
+    requests and a response from every address, plus timeout."""
+    wire_time = (3 + INFO_RESPONSE_BYTES) * len(addresses) * byte_time(controller.s)
+    with controller.read_timeout(wire_time + timeout):
+        responses = controller.send_many([(address, b"in", None) for address in addresses])
+
+    records = [DeviceRecord.from_info(controller.port, info) for info in responses if isinstance(info, dict)]
+    for record in records:
+        logger.info("%s, address %s: %s \t(S/N: %s)", record.port, record.address, record.model, record.serial_no)
+    return records
+
+
+def _probe_port(port: str, addresses: str, timeout: float) -> list[DeviceRecord]:
+    """Opens a port and probes the bus behind it."""
+    controller = Controller(port, timeout=timeout, debug=False)
+    if controller.port is None:
+        return []
+    with controller:
+        return probe_bus(controller, addresses=addresses, timeout=timeout)
+
+
+def discover_devices(ports: list[str] | None = None, addresses: str = ADDRESSES, timeout: float = PROBE_TIMEOUT) -> list[DeviceRecord]:
+    """Finds all devices on the given ports (all available ports by default), probing the ports in parallel."""
+    if ports is None:
+        ports = find_ports()
+    if not ports:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+        found = executor.map(lambda port: _probe_port(port, addresses, timeout), ports)
+    return [record for records in found for record in records]
@@ -0,0 +1,131 @@
+"""Scheduling of the requests that threads sharing one Controller make to the devices on its bus."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from collections.abc import Iterable
+from enum import IntEnum
+from types import TracebackType
+
+
+class Priority(IntEnum):
+    """Priority classes of requests, those with lower values are served first."""
+
+    # Stops and closing shutters: they jump the queue and interrupt what is in progress at their address
+    SAFETY = 0
+    # Moves and queries made by the program
+    USER = 1
+    # Position polls and other monitoring
+    BACKGROUND = 2
+
+
+class RequestQueue:
+    """Gives requests exclusive use of the addresses they talk to.
+
+    Requests to the same address are served one after another, so the response of one can never be
+    taken for that of another: by priority (see Priority), and in the order they were made within a
+    priority. Requests to different addresses are served at the same time. A request to several
+    addresses (e.g. a group move) waits for its turn at each of them: as turns are handed out in one
+    global order, it cannot deadlock. A thread that already holds an address can hold it again, e.g.
+    to send several commands in one go."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._tickets = itertools.count()
+        # Requests waiting for each address, as heaps of (priority, ticket)
+        self._queues: dict[str, list[tuple[int, int]]] = {}
+        # Thread holding each address, and how many times it holds it
+        self._holders: dict[str, list[int]] = {}
+        # Number of threads waiting for their turn
+        self._waiting = 0
+
+    def hold(self, addresses: Iterable[str], priority: Priority = Priority.USER) -> _Hold:
+        """Returns a context manager that waits until the calling thread has its turn at all the given
+        addresses, and holds them until the end of the with block."""
+        return _Hold(self, addresses, priority)
+
+    def hold_available(self, addresses: Iterable[str], priority: Priority = Priority.USER) -> _Hold:
+        """Returns a context manager that holds those of the given addresses that are free right away,
+        without waiting for the others. The addresses held are in its attribute addresses."""
+        return _Hold(self, addresses, priority, wait=False)
+
+    def holder(self, address: str) -> int | None:
+        """Identifier of the thread holding an address (see threading.get_ident()), None if it is free."""
+        holder = self._holders.get(address)
+        return None if holder is None else holder[0]
+
+    def _acquire(self, addresses: Iterable[str], priority: Priority, wait: bool = True) -> tuple[list[str], list[str]]:
+        """Waits for the turn at the addresses. Returns those newly acquired and those already held."""
+        thread = threading.get_ident()
+        needed = []
+        held = []
+        with self._lock:
+            for address in addresses:
+                holder = self._holders.get(address)
+                if holder is not None and holder[0] == thread:
+                    if address not in held:
+                        holder[1] += 1
+                        held.append(address)
+                elif address not in needed:
+                    needed.append(address)
+            if not wait:
+                needed = [address for address in needed if address not in self._holders and not self._queues.get(address)]
+            elif any(address in self._holders or self._queues.get(address) for address in needed):
+                key = (int(priority), next(self._tickets))
+                for address in needed:
+                    heapq.heappush(self._queues.setdefault(address, []), key)
+                self._waiting += 1
+                self._condition.wait_for(lambda: all(address not in self._holders and self._queues[address][0] == key
+                                                     for address in needed))
+                self._waiting -= 1
+                for address in needed:
+                    queue = self._queues[address]
+                    heapq.heappop(queue)
+                    if not queue:
+                        del self._queues[address]
+            for address in needed:
+                self._holders[address] = [thread, 1]
+        return needed, held
+
+    def _release(self, needed: list[str], held: list[str]) -> None:
+        """Hands the addresses on to the next requests."""
+        with self._lock:
+            for address in held:
+                self._holders[address][1] -= 1
+            for address in needed:
+                del self._holders[address]
+            if needed and self._waiting:
+                self._condition.notify_all()
+
+    def waiting(self, address: str) -> int:
+        """Number of requests waiting for (or holding) an address."""
+        with self._lock:
+            return len(self._queues.get(address, ())) + (address in self._holders)
+
+
+class _Hold:
+    """Holds addresses of a RequestQueue for the duration of a with block."""
+
+    __slots__ = ("queue", "requested", "priority", "wait", "acquired")
+
+    def __init__(self, queue: RequestQueue, addresses: Iterable[str], priority: Priority, wait: bool = True) -> None:
+        self.queue = queue
+        self.requested = addresses
+        self.priority = priority
+        self.wait = wait
+        self.acquired: tuple[list[str], list[str]] = ([], [])
+
+    @property
+    def addresses(self) -> list[str]:
+        """The addresses held."""
+        needed, held = self.acquired
+        return needed + held
+
+    def __enter__(self) -> _Hold:
+        self.acquired = self.queue._acquire(self.requested, self.priority, self.wait)
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None) -> None:
+        self.queue._release(*self.acquired)
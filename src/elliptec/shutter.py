@@ -1,18 +1,28 @@
 """Module for shutter. Inherits from elliptec.Motor."""
 from __future__ import annotations
 
+from .cache import InfoCache
 from .controller import Controller
 from .devices import devices
+from .scheduler import Priority
+from .timing import MOVE_RESPONSE_BYTES, START_MARGIN, Exposure, ShutterTiming, byte_time, sleep_until
 from .tools import Status
 from . import Motor
 
 
 class Shutter(Motor):
-    """Class for shutter objects, typically two-position linear sliders. Inherits from elliptec.Motor."""
+    """Class for shutter objects, typically two-position linear sliders. Inherits from elliptec.Motor.
 
-    def __init__(self, controller: Controller, address: str = "0", debug: bool = True, inverted: bool = False) -> None:
-        super().__init__(controller=controller, address=address, debug=debug)
+    Exposures of a given duration are made with expose(), which measures how long the shutter takes to
+    open and close (see timing) and writes the commands that much ahead of time."""
+
+    def __init__(self, controller: Controller, address: str = "0", debug: bool | None = None, inverted: bool = False, info_cache: InfoCache | None = None, serial_no: str | None = None, state_max_age: float | None = 0.0) -> None:
+        super().__init__(controller=controller, address=address, debug=debug, info_cache=info_cache, serial_no=serial_no, state_max_age=state_max_age)
         self.inverted = inverted
+        # Until measured, a move is assumed to take as long as the device is rated for, plus the command. Info
+        # from the cache is good enough for that, it is validated with the first command
+        travel_time = devices.get(self._motor_type, {}).get("travel_time", 1.0)
+        self.timing = ShutterTiming(travel_time + 3 * byte_time(controller.s))
 
     # Functions specific to Shutter
 
@@ -23,20 +33,30 @@ class Shutter(Motor):
         slot = self.extract_slot_from_status(status)
         return slot
 
-    def set_slot(self, slot: int) -> int | None:
-        """Moves the slider to a particular slot."""
+    def set_slot(self, slot: int, priority: Priority = Priority.USER) -> int | None:
+        """Moves the slider to a particular slot, with the given priority (see Priority)."""
         # If the slider is elsewhere, move it.
         if slot == 1:
-            status = self.move("backward")
+            status = self.move("backward", priority=priority)
             slot = self.extract_slot_from_status(status)
             return slot
         elif slot == 2:
-            status = self.move("forward")
+            status = self.move("forward", priority=priority)
             slot = self.extract_slot_from_status(status)
             return slot
         else:
             return None
 
+    async def set_slot_async(self, slot: int) -> int | None:
+        """Asynchronous counterpart of set_slot()."""
+        if slot == 1:
+            status = await self.move_async("backward")
+        elif slot == 2:
+            status = await self.move_async("forward")
+        else:
+            return None
+        return self.extract_slot_from_status(status)
+
     def jog(self, direction: str = "forward") -> int | None:
         """Jogs by the jog distance in a particular direction."""
         if direction in ["backward", "forward"]:
@@ -55,9 +75,77 @@ class Shutter(Motor):
 
     def close(self) -> int | None:
         """Closes the shutter. Actual position depends on whether or not inverted=True is
-        passed to the shutter at creation.
+        passed to the shutter at creation. Closing is a safety request: it jumps the queue of
+        requests to the shutter and stops a move in progress first (see Priority.SAFETY).
         """
-        return self.set_slot(2 if self.inverted else 1)
+        return self.set_slot(2 if self.inverted else 1, priority=Priority.SAFETY)
+
+    async def open_async(self) -> int | None:
+        """Asynchronous counterpart of open()."""
+        return await self.set_slot_async(1 if self.inverted else 2)
+
+    async def close_async(self) -> int | None:
+        """Asynchronous counterpart of close()."""
+        return await self.set_slot_async(2 if self.inverted else 1)
+
+    ## Timed opening and closing
+    def _timed_move(self, slot: int, direction: str, deadline: float | None, priority: Priority) -> float | None:
+        """Moves to a slot, finishing at the deadline (a timing.clock() value) if given, and records the
+        latency of the move. Returns the estimated time the move finished, None if it failed."""
+        clock = self.timing.clock
+        entry = self.state.entries.get("PO")
+        # Only moves from the other slot are timed, the shutter does not move otherwise
+        moves = entry is not None and self.pos_to_slot(entry[0][2]) != slot
+        if deadline is not None:
+            sleep_until(deadline - self.timing.latency(direction), clock, self.timing.sleep)
+        written = clock()
+        reached = self.set_slot(slot, priority=priority)
+        answered = clock()
+        if reached != slot:
+            return None
+        finished = answered - MOVE_RESPONSE_BYTES * byte_time(self.controller.s)
+        if moves:
+            self.timing.record(direction, finished - written)
+        return finished
+
+    def open_at(self, deadline: float | None = None) -> float | None:
+        """Opens the shutter so that it is open at the deadline (a timing.clock() value), or right away.
+        Returns the estimated time it finished opening, None if it failed to open."""
+        return self._timed_move(1 if self.inverted else 2, "open", deadline, Priority.USER)
+
+    def close_at(self, deadline: float | None = None) -> float | None:
+        """Closes the shutter so that it is closed at the deadline (a timing.clock() value), or right away.
+        Returns the estimated time it finished closing, None if it failed to close."""
+        return self._timed_move(2 if self.inverted else 1, "close", deadline, Priority.SAFETY)
+
+    def expose(self, duration: float, start: float | None = None) -> Exposure:
+        """Opens the (closed) shutter for the given duration in seconds, from start (a timing.clock() value,
+        time.monotonic() by default) or as soon as possible. The exposure is added to timing.exposures and
+        returned, with the estimated times the shutter opened and closed.
+
+        Exposures shorter than the time the shutter takes to open (see timing) end late, as the shutter
+        only closes once it has opened."""
+        with self.controller.requests.hold((self.address,)):
+            if start is None:
+                start = self.timing.clock() + self.timing.latency("open") + START_MARGIN
+            try:
+                opened = self.open_at(start)
+            finally:
+                # Closed in any case
+                closed = self.close_at(start + duration)
+        exposure = Exposure(start, duration, opened, closed)
+        self.timing.exposures.append(exposure)
+        return exposure
+
+    def calibrate_timing(self, cycles: int = 3) -> dict[str, float]:
+        """Opens and closes the shutter the given number of times to measure the latencies of opening and
+        closing, leaving it closed. Returns the latencies (see ShutterTiming.latency())."""
+        self.get_slot()
+        self.close_at()
+        for _ in range(cycles):
+            self.open_at()
+            self.close_at()
+        return {"open": self.timing.latency("open"), "close": self.timing.latency("close")}
 
     def is_open(self) -> bool:
         """Returns True if shutter is open, False if closed."""
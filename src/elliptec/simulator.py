@@ -0,0 +1,368 @@
+"""An in-process simulation of an Elliptec bus, which can be used by a Controller in place of a serial port.
+
+The simulation implements the Elliptec wire protocol for the devices listed in devices.py and
+models the time it takes to transfer the frames at 9600 baud as well as the mechanical duration
+of moves. Time can be scaled (time_scale=0 makes everything instantaneous)."""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from .devices import devices
+from .tools import s32
+
+# Time to transfer one byte at 9600 baud (start bit, 8 data bits, stop bit)
+BYTE_TIME = 10 / 9600
+
+# Range and pulses per revolution (or per unit) reported in the info of each simulated model
+info_defaults: dict[int, tuple[int, int]] = {
+    6: (31, 0),
+    9: (96, 0),
+    14: (360, 143360),
+    15: (12, 1024),
+    18: (360, 262144),
+    20: (60, 1024),
+}
+
+# Length of the data following each instruction, needed to split a stream of commands into frames
+payload_lengths: dict[bytes, int] = {
+    b"ma": 8,
+    b"mr": 8,
+    b"sj": 8,
+    b"so": 8,
+    b"ho": 1,
+    b"ca": 1,
+    b"is": 1,
+    b"ga": 1,
+    b"sv": 2,
+}
+
+HEX_DIGITS = b"0123456789ABCDEFabcdef"
+
+
+def to_hex(value: int) -> str:
+    """Converts an int to 32bit signed hex."""
+    return value.to_bytes(4, "big", signed=True).hex().upper()
+
+
+class SimulatedDevice:
+    """A single simulated Elliptec device, identified by its motor type (see devices.py)."""
+
+    def __init__(self,
+                 motor_type: int = 14,
+                 address: str = "0",
+                 serial_no: str = "12345678",
+                 position: int = 0,
+                 processing_time: float = 0.002) -> None:
+        if motor_type not in devices:
+            raise ValueError(f"Unsupported motor type: {motor_type}.")
+        self.motor_type = motor_type
+        self.address = address.upper()
+        self.serial_no = serial_no
+        self.year = "2023"
+        self.firmware = "01"
+        self.position = position
+        self.processing_time = processing_time
+        self.range, self.pulse_per_rev = info_defaults[motor_type]
+        self.slots: list[int] | None = devices[motor_type].get("positions")
+        self.home_offset = 0
+        self.jog_step = self.max_position // 36 or 1
+        self.velocity = 100
+        # Additional address the device listens to until its next move (see the "ga" command)
+        self.group_address: str | None = None
+        # Time at which the current move finishes (the device reports Busy until then), set by the bus
+        self.busy_until = 0.0
+        # Start time (set by the bus), origin and target of the last move, to find where a stopped move ends
+        self.move_started = 0.0
+        self.move_origin = position
+        self.move_target = position
+
+    @property
+    def max_position(self) -> int:
+        """Largest position (in pulses) the device can reach."""
+        if self.slots is not None:
+            return self.slots[-1]
+        if self.is_rotary:
+            return self.pulse_per_rev
+        return self.pulse_per_rev * self.range
+
+    @property
+    def is_rotary(self) -> bool:
+        """Whether the device rotates (and its position wraps around)."""
+        return self.motor_type in (14, 18)
+
+    def move_duration(self, distance: int) -> float:
+        """Mechanical duration (in seconds) of a move over the given distance in pulses."""
+        travel_time = devices[self.motor_type]["travel_time"]
+        return abs(distance) / self.max_position * travel_time * 100 / self.velocity
+
+    def info(self) -> str:
+        """Composes the response to an info request."""
+        # Thread "0" (metric) and hardware release "1"
+        return (f"IN{self.motor_type:02X}{self.serial_no:0>8.8}{self.year}{self.firmware}01"
+                f"{self.range:04X}{self.pulse_per_rev:08X}")
+
+    def handle(self, instruction: bytes, payload: bytes, now: float) -> tuple[str | None, float]:
+        """Executes a single instruction. Returns the response (without address) and the mechanical delay."""
+        if instruction == b"in":
+            return self.info(), 0.0
+        if instruction == b"gs":
+            return ("GS09" if now < self.busy_until else "GS00"), 0.0
+        if instruction == b"gp":
+            return f"PO{to_hex(self.position_at(now))}", 0.0
+        if instruction == b"gj":
+            return f"GJ{to_hex(self.jog_step)}", 0.0
+        if instruction == b"go":
+            return f"HO{to_hex(self.home_offset)}", 0.0
+        if instruction == b"sj":
+            self.jog_step = s32(int(payload, 16))
+            return "GS00", 0.0
+        if instruction == b"so":
+            self.home_offset = s32(int(payload, 16))
+            return "GS00", 0.0
+        if instruction == b"gv":
+            return f"GV{self.velocity:02X}", 0.0
+        if instruction == b"sv":
+            self.velocity = min(max(int(payload, 16), 1), 100)
+            return "GS00", 0.0
+        if instruction in (b"i1", b"i2"):
+            return f"{instruction.decode().upper()}11074A010001000E140E14", 0.0
+        if instruction in (b"us", b"is"):
+            return "GS00", 0.0
+        if instruction == b"ca":
+            self.address = payload.decode().upper()
+            return "GS00", 0.0
+        if instruction == b"st":
+            # The bus interrupts the move in progress, see SimulatedBus.stop()
+            return "GS00", 0.0
+        if instruction == b"ga":
+            group_address = payload.decode().upper()
+            self.group_address = None if group_address == self.address else group_address
+            return "GS00", 0.0
+        if instruction in (b"ma", b"mr", b"fw", b"bw", b"ho"):
+            if now < self.busy_until:
+                return "GS09", 0.0
+            # A grouped device moves with the group once, answering with its own address
+            self.group_address = None
+            target = self.target(instruction, payload)
+            if target is None:
+                return "GS04", 0.0
+            delay = self.move_duration(target - self.position)
+            self.move_origin, self.move_target = self.position, target
+            self.position = target
+            if self.is_rotary:
+                self.position %= self.pulse_per_rev
+            return f"PO{to_hex(self.position)}", delay
+        return "GS03", 0.0
+
+    def position_at(self, now: float) -> int:
+        """Position during the last move (assuming constant speed), used when it is stopped."""
+        if now >= self.busy_until:
+            return self.position
+        fraction = max(now - self.move_started, 0) / (self.busy_until - self.move_started)
+        position = round(self.move_origin + (self.move_target - self.move_origin) * fraction)
+        return position % self.pulse_per_rev if self.is_rotary else position
+
+    def target(self, instruction: bytes, payload: bytes) -> int | None:
+        """Computes the target position of a move, None if it is out of range."""
+        if instruction == b"ho":
+            target = 0 if self.slots is not None else self.home_offset
+        elif self.slots is not None and instruction in (b"fw", b"bw"):
+            index = self.slots.index(min(self.slots, key=lambda x: abs(x - self.position)))
+            index += 1 if instruction == b"fw" else -1
+            target = self.slots[min(max(index, 0), len(self.slots) - 1)]
+        elif instruction == b"fw":
+            target = self.position + self.jog_step
+        elif instruction == b"bw":
+            target = self.position - self.jog_step
+        elif instruction == b"ma":
+            target = s32(int(payload, 16))
+        else:
+            target = self.position + s32(int(payload, 16))
+
+        if self.is_rotary:
+            return target
+        if not 0 <= target <= self.max_position:
+            return None
+        return target
+
+
+class SimulatedBus:
+    """A simulated serial port with any number of devices attached to it.
+
+    Implements the subset of the serial.Serial interface used by the Controller, so it can
+    be passed to it as a transport: Controller(transport=SimulatedBus([SimulatedDevice(14)]))."""
+
+    def __init__(self,
+                 devices: Iterable[SimulatedDevice] = (),
+                 time_scale: float = 1.0,
+                 timeout: float | None = 2,
+                 port: str = "sim://",
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.devices = list(devices)
+        self.time_scale = time_scale
+        self.timeout = timeout
+        self.port = port
+        self.is_open = True
+        self.clock = clock
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._tx_buffer = bytearray()
+        self._rx_buffer = bytearray()
+        # Responses on their way to the host, as (start of transfer, time of arrival, bytes, device, time ready)
+        # where device is set for the responses to moves, which can be interrupted
+        self._pending: list[tuple[float, float, bytes, SimulatedDevice | None, float]] = []
+        # Time at which the TX line is free again
+        self._tx_free = 0.0
+        self._condition = threading.Condition()
+
+    def device(self, address: str) -> SimulatedDevice | None:
+        """Returns the device with the given address."""
+        for device in self.devices:
+            if device.address == address.upper():
+                return device
+        return None
+
+    def listeners(self, address: str) -> list[SimulatedDevice]:
+        """Returns all devices listening on the given address, including through a group address."""
+        address = address.upper()
+        return [device for device in self.devices if address in (device.address, device.group_address)]
+
+    def write(self, data: bytes) -> int:
+        """Sends commands to the simulated devices."""
+        with self._condition:
+            now = self.clock()
+            self.bytes_written += len(data)
+            self._tx_buffer += data
+            for frame in self._split_frames():
+                # Frames are transferred one after another
+                self._tx_free = max(now, self._tx_free) + len(frame) * BYTE_TIME * self.time_scale
+                self._dispatch(frame, self._tx_free)
+            self._condition.notify_all()
+        return len(data)
+
+    def _split_frames(self) -> list[bytes]:
+        """Takes all complete command frames out of the TX buffer."""
+        frames = []
+        while len(self._tx_buffer) >= 3:
+            instruction = bytes(self._tx_buffer[1:3]).lower()
+            length = 3 + payload_lengths.get(instruction, 0)
+            if len(self._tx_buffer) < length:
+                break
+            frames.append(bytes(self._tx_buffer[:length]))
+            del self._tx_buffer[:length]
+        return frames
+
+    def _dispatch(self, frame: bytes, arrival: float) -> None:
+        """Lets the addressed device handle a frame and schedules its response."""
+        for device in self.listeners(chr(frame[0])):
+            self._respond(device, frame, arrival)
+
+    def _respond(self, device: SimulatedDevice, frame: bytes, arrival: float) -> None:
+        """Lets a device handle a frame and schedules its response."""
+        payload = frame[3:]
+        # The device acts on the frame once it has processed it
+        processed = arrival + device.processing_time * self.time_scale
+        if frame[1:3].lower() == b"st" and processed < device.busy_until:
+            self.stop(device, processed)
+        if payload and not all(c in HEX_DIGITS for c in payload):
+            reply, delay = "GS03", 0.0
+        else:
+            reply, delay = device.handle(frame[1:3].lower(), payload, processed)
+        if reply is None:
+            return
+        # The address is read after handling, as "ca" changes it
+        response = f"{device.address}{reply}\r\n".encode()
+        ready = processed + delay * self.time_scale
+        if delay:
+            device.move_started = processed
+            device.busy_until = ready
+        self._schedule(response, ready, device if delay else None)
+
+    def _schedule(self, response: bytes, ready: float, device: SimulatedDevice | None = None) -> None:
+        """Queues a response for transfer to the host once it is ready."""
+        # The RX line carries one response at a time, in the order they are ready. Responses
+        # whose transfer has not started yet may have to make way for this one.
+        now = self.clock()
+        started = [item for item in self._pending if item[0] <= now]
+        waiting = [(item[4], item[2], item[3]) for item in self._pending if item[0] > now]
+        waiting.append((ready, response, device))
+        waiting.sort(key=lambda item: item[0])
+        line_free = max((item[1] for item in started), default=0.0)
+        self._pending = started
+        for ready, response, device in waiting:
+            start = max(ready, line_free)
+            line_free = start + len(response) * BYTE_TIME * self.time_scale
+            self._pending.append((start, line_free, response, device, ready))
+
+    def stop(self, device: SimulatedDevice, now: float) -> None:
+        """Interrupts the move of a device, which answers for it right away with the position it stopped at."""
+        self._pending = [item for item in self._pending if item[3] is not device]
+        device.position = device.position_at(now)
+        device.busy_until = now
+        response = f"{device.address}PO{to_hex(device.position)}\r\n".encode()
+        self._schedule(response, now)
+
+    def _deliver(self) -> float | None:
+        """Moves arrived responses to the RX buffer. Returns the arrival time of the next one."""
+        now = self.clock()
+        # Responses are kept ordered by start of transfer, which is also the order of arrival
+        while self._pending and self._pending[0][1] <= now:
+            self._rx_buffer += self._pending.pop(0)[2]
+        return self._pending[0][1] if self._pending else None
+
+    @property
+    def in_waiting(self) -> int:
+        """Number of bytes that can be read without waiting."""
+        with self._condition:
+            self._deliver()
+            return len(self._rx_buffer)
+
+    def _wait_for(self, done: Callable[[], bool]) -> None:
+        """Waits (in scaled time) until done() is true or the timeout expires."""
+        deadline = None if self.timeout is None else self.clock() + self.timeout * self.time_scale
+        while True:
+            next_arrival = self._deliver()
+            if done():
+                return
+            now = self.clock()
+            if deadline is not None and now >= deadline:
+                return
+            wake = [t for t in (next_arrival, deadline) if t is not None]
+            self._condition.wait(max(min(wake) - now, 0) if wake else None)
+
+    def read(self, size: int = 1) -> bytes:
+        """Reads up to size bytes, waiting for them until the timeout expires."""
+        with self._condition:
+            self._wait_for(lambda: len(self._rx_buffer) >= size)
+            data = bytes(self._rx_buffer[:size])
+            del self._rx_buffer[:size]
+            self.bytes_read += len(data)
+            return data
+
+    def read_until(self, expected: bytes = b"\n", size: int | None = None) -> bytes:
+        """Reads until the expected sequence is found or the timeout expires."""
+        with self._condition:
+            self._wait_for(lambda: expected in self._rx_buffer)
+            end = self._rx_buffer.find(expected)
+            end = len(self._rx_buffer) if end < 0 else end + len(expected)
+            if size is not None:
+                end = min(end, size)
+            data = bytes(self._rx_buffer[:end])
+            del self._rx_buffer[:end]
+            self.bytes_read += len(data)
+            return data
+
+    def reset_input_buffer(self) -> None:
+        """Discards all received and pending responses."""
+        with self._condition:
+            self._rx_buffer.clear()
+            self._pending.clear()
+
+    def flush(self) -> None:
+        """Does nothing, writes are immediate."""
+
+    def close(self) -> None:
+        """Closes the simulated port."""
+        self.is_open = False
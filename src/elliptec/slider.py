@@ -1,17 +1,22 @@
 """Module for slider stages. Inherits from elliptec.Motor."""
 from __future__ import annotations
 
+from collections.abc import Callable, Sequence
+
+from .cache import InfoCache
 from .controller import Controller
 from .devices import devices
+from .planner import Plan, plan_visits
 from .tools import Status
+from .trajectory import Trajectory, TrajectoryPoint
 from . import Motor
 
 
 class Slider(Motor):
     """Slider class for elliptec devices. Inherits from elliptec.Motor."""
 
-    def __init__(self, controller: Controller, address: str = "0", debug: bool = True) -> None:
-        super().__init__(controller=controller, address=address, debug=debug)
+    def __init__(self, controller: Controller, address: str = "0", debug: bool | None = None, info_cache: InfoCache | None = None, serial_no: str | None = None, state_max_age: float | None = 0.0) -> None:
+        super().__init__(controller=controller, address=address, debug=debug, info_cache=info_cache, serial_no=serial_no, state_max_age=state_max_age)
 
     ## Setting and getting slots
     def get_slot(self) -> int | None:
@@ -27,6 +32,45 @@ class Slider(Motor):
         slot = self.extract_slot_from_status(status)
         return slot
 
+    async def set_slot_async(self, slot: int) -> int | None:
+        """Asynchronous counterpart of set_slot()."""
+        await self.validate_info_async()
+        position = self.slot_to_pos(slot)
+        status = await self.move_async("absolute", position)
+        return self.extract_slot_from_status(status)
+
+    def _slot_positions(self, slots: Sequence[int]) -> list[int]:
+        """Converts slots to positions in pulses."""
+        positions = [self.slot_to_pos(slot) for slot in slots]
+        if None in positions:
+            raise ValueError(f"Invalid slot in sequence: {slots[positions.index(None)]}.")
+        return positions
+
+    def plan_sequence(self, slots: Sequence[int], start: int | None = None) -> Plan:
+        """Plans the order in which to visit slots that takes the least time, starting at slot start (the
+        current one by default). See plan_visits() for how, and run_sequence(optimize=True)."""
+        positions = self._slot_positions(slots)
+        return plan_visits(self, positions, None if start is None else self._slot_positions([start])[0])
+
+    def run_sequence(self,
+                     slots: Sequence[int],
+                     callback: Callable[[int, int, int | None], None] | None = None,
+                     overlap: bool = False,
+                     optimize: bool = False) -> list[TrajectoryPoint]:
+        """Moves through a sequence of slots, calling callback(index, slot, reached) at each of them.
+        See Trajectory for details. Returns the outcome and timing of each point.
+
+        With optimize=True, the slots are visited in the order that takes the least time (see
+        plan_sequence()). The points are still reported with their indices in slots."""
+        positions = self._slot_positions(slots)
+        if not optimize:
+            trajectory = Trajectory(self, slots, positions, self.extract_slot_from_status, callback, overlap)
+            return trajectory.run()
+        plan = plan_visits(self, positions)
+        trajectory = Trajectory(self, plan.reorder(slots), plan.positions, self.extract_slot_from_status, callback,
+                                overlap, indices=plan.order)
+        return trajectory.run()
+
     def jog(self, direction: str = "forward") -> int | None:
         """Jogs by the jog distance in a particular direction."""
         if direction in ["backward", "forward"]:
@@ -0,0 +1,56 @@
+"""Client-side cache of the state of a device, which lets reads be answered without asking the device."""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from .tools import Status
+
+# Response codes whose values are cached: position, jog step and home offset
+CACHED_CODES = ("PO", "GJ", "HO")
+
+
+class StateCache:
+    """The latest position, jog step and home offset of a device, kept as the responses that reported them.
+
+    Entries are served for max_age seconds after they were received: never if max_age is 0, until
+    they are invalidated if it is None. A move invalidates the position, an error or a missing
+    response invalidates everything."""
+
+    def __init__(self, max_age: float | None = 0.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_age = max_age
+        self.clock = clock
+        self.entries: dict[str, tuple[Status, float]] = {}
+
+    def get(self, code: str) -> Status | None:
+        """Returns the cached response with the given code, None if there is none or it is too old."""
+        if self.max_age == 0:
+            return None
+        entry = self.entries.get(code)
+        if entry is None:
+            return None
+        status, received = entry
+        if self.max_age is not None and self.clock() - received > self.max_age:
+            del self.entries[code]
+            return None
+        return status
+
+    def put(self, status: Status) -> None:
+        """Stores a response that reports part of the state."""
+        if status[1] in CACHED_CODES:
+            self.entries[status[1]] = (status, self.clock())
+
+    def update(self, status: Status | None) -> None:
+        """Records any response from the device."""
+        if status is None or (not isinstance(status, dict) and status[1] == "GS" and status[2] != "0"):
+            # Whatever happened, the state is unknown now
+            self.invalidate()
+        elif not isinstance(status, dict):
+            self.put(status)
+
+    def invalidate(self, code: str | None = None) -> None:
+        """Forgets the cached response with the given code, or all of them."""
+        if code is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(code, None)
@@ -0,0 +1,112 @@
+"""Module for timing the moves of shutters precisely (see Shutter.expose())."""
+from __future__ import annotations
+
+import statistics
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import NamedTuple
+
+# Number of recent moves the latency of a shutter is estimated from
+LATENCY_WINDOW = 16
+# Waits end by spinning for this long (in seconds), as sleeps may overshoot by about a millisecond
+SPIN_TIME = 0.002
+# Length of the response to a move ("0PO00000000\r\n")
+MOVE_RESPONSE_BYTES = 13
+# Exposures started as soon as possible leave this much time (in seconds) to get ready
+START_MARGIN = 0.005
+
+
+def sleep_until(deadline: float,
+                clock: Callable[[], float] = time.monotonic,
+                sleep: Callable[[float], None] = time.sleep) -> None:
+    """Waits until the given deadline of the clock, precise to well below a millisecond: sleeps until
+    shortly before it, and spins for the rest."""
+    while (remaining := deadline - clock()) > SPIN_TIME:
+        sleep(remaining - SPIN_TIME)
+    while clock() < deadline:
+        pass
+
+
+def byte_time(port) -> float:
+    """Time (in seconds) to transfer one byte over a port: start bit, 8 data bits and stop bit at its
+    baud rate (9600 unless it says otherwise), slowed down like the simulated bus, if it is one."""
+    baudrate = getattr(port, "baudrate", None)
+    time_scale = getattr(port, "time_scale", None)
+    if not isinstance(baudrate, (int, float)) or baudrate <= 0:
+        baudrate = 9600
+    if not isinstance(time_scale, (int, float)):
+        time_scale = 1.0
+    return 10 / baudrate * time_scale
+
+
+class Exposure(NamedTuple):
+    """An exposure made with a shutter. Times are ShutterTiming.clock() values in seconds: the requested
+    start, and the estimated moments the shutter finished opening and closing (None if it failed to)."""
+
+    start: float
+    requested_duration: float
+    opened: float | None
+    closed: float | None
+
+    @property
+    def duration(self) -> float | None:
+        """How long the shutter was open."""
+        if self.opened is None or self.closed is None:
+            return None
+        return self.closed - self.opened
+
+    @property
+    def error(self) -> float | None:
+        """How much longer than requested the shutter was open (negative if shorter)."""
+        duration = self.duration
+        return None if duration is None else duration - self.requested_duration
+
+
+class ShutterTiming:
+    """Latency of the moves of a shutter, and the exposures made with it.
+
+    The latency of a move is the time from writing the command until the shutter has finished moving,
+    which is when the response starts to arrive. It is measured on every timed move (see
+    Shutter.open_at()), separately for opening and closing, and estimated as the median of the last
+    window moves. Until the first move, default_latency is assumed.
+
+    Times are taken with clock and waited for with sleep, time.monotonic() and time.sleep() unless
+    given (e.g. a simulated clock)."""
+
+    def __init__(self,
+                 default_latency: float,
+                 window: int = LATENCY_WINDOW,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.default_latency = default_latency
+        self.clock = clock
+        self.sleep = sleep
+        self.samples: dict[str, deque[float]] = {"open": deque(maxlen=window), "close": deque(maxlen=window)}
+        self.exposures: list[Exposure] = []
+
+    def record(self, direction: str, latency: float) -> None:
+        """Adds a measured latency of opening ("open") or closing ("close")."""
+        self.samples[direction].append(latency)
+
+    def latency(self, direction: str) -> float:
+        """Expected latency of opening ("open") or closing ("close")."""
+        samples = self.samples[direction]
+        return statistics.median(samples) if samples else self.default_latency
+
+    def jitter(self, direction: str) -> float:
+        """Standard deviation of the measured latencies of opening ("open") or closing ("close")."""
+        samples = self.samples[direction]
+        return statistics.stdev(samples) if len(samples) > 1 else 0.0
+
+    def statistics(self) -> dict[str, float | int]:
+        """Statistics of the exposures made (those where the shutter failed to move are left out): their
+        count, and the mean, standard deviation, minimum and maximum of their errors (see Exposure.error)."""
+        errors = [exposure.error for exposure in self.exposures if exposure.error is not None]
+        if not errors:
+            return {"count": 0}
+        return {"count": len(errors),
+                "mean_error": statistics.fmean(errors),
+                "stdev_error": statistics.stdev(errors) if len(errors) > 1 else 0.0,
+                "min_error": min(errors),
+                "max_error": max(errors)}
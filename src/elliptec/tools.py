@@ -2,12 +2,16 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
+from functools import partial
+from typing import NamedTuple
 
 from .errcodes import error_codes
 
 logger = logging.getLogger(__name__)
 
-# A parsed status is either a dict (for info responses) or a tuple of (address, code, value).
+# A parsed status is either a dict (for info responses) or a tuple of (address, code, value),
+# which parse() returns as a Reply.
 Status = dict[str, object] | tuple[str, str, int | str]
 
 
@@ -16,65 +20,155 @@ def is_null_or_empty(msg: bytes) -> bool:
     return not msg.endswith(b"\r\n") or len(msg) == 0
 
 
-def parse(msg: bytes, debug: bool = True) -> Status | None:
+class Reply(NamedTuple):
+    """A parsed (address, code, value) response. Being a tuple, it compares equal to one."""
+
+    address: str
+    code: str
+    value: int | str
+
+
+# Builds a Reply without going through the keyword handling of Reply.__new__
+_reply = partial(tuple.__new__, Reply)
+
+# Decoded values of two-digit status codes
+_status_values = {f"{i:02X}".encode(): str(i) for i in range(256)}
+
+# Characters valid as an address, indexed by their byte value
+_addresses = {ord(c): c for c in "0123456789ABCDEFabcdef"}
+
+
+def _parse_info(addr: str, code: str, body: bytes) -> dict[str, object]:
+    # Mostly text fields, decoded in one go
+    text = body.decode()
+    return {
+        "Address": addr,
+        "Motor Type": int(text[0:2], 16),
+        "Serial No.": text[2:10],
+        "Year": text[10:14],
+        "Firmware": text[14:16],
+        "Thread": is_metric(text[16]),
+        "Hardware": text[17],
+        "Range": (int(text[18:22], 16)),
+        "Pulse/Rev": (int(text[22:], 16)),
+    }
+
+
+def _parse_position(addr: str, code: str, body: bytes) -> Reply:
+    value = int(body, 16)
+    # Same as s32(), inlined for the most frequent response
+    if value >= 0x80000000:
+        value = value - 0x100000000 if value <= 0xFFFFFFFF else s32(value)
+    return _reply((addr, code, value))
+
+
+def _parse_status(addr: str, code: str, body: bytes) -> Reply:
+    value = _status_values.get(body)
+    if value is None:
+        value = str(int(body, 16))
+    return _reply((addr, code, value))
+
+
+def _parse_velocity(addr: str, code: str, body: bytes) -> Reply:
+    # Velocity in percent of the maximum
+    return _reply((addr, code, int(body, 16)))
+
+
+def _parse_motor_info(addr: str, code: str, body: bytes) -> dict[str, object]:
+    # Info about motor
+
+    # Period=14740000/frequency for backward and forward motor movements
+    # And 1 Amp of current is equal to 1866 points (1 point is 0.54 mA circa)
+    forward_period = int(body[14:18], 16)
+    backward_period = int(body[18:22], 16)
+    return {
+        "Address": addr,
+        "Loop": chr(body[0]),  # The state of the loop setting (1 = ON, 0 = OFF)
+        "Motor": chr(body[1]),  # The state of the motor (1 = ON, 0 = OFF)
+        "Current": int(body[2:6], 16) / 1866,  # 1866 points is 1 amp
+        "Ramp up": int(body[6:10], 16),  # PWM increase every ms
+        "Ramp down": int(body[10:14], 16),  # PWM decrease every ms
+        "Forward period": forward_period,  # Forward period value
+        "Backward period": backward_period,  # Backward period value
+        "Forward frequency": 14740000 / forward_period,  # Calculated forward frequency
+        "Backward frequency": 14740000 / backward_period,  # Calculated backward frequency
+    }
+
+
+def _parse_other(addr: str, code: str, body: bytes) -> Reply:
+    return _reply((addr, code, body.decode()))
+
+
+# Parsers for each response code, keyed by the raw code and storing the decoded code
+_parsers: dict[bytes, tuple[str, Callable[[str, str, bytes], Status]]] = {
+    b"IN": ("IN", _parse_info),
+    b"PO": ("PO", _parse_position),
+    b"BO": ("BO", _parse_position),
+    b"HO": ("HO", _parse_position),
+    b"GJ": ("GJ", _parse_position),
+    b"GS": ("GS", _parse_status),
+    b"GV": ("GV", _parse_velocity),
+    b"I1": ("I1", _parse_motor_info),
+    b"I2": ("I2", _parse_motor_info),
+}
+
+
+def _parse_frame(frame: bytes) -> Status:
+    """Parses a single frame, stripped of its terminator."""
+    if frame[-1:].isspace() or frame[:1].isspace():
+        frame = frame.strip()
+    addr = _addresses.get(frame[0]) if frame else None
+    if addr is None:
+        raise ValueError(f"Invalid Address: {frame[:1].decode(errors='replace')}.")
+
+    raw_code = frame[1:3]
+    entry = _parsers.get(raw_code)
+    if entry is not None:
+        code, parser = entry
+    else:
+        # Codes in lower case are parsed like upper case ones, but reported as received
+        code = raw_code.decode()
+        parser = _parsers.get(raw_code.upper(), (None, _parse_other))[1]
+    return parser(addr, code, frame[3:])
+
+
+def parse(msg: bytes | memoryview, debug: bool = True) -> Status | None:
     """Parses the message from the controller."""
+    if isinstance(msg, memoryview):
+        msg = msg.tobytes()
     if is_null_or_empty(msg):
         if debug:
             logger.warning("Parse: Status/Response may be incomplete!")
             logger.warning("Parse: Message: %s", msg)
         return None
-    msg = msg.decode().strip()
-    code = msg[1:3]
-    try:
-        _ = int(msg[0], 16)
-    except ValueError as exc:
-        raise ValueError(f"Invalid Address: {msg[0]}.") from exc
-    addr = msg[0]
-
-    if code.upper() == "IN":
-        info = {
-            "Address": addr,
-            "Motor Type": int(msg[3:5], 16),
-            "Serial No.": msg[5:13],
-            "Year": msg[13:17],
-            "Firmware": msg[17:19],
-            "Thread": is_metric(msg[19]),
-            "Hardware": msg[20],
-            "Range": (int(msg[21:25], 16)),
-            "Pulse/Rev": (int(msg[25:], 16)),
-        }
-        return info
-
-    elif code.upper() in ["PO", "BO", "HO", "GJ"]:
-        pos = msg[3:]
-        return (addr, code, (s32(int(pos, 16))))
-
-    elif code.upper() == "GS":
-        errcode = msg[3:]
-        return (addr, code, str(int(errcode, 16)))
-
-    elif code.upper() in ["I1", "I2"]:
-        # Info about motor
-
-        # Period=14740000/frequency for backward and forward motor movements
-        # And 1 Amp of current is equal to 1866 points (1 point is 0.54 mA circa)
-
-        info = {
-            "Address": addr,
-            "Loop": msg[3],  # The state of the loop setting (1 = ON, 0 = OFF)
-            "Motor": msg[4],  # The state of the motor (1 = ON, 0 = OFF)
-            "Current": int(msg[5:9], 16) / 1866,  # 1866 points is 1 amp
-            "Ramp up": int(msg[9:13], 16),  # PWM increase every ms
-            "Ramp down": int(msg[13:17], 16),  # PWM decrease every ms
-            "Forward period": int(msg[17:21], 16),  # Forward period value
-            "Backward period": int(msg[21:25], 16),  # Backward period value
-            "Forward frequency": 14740000 / int(msg[17:21], 16),  # Calculated forward frequency
-            "Backward frequency": 14740000 / int(msg[21:25], 16),  # Calculated forward frequency
-        }
-        return info
-
-    else:
-        return (addr, code, msg[3:])
+    # Fast path for well-formed frames with a known code
+    addr = _addresses.get(msg[0])
+    entry = _parsers.get(msg[1:3])
+    if addr is None or entry is None or msg[-3:-2].isspace():
+        return _parse_frame(msg[:-2])
+    return entry[1](addr, entry[0], msg[3:-2])
+
+
+def parse_many(buffer: bytes | bytearray | memoryview, debug: bool = True) -> tuple[list[Status], bytes]:
+    """Parses all complete frames in a buffer. Returns the parsed frames and the remainder
+    of the buffer (the start of a frame that has not been received completely)."""
+    buffer = bytes(buffer)
+    statuses = []
+    start = 0
+    while (end := buffer.find(b"\r\n", start)) >= 0:
+        statuses.append(_parse_frame(buffer[start:end]))
+        start = end + 2
+    remainder = buffer[start:]
+    if remainder and debug:
+        logger.debug("Parse: Incomplete frame left in buffer: %s", remainder)
+    return statuses, remainder
+
+
+def status_address(status: Status) -> str:
+    """Returns the address of the device that sent the status."""
+    if isinstance(status, dict):
+        return status["Address"]
+    return status[0]
 
 
 def is_metric(num: str) -> str | None:
@@ -0,0 +1,149 @@
+"""Module for executing pre-planned sequences of absolute moves with a single motor."""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from .cmd import mov_
+from .motor import Motor
+from .planner import shortest_step
+from .tools import Status, move_check
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TrajectoryPoint:
+    """Outcome and timing (monotonic clock, in seconds) of one point of a trajectory."""
+
+    index: int
+    target: float | int
+    reached: float | int | None
+    sent: float
+    arrived: float
+    callback_duration: float
+
+    @property
+    def move_duration(self) -> float:
+        """Time from sending the move to receiving the response."""
+        return self.arrived - self.sent
+
+
+class Trajectory:
+    """A sequence of absolute moves of one motor, with an optional callback at every point.
+
+    All move commands are encoded up front. The callback is called as callback(index, target, reached)
+    once the motor has reached a point. With overlap=True, the move to the next point is sent before
+    the callback is called, so the callback runs while the motor moves on. Only use it if the callback
+    does not need the motor to stay at the point (e.g. it processes data acquired there).
+
+    A safety request to the motor (see Priority.SAFETY) ends the trajectory at the point reached, or
+    where the motor was stopped on its way to it.
+
+    With wrap set to the pulses per revolution of a rotator, every point is reached with a relative move
+    the shorter way round from where the motor is, passing through zero if need be, instead of an absolute
+    move. indices are the indices the points are reported with (their positions in targets by default),
+    e.g. the indices in the original sequence of points that were reordered (see Plan)."""
+
+    def __init__(self,
+                 motor: Motor,
+                 targets: Sequence[float | int],
+                 positions: Sequence[int],
+                 extract: Callable[[Status | None], float | int | None],
+                 callback: Callable[[int, float | int, float | int | None], None] | None = None,
+                 overlap: bool = False,
+                 wrap: int | None = None,
+                 indices: Sequence[int] | None = None) -> None:
+        if len(targets) != len(positions):
+            raise ValueError("Every target needs a position.")
+        if indices is not None and len(indices) != len(targets):
+            raise ValueError("Every target needs an index.")
+        self.motor = motor
+        self.targets = list(targets)
+        self.positions = [int(position) for position in positions]
+        self.indices = list(indices) if indices is not None else list(range(len(self.targets)))
+        self.extract = extract
+        self.callback = callback
+        self.overlap = overlap
+        self.wrap = wrap
+        self.instruction = mov_["absolute"] if wrap is None else mov_["relative"]
+        encode = motor.controller._encode
+        if wrap is None:
+            self.frames = [encode(self.instruction, motor.address, position) for position in self.positions]
+        else:
+            # The steps depend on where the motor is, they are encoded on the way
+            self.frames = [b""] * len(self.positions)
+
+    def _send(self, index: int, origin: int | None = None) -> float:
+        """Sends the move to a point (from the origin, with wrap), returns the time it was sent."""
+        if self.wrap is not None:
+            step = shortest_step(self.positions[index] - origin, self.wrap)
+            self.frames[index] = self.motor.controller._encode(self.instruction, self.motor.address, step)
+        sent = time.perf_counter()
+        self.motor.state.invalidate("PO")
+        self.motor.controller.start_move(self.frames[index], {self.motor.address: self.instruction})
+        return sent
+
+    def _origin(self, status: Status | None, index: int) -> int | None:
+        """Position the move to the next point starts from: where the motor got to (or should have)."""
+        if self.wrap is None:
+            return None
+        if isinstance(status, tuple) and status[1] == "PO":
+            return status[2]
+        return self.positions[index]
+
+    def run(self) -> list[TrajectoryPoint]:
+        """Moves through all points, returning the outcome and timing of each."""
+        if not self.positions:
+            return []
+        self.motor.validate_info()
+
+        with self.motor.controller.request((self.motor.address,)):
+            return self._run()
+
+    def _run(self) -> list[TrajectoryPoint]:
+        """Moves through all points, holding the address of the motor."""
+        controller = self.motor.controller
+        address = self.motor.address
+        origin = None
+        if self.wrap is not None:
+            origin = self._origin(self.motor.get("position"), 0)
+        points = []
+        sent = self._send(0, origin)
+        for index, target in enumerate(self.targets):
+            try:
+                status = controller.wait_response(address)
+            finally:
+                controller.end_move((address,))
+            arrived = time.perf_counter()
+            if self.motor.debug:
+                move_check(status)
+            # The trajectory ends early for a safety request
+            is_last = index == len(self.positions) - 1 or controller.stop_requested(address)
+            if is_last or not self.overlap:
+                # With overlap, the motor is on its way to the next point already
+                self.motor.state.update(status)
+            reached = self.extract(status)
+            origin = self._origin(status, index)
+
+            next_sent = 0.0
+            if self.overlap and not is_last:
+                next_sent = self._send(index + 1, origin)
+            callback_start = time.perf_counter()
+            if self.callback is not None:
+                self.callback(self.indices[index], target, reached)
+            callback_duration = time.perf_counter() - callback_start
+            if not self.overlap and not is_last:
+                next_sent = self._send(index + 1, origin)
+
+            points.append(TrajectoryPoint(self.indices[index], target, reached, sent, arrived, callback_duration))
+            if controller.metrics is not None:
+                controller.metrics.record(controller.port, address, self.instruction, arrived - sent,
+                                          len(self.frames[index]), status)
+            if is_last:
+                break
+            sent = next_sent
+
+        return points
@@ -5,6 +5,9 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from elliptec import Controller
+from elliptec.simulator import SimulatedBus, SimulatedDevice
+
 
 def make_info_response(motor_type: int = 14, pulse_per_rev: int = 32768, range_: int = 360, serial_no: str = "12345678") -> dict:
     """Create a canned info dict matching what parse() returns for an IN response."""
@@ -21,15 +24,44 @@ def make_info_response(motor_type: int = 14, pulse_per_rev: int = 32768, range_:
     }
 
 
+def make_sim_controller(*devices: SimulatedDevice,
+                        time_scale: float = 0.0,
+                        timeout: float | None = 2,
+                        port: str = "sim://",
+                        controller_class: type[Controller] = Controller,
+                        **kwargs) -> Controller:
+    """A Controller (or AsyncController) with debug=False unless given, talking to a simulated bus with the
+    given devices. The bus is its transport, controller.s. Other keyword arguments go to the controller."""
+    kwargs.setdefault("debug", False)
+    bus = SimulatedBus(devices, time_scale=time_scale, timeout=timeout, port=port)
+    return controller_class(transport=bus, **kwargs)
+
+
 @pytest.fixture
 def mock_controller():
     """A Controller with a mocked serial port. Does not open any real ports."""
     with patch("elliptec.controller.serial.Serial") as mock_serial_cls:
         mock_serial = MagicMock()
         mock_serial.is_open = True
+        mock_serial.timeout = 2
         mock_serial_cls.return_value = mock_serial
 
         from elliptec.controller import Controller
 
         ctrl = Controller(port="/dev/fake", debug=True)
         yield ctrl
+
+
+@pytest.fixture
+def mock_async_controller():
+    """An AsyncController with a mocked serial port. Does not open any real ports."""
+    with patch("elliptec.controller.serial.Serial") as mock_serial_cls:
+        mock_serial = MagicMock()
+        mock_serial.is_open = True
+        mock_serial.timeout = 2
+        mock_serial_cls.return_value = mock_serial
+
+        from elliptec.async_controller import AsyncController
+
+        ctrl = AsyncController(port="/dev/fake", debug=True)
+        yield ctrl
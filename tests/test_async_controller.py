@@ -0,0 +1,129 @@
+"""Tests for the AsyncController class and the asynchronous Motor methods with mocked serial port."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import PropertyMock
+
+import pytest
+
+INFO_ROTATOR = b"0IN0E1234567820230101016800008000\r\n"
+
+
+def feed(ctrl, *chunks: bytes) -> None:
+    """Makes the mocked serial port deliver the given chunks on consecutive non-blocking reads."""
+    chunks = list(chunks)
+    type(ctrl.s).in_waiting = PropertyMock(side_effect=lambda: len(chunks[0]) if chunks else 0)
+    ctrl.s.read.side_effect = lambda size: chunks.pop(0)
+
+
+class TestAsyncControllerRead:
+    def test_read_position(self, mock_async_controller):
+        feed(mock_async_controller, b"0PO00000064\r\n")
+        status = asyncio.run(mock_async_controller.read_response_async())
+        assert status == ("0", "PO", 100)
+        assert mock_async_controller.last_position == 100
+
+    def test_read_split_frame(self, mock_async_controller):
+        feed(mock_async_controller, b"0PO000", b"00064\r\n")
+        status = asyncio.run(mock_async_controller.read_response_async())
+        assert status == ("0", "PO", 100)
+
+    def test_read_keeps_next_frame(self, mock_async_controller):
+        feed(mock_async_controller, b"0GS00\r\n1PO00000064\r\n")
+        first = asyncio.run(mock_async_controller.read_response_async())
+        second = asyncio.run(mock_async_controller.read_response_async())
+        assert first == ("0", "GS", "0")
+        assert second == ("1", "PO", 100)
+
+    def test_read_timeout(self, mock_async_controller):
+        mock_async_controller.s.timeout = 0.01
+        feed(mock_async_controller)
+        status = asyncio.run(mock_async_controller.read_response_async())
+        assert status is None
+
+
+class TestAsyncControllerSend:
+    def test_send_matches_sync_encoding(self, mock_async_controller):
+        feed(mock_async_controller, b"0POFFFFFF9C\r\n")
+        status = asyncio.run(mock_async_controller.send_instruction_async(b"mr", address="0", message=-100))
+        mock_async_controller.s.write.assert_called_once_with(b"0mrFFFFFF9C")
+        assert status == ("0", "PO", -100)
+
+    def test_concurrent_tasks_do_not_interleave(self, mock_async_controller):
+        feed(mock_async_controller, b"1GS00\r\n", b"2GS00\r\n")
+
+        async def main():
+            return await asyncio.gather(
+                mock_async_controller.send_instruction_async(b"gs", address="1"),
+                mock_async_controller.send_instruction_async(b"gs", address="2"),
+            )
+
+        assert asyncio.run(main()) == [("1", "GS", "0"), ("2", "GS", "0")]
+
+
+class TestAsyncMotors:
+    @pytest.fixture
+    def rotator(self, mock_async_controller):
+        from elliptec.rotator import Rotator
+
+        mock_async_controller.s.read_until.return_value = INFO_ROTATOR
+        return Rotator(mock_async_controller, address="0")
+
+    def test_get_async(self, rotator):
+        feed(rotator.controller, b"0PO00004000\r\n")
+        assert asyncio.run(rotator.get_async("position")) == ("0", "PO", 16384)
+
+    def test_set_unit_async(self, rotator):
+        feed(rotator.controller, b"0PO00004000\r\n")
+        assert asyncio.run(rotator._set_unit_async(180.0)) == 180.0
+        rotator.controller.s.write.assert_called_with(b"0ma00004000")
+
+    def test_move_async_invalid(self, rotator):
+        assert asyncio.run(rotator.move_async("sideways")) is False
+
+    def test_shutter_open_close_async(self, mock_async_controller):
+        from elliptec.shutter import Shutter
+
+        mock_async_controller.s.read_until.return_value = b"0IN061234567820230101001F00008000\r\n"
+        shutter = Shutter(mock_async_controller, address="0")
+        feed(mock_async_controller, b"0PO0000001F\r\n", b"0PO00000000\r\n")
+        assert asyncio.run(shutter.open_async()) == 2
+        assert asyncio.run(shutter.close_async()) == 1
+
+    def test_slider_set_slot_async(self, mock_async_controller):
+        from elliptec.slider import Slider
+
+        mock_async_controller.s.read_until.return_value = b"0IN091234567820230101006000008000\r\n"
+        slider = Slider(mock_async_controller, address="0")
+        feed(mock_async_controller, b"0PO00000040\r\n")
+        assert asyncio.run(slider.set_slot_async(3)) == 3
+
+
+class TestAsyncDuringMoves:
+    HALF_TURN = 131072  # ELL18 pulses
+
+    @staticmethod
+    def rotators(time_scale=0.1):
+        from conftest import make_sim_controller
+        from elliptec.async_controller import AsyncController
+        from elliptec.rotator import Rotator
+        from elliptec.simulator import SimulatedDevice
+
+        ctrl = make_sim_controller(SimulatedDevice(18, address="0"), SimulatedDevice(18, address="1"),
+                                   time_scale=time_scale, controller_class=AsyncController)
+        return Rotator(ctrl, address="0", debug=False), Rotator(ctrl, address="1", debug=False)
+
+    def test_response_from_own_address(self):
+        # The response to the move is waiting on the port before the one asked for
+        first, second = self.rotators(time_scale=0)
+        handle = first.move("absolute", self.HALF_TURN, wait=False)
+        assert asyncio.run(second.get_async("position")) == ("1", "PO", 0)
+        # The responses to the move and its status polls are left to the handle
+        assert handle.result(timeout=2) == ("0", "PO", self.HALF_TURN)
+
+    def test_waits_for_move(self):
+        first, _ = self.rotators()
+        handle = first.move("absolute", self.HALF_TURN, wait=False)
+        assert asyncio.run(first.get_async("position")) == ("0", "PO", self.HALF_TURN)
+        assert handle.done()
+        assert handle.status == ("0", "PO", self.HALF_TURN)
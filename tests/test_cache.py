@@ -0,0 +1,98 @@
+"""Tests for the on-disk device info cache."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import InfoCache, Rotator, Shutter
+from elliptec.errors import ExternalDeviceNotFound
+from elliptec.simulator import SimulatedDevice
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InfoCache(tmp_path / "info.json")
+
+
+class TestInfoCache:
+    def test_roundtrip(self, cache, tmp_path):
+        info = {"Address": "1", "Serial No.": "11400001", "Motor Type": 14, "Thread": None}
+        cache.put("COM3", info)
+        reloaded = InfoCache(tmp_path / "info.json")
+        assert reloaded.get("COM3", "1") == info
+        assert reloaded.get("COM3", "1", serial_no="11400001") == info
+        assert reloaded.get("COM3", "1", serial_no="99999999") is None
+        assert reloaded.get("COM4", "1") is None
+
+    def test_invalidate(self, cache):
+        cache.put("COM3", {"Address": "1", "Serial No.": "11400001"})
+        cache.invalidate("COM3", "1")
+        assert cache.get("COM3", "1") is None
+
+    def test_corrupt_file(self, tmp_path):
+        path = tmp_path / "info.json"
+        path.write_text("{not json")
+        assert InfoCache(path).entries == {}
+
+
+class TestCachedDevices:
+    def test_first_creation_fills_cache(self, cache):
+        controller = make_sim_controller(SimulatedDevice(14, serial_no="11400001"))
+        Rotator(controller, info_cache=cache)
+        assert cache.get("sim://", "0")["Serial No."] == "11400001"
+
+    def test_creation_from_cache_skips_info(self, cache):
+        controller = make_sim_controller(SimulatedDevice(14, serial_no="11400001"))
+        bus = controller.s
+        Rotator(controller, info_cache=cache)
+        written = bus.bytes_written
+
+        rotator = Rotator(controller, info_cache=cache)
+        assert bus.bytes_written == written
+        assert rotator.info_validated is False
+
+        # The first command validates the info
+        assert rotator.set_angle(90) == 90.0
+        assert rotator.info_validated is True
+
+    def test_info_validated_before_conversion(self, cache):
+        controller = make_sim_controller(SimulatedDevice(14, serial_no="11400001"))
+        Rotator(controller, info_cache=cache)
+        # Another rotation mount with another resolution took its place
+        device = SimulatedDevice(18, serial_no="11800001")
+        controller.s.devices = [device]
+
+        rotator = Rotator(controller, info_cache=cache)
+        assert rotator.set_angle(90) == 90.0
+        assert device.position == 262144 // 4
+        assert rotator.motor_type == 18
+
+    def test_serial_no_mismatch_updates_cache(self, cache):
+        controller = make_sim_controller(SimulatedDevice(6, serial_no="10600001"))
+        Shutter(controller, info_cache=cache)
+        controller.s.devices = [SimulatedDevice(6, serial_no="10600002")]
+
+        shutter = Shutter(controller, info_cache=cache)
+        assert shutter.serial_no == "10600001"
+        shutter.open()
+        assert shutter.serial_no == "10600002"
+        assert cache.get("sim://", "0")["Serial No."] == "10600002"
+
+    def test_serial_no_given(self, cache):
+        controller = make_sim_controller(SimulatedDevice(14, serial_no="11400001"))
+        bus = controller.s
+        Rotator(controller, info_cache=cache)
+        written = bus.bytes_written
+        # Cache holds another device, so the info is requested right away
+        Rotator(controller, info_cache=cache, serial_no="11400002")
+        assert bus.bytes_written > written
+
+    def test_device_gone(self, cache):
+        controller = make_sim_controller(SimulatedDevice(14))
+        Rotator(controller, info_cache=cache)
+        controller.s.devices = []
+
+        rotator = Rotator(controller, info_cache=cache)
+        with pytest.raises(ExternalDeviceNotFound):
+            rotator.get_angle()
+        assert cache.get("sim://", "0") is None
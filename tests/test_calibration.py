@@ -0,0 +1,116 @@
+"""Tests for calibrating the timing of devices, on the simulated bus."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import CalibrationStore, MoveModel, Rotator, Shutter, calibrate
+from elliptec.calibration import MoveFit
+from elliptec.cmd import mov_
+from elliptec.motor import QUERY_TIMEOUT, MOVE_TIMEOUT_FACTOR
+from elliptec.simulator import SimulatedDevice
+
+# Simulated time runs this much slower than real time
+TIME_SCALE = 0.05
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CalibrationStore(tmp_path / "calibration.json")
+
+
+def make_model(**moves: MoveFit) -> MoveModel:
+    return MoveModel(serial_no="11400001", motor_type=14, velocity=50, rtt=0.02, rtt_jitter=0.001, moves=moves)
+
+
+class TestMoveFit:
+    def test_line(self):
+        fit = MoveFit.fit([(0, 0.1), (100, 0.2), (200, 0.3)])
+        assert fit.offset == pytest.approx(0.1)
+        assert fit.per_pulse == pytest.approx(0.001)
+        assert fit.jitter == pytest.approx(0.0, abs=1e-12)
+        assert fit.samples == 3
+        assert fit.estimate(-50) == pytest.approx(0.15)
+
+    def test_constant(self):
+        fit = MoveFit.fit([(31, 0.2), (31, 0.22)])
+        assert fit.per_pulse == 0.0
+        assert fit.offset == pytest.approx(0.21)
+        assert fit.jitter > 0
+
+
+class TestMoveModel:
+    def test_estimate(self):
+        model = make_model(ma=MoveFit(0.1, 0.001, 0.0, 3))
+        assert model.estimate("ma", 100) == pytest.approx(0.2)
+        # Twice as fast as calibrated
+        assert model.estimate("ma", 100, velocity=100) == pytest.approx(0.15)
+        assert model.estimate("mr", 100) is None
+
+    def test_store(self, store, tmp_path):
+        model = make_model(ma=MoveFit(0.1, 0.001, 0.0, 3))
+        store.put(model)
+        assert CalibrationStore(tmp_path / "calibration.json").get("11400001") == model
+        assert store.get("99999999") is None
+        store.invalidate("11400001")
+        assert store.get("11400001") is None
+
+    def test_unreadable(self, tmp_path):
+        path = tmp_path / "calibration.json"
+        path.write_text("{not json")
+        assert CalibrationStore(path).entries == {}
+        path.write_text('{"11400001": {"rtt": 1}}')
+        assert CalibrationStore(path).get("11400001") is None
+
+
+class TestCalibrate:
+    def test_rotator(self, store):
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14, serial_no="11400001"), time_scale=TIME_SCALE))
+        model = calibrate(rotator, store=store, repeats=1)
+        assert rotator.calibration is model
+        assert model.serial_no == "11400001" and model.velocity == 100
+        assert set(model.moves) == {"ma", "mr", "fw", "bw", "ho"}
+        # A revolution takes travel_time, slowed down like the simulation
+        full_turn = 0.85 * TIME_SCALE
+        assert model.moves["ma"].per_pulse * rotator.pulse_per_rev == pytest.approx(full_turn, rel=0.1)
+        assert model.moves["mr"].per_pulse * rotator.pulse_per_rev == pytest.approx(full_turn, rel=0.1)
+        assert model.rtt < model.moves["ma"].offset + 0.005
+        assert store.get("11400001") == model
+
+    def test_slider(self):
+        shutter = Shutter(make_sim_controller(SimulatedDevice(6), time_scale=TIME_SCALE))
+        model = calibrate(shutter, repeats=1)
+        assert model.moves["ma"].offset == pytest.approx(0.2 * TIME_SCALE, abs=0.005)
+
+    def test_estimates_and_timeouts(self, store):
+        controller = make_sim_controller(SimulatedDevice(14, serial_no="11400001"), time_scale=TIME_SCALE)
+        calibrate(Rotator(controller), store=store, repeats=1)
+        rotator = Rotator(controller)
+        uncalibrated = rotator.estimate_move_time(10000, "relative")
+        assert rotator.load_calibration(store)
+        estimate = rotator.estimate_move_time(10000, "relative")
+        assert estimate == pytest.approx(rotator.calibration.estimate("mr", 10000))
+        assert estimate != uncalibrated
+        # The velocity is read along with the calibration
+        assert rotator.velocity == 100
+        assert rotator.timeout_for(mov_["relative"], 10000) == pytest.approx(QUERY_TIMEOUT + MOVE_TIMEOUT_FACTOR * estimate)
+        with pytest.raises(ValueError):
+            rotator.estimate_move_time(0, "sideways")
+
+    def test_slower_since_calibration(self, store):
+        device = SimulatedDevice(14, serial_no="11400001")
+        controller = make_sim_controller(device, time_scale=TIME_SCALE)
+        model = calibrate(Rotator(controller), store=store, repeats=1)
+        # Set slower and saved since, the device starts at that velocity
+        device.velocity = 50
+        rotator = Rotator(controller)
+        rotator.load_calibration(store)
+        assert rotator.velocity == 50
+        assert rotator.estimate_move_time(rotator.pulse_per_rev, "relative") > model.estimate("mr", rotator.pulse_per_rev)
+
+    def test_timeout_floor_until_velocity_known(self, store):
+        controller = make_sim_controller(SimulatedDevice(14), time_scale=TIME_SCALE, timeout=5)
+        rotator = Rotator(controller)
+        rotator.calibration = make_model(mr=MoveFit(0.01, 1e-6, 0.0, 10))
+        assert rotator.velocity is None
+        assert rotator.timeout_for(mov_["relative"], 10000) == 5
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from unittest.mock import MagicMock, patch
 
+import pytest
 from elliptec.controller import Controller
 
 
@@ -98,6 +99,87 @@ class TestControllerSendInstruction:
         mock_controller.s.write.assert_called_once_with(b"0mrFFFFFF9C")
 
 
+class TestControllerEncode:
+    def test_without_message(self, mock_controller):
+        assert mock_controller._encode(b"gp", "A") == b"Agp"
+
+    def test_int_message(self, mock_controller):
+        assert mock_controller._encode(b"ma", "0", 35840) == b"0ma00008C00"
+        assert mock_controller._encode(b"mr", "0", -1) == b"0mrFFFFFFFF"
+        assert mock_controller._encode(b"ma", "0", -0x80000000) == b"0ma80000000"
+
+    def test_matches_to_bytes(self, mock_controller):
+        for value in (0, 1, 255, 65536, 0x7FFFFFFF, -2, -65536):
+            expected = b"0ma" + value.to_bytes(4, "big", signed=True).hex().upper().encode()
+            assert mock_controller._encode(b"ma", "0", value) == expected
+
+    def test_out_of_range(self, mock_controller):
+        with pytest.raises(OverflowError):
+            mock_controller._encode(b"ma", "0", 0x80000000)
+
+    def test_str_message(self, mock_controller):
+        assert mock_controller._encode(b"ca", "0", "3") == b"0ca3"
+
+    def test_prefix_reused(self, mock_controller):
+        mock_controller._encode(b"gp", "1")
+        prefix = mock_controller._prefixes["1", b"gp"]
+        assert mock_controller._encode(b"gp", "1") is prefix
+
+
+class TestControllerSendMany:
+    def test_single_write_for_batch(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"2PO00000064\r\n", b"1PO00000000\r\n"]
+        result = mock_controller.send_many([("1", b"gp", None), ("2", b"gp", None)])
+        mock_controller.s.write.assert_called_once_with(b"1gp2gp")
+        # Responses are matched by address, not by arrival order
+        assert result == [("1", "PO", 0), ("2", "PO", 100)]
+
+    def test_missing_address(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"1GS00\r\n", b""]
+        result = mock_controller.send_many([("1", b"gs", None), ("2", b"gs", None)])
+        assert result == [("1", "GS", "0"), None]
+        # A single timeout ends the batch
+        assert mock_controller.s.read_until.call_count == 2
+
+    def test_repeated_address_split_into_batches(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"1PO00000064\r\n", b"1PO000000C8\r\n"]
+        result = mock_controller.send_many([("1", b"ma", 100), ("1", b"ma", 200)])
+        assert mock_controller.s.write.call_args_list[0][0][0] == b"1ma00000064"
+        assert mock_controller.s.write.call_args_list[1][0][0] == b"1ma000000C8"
+        assert result == [("1", "PO", 100), ("1", "PO", 200)]
+
+    def test_info_responses(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"3IN0E1234567820230101016800008000\r\n", b""]
+        result = mock_controller.send_many([("0", b"in", None), ("3", b"in", None)])
+        assert result[0] is None
+        assert result[1]["Serial No."] == "12345678"
+
+
+class TestControllerResponseRouting:
+    def test_other_address_filed(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"2PO00000064\r\n", b"1GS00\r\n"]
+        assert mock_controller.send_instruction(b"gs", address="1") == ("1", "GS", "0")
+        assert mock_controller.take_responses("2") == [("2", "PO", 100)]
+        assert mock_controller.take_responses("2") == []
+
+    def test_late_response_discarded(self, mock_controller):
+        mock_controller._file(("1", "PO", 100))
+        mock_controller.s.read_until.return_value = b"1GS00\r\n"
+        assert mock_controller.send_instruction(b"gs", address="1") == ("1", "GS", "0")
+
+    def test_change_address_answered_from_new_address(self, mock_controller):
+        mock_controller.s.read_until.side_effect = [b"3GS00\r\n"]
+        assert mock_controller.send_instruction(b"ca", address="0", message="3") == ("3", "GS", "0")
+
+    def test_poll_responses(self, mock_controller):
+        mock_controller.s.in_waiting = 18
+        mock_controller.s.read.return_value = b"1GS09\r\n2PO00000064\r\n2G"
+        assert mock_controller.poll_responses() == 2
+        assert mock_controller.take_responses("1") == [("1", "GS", "9")]
+        # The incomplete response stays buffered
+        assert mock_controller._rx_buffer == b"2G"
+
+
 class TestControllerCloseConnection:
     def test_close_open(self, mock_controller):
         mock_controller.s.is_open = True
@@ -28,6 +28,7 @@ def _make_device(cls, motor_type: int, pulse_per_rev: int, range_: int, **extra_
     info = make_info_response(motor_type=motor_type, pulse_per_rev=pulse_per_rev, range_=range_)
 
     mock_ctrl = MagicMock()
+    mock_ctrl.timeout = 2
     mock_ctrl.send_instruction.return_value = info
 
     device = cls(controller=mock_ctrl, address="0", debug=True, **extra_init)
@@ -391,6 +392,15 @@ class TestMotorBase:
         with pytest.raises(ExternalDeviceNotFound):
             Rotator(controller=mock_ctrl, address="0", debug=True)
 
+    def test_debug_follows_controller(self):
+        from elliptec.rotator import Rotator
+
+        mock_ctrl = MagicMock()
+        mock_ctrl.send_instruction.return_value = make_info_response()
+        mock_ctrl.debug = False
+        assert not Rotator(controller=mock_ctrl, address="0").debug
+        assert Rotator(controller=mock_ctrl, address="0", debug=True).debug
+
     def test_get_invalid_command(self, motor):
         result = motor.get("nonexistent_command")
         assert result is None
@@ -486,3 +496,62 @@ class TestContinuousMotorBase:
 
     def test_extract_unit_gj(self, motor):
         assert motor._extract_unit_from_status(("0", "GJ", 1000)) is not None
+
+
+# ===========================================================================
+# Array conversions (ContinuousMotor, requires numpy)
+# ===========================================================================
+
+class TestArrayConversions:
+    @pytest.fixture(params=[("Rotator", 14, 143360, 360), ("Rotator", 18, 262144, 360),
+                            ("Linear", 20, 1024, 60), ("Iris", 15, 1024, 12)])
+    def motor(self, request):
+        import elliptec
+
+        name, motor_type, pulse_per_rev, range_ = request.param
+        return _make_device(getattr(elliptec, name), motor_type=motor_type, pulse_per_rev=pulse_per_rev, range_=range_)
+
+    def test_positions_to_units_matches_scalar(self, motor):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(0)
+        positions = np.concatenate([rng.integers(-2**31, 2**31, 20000), np.arange(-5000, 5000)])
+        units = motor.positions_to_units(positions)
+        assert units.dtype == np.float64
+        assert units.tolist() == [motor._pos_to_unit(int(p)) for p in positions]
+
+    def test_units_to_positions_matches_scalar(self, motor):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(1)
+        values = np.concatenate([rng.uniform(-720, 720, 20000), np.round(np.arange(-360, 360, 0.001), 3)])
+        positions = motor.units_to_positions(values)
+        assert positions.dtype == np.int64
+        assert positions.tolist() == [motor._unit_to_pos(float(v)) for v in values]
+
+    def test_keeps_shape(self, motor):
+        np = pytest.importorskip("numpy")
+        grid = np.zeros((3, 4))
+        assert motor.units_to_positions(grid).shape == (3, 4)
+        assert motor.positions_to_units(grid.astype(int)).shape == (3, 4)
+        assert motor.positions_to_units(0) == 0.0
+
+    def test_non_finite(self, motor):
+        np = pytest.importorskip("numpy")
+        with pytest.raises(ValueError):
+            motor.units_to_positions([1.0, np.nan])
+
+
+class TestArrayConversionsFallback:
+    def test_subclass_without_unrounded_conversions(self):
+        np = pytest.importorskip("numpy")
+        from elliptec.continuous import ContinuousMotor
+
+        class Custom(ContinuousMotor):
+            def _pos_to_unit(self, position):
+                return position / 2
+
+            def _unit_to_pos(self, value):
+                return int(value * 2)
+
+        custom = _make_device(Custom, motor_type=14, pulse_per_rev=32768, range_=360)
+        assert custom.positions_to_units(np.array([1, 2])).tolist() == [0.5, 1.0]
+        assert custom.units_to_positions([0.5, 1.0]).tolist() == [1, 2]
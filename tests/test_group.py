@@ -0,0 +1,102 @@
+"""Tests for synchronized group moves, using the simulated bus."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import MotorGroup, Rotator, Slider
+from elliptec.errors import ExternalDeviceNotFound
+from elliptec.simulator import SimulatedDevice
+
+
+@pytest.fixture
+def controller():
+    return make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(14, address="2"))
+
+
+@pytest.fixture
+def bus(controller):
+    return controller.s
+
+
+@pytest.fixture
+def rotators(controller):
+    return [Rotator(controller, address="1", debug=False), Rotator(controller, address="2", debug=False)]
+
+
+class TestMotorGroup:
+    def test_single_move_command(self, bus, rotators):
+        group = MotorGroup(rotators)
+        written = bus.bytes_written
+        assert group.set_unit(90) == [90.0, 90.0]
+        # Two "ga" commands and a single move
+        move = len(b"Fma00008C00")
+        assert bus.bytes_written - written == 2 * len(b"1gaF") + move
+        assert [device.position for device in bus.devices] == [35840, 35840]
+
+    def test_group_released_after_move(self, bus, rotators):
+        MotorGroup(rotators).home()
+        assert [device.group_address for device in bus.devices] == [None, None]
+        # Moving one member afterwards only moves that one
+        rotators[0].set_angle(10)
+        assert bus.devices[1].position == 0
+
+    def test_shift_unit(self, rotators):
+        group = MotorGroup(rotators)
+        group.set_unit(10)
+        assert group.shift_unit(5) == pytest.approx([15.0, 15.0], abs=0.003)
+
+    def test_missing_reply_releases_member(self, bus, rotators):
+        group = MotorGroup(rotators)
+        # The second member rejects the move as it is busy
+        bus.devices[1].busy_until = float("inf")
+        statuses = group.move_absolute(1000)
+        assert statuses == [("1", "PO", 1000), ("2", "GS", "9")]
+        assert [device.group_address for device in bus.devices] == [None, None]
+
+    def test_member_not_found(self, bus, rotators):
+        bus.devices.pop()
+        with pytest.raises(ExternalDeviceNotFound):
+            MotorGroup(rotators).home()
+        assert bus.devices[0].group_address is None
+
+    def test_invalid_move(self, rotators):
+        assert MotorGroup(rotators).move("sideways") is None
+
+    def test_validation(self, bus, rotators):
+        with pytest.raises(ValueError):
+            MotorGroup([])
+        with pytest.raises(ValueError):
+            MotorGroup(rotators, group_address="1")
+        with pytest.raises(ValueError):
+            MotorGroup([rotators[0], rotators[0]])
+        other = Rotator(make_sim_controller(SimulatedDevice(14)), debug=False)
+        with pytest.raises(ValueError):
+            MotorGroup([rotators[0], other])
+
+    def test_group_address_not_used_on_bus(self):
+        controller = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(14, address="2"),
+                                         SimulatedDevice(14, address="F"))
+        rotators = [Rotator(controller, address="1"), Rotator(controller, address="2")]
+        outsider = Rotator(controller, address="F")
+        group = MotorGroup(rotators)
+        assert group.group_address == "E"
+        with pytest.raises(ValueError):
+            MotorGroup(rotators, group_address="F")
+        group.set_unit(10)
+        assert outsider.get_angle() == 0
+
+    def test_group_address_taken_later(self):
+        controller = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(14, address="F"))
+        group = MotorGroup([Rotator(controller, address="1")])
+        assert group.group_address == "F"
+        # The device at address F answers for the first time
+        Rotator(controller, address="F")
+        with pytest.raises(ValueError):
+            group.home()
+
+    def test_units_require_continuous_motors(self):
+        controller = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(9, address="2"))
+        group = MotorGroup([Rotator(controller, address="1"), Slider(controller, address="2")])
+        with pytest.raises(TypeError):
+            group.set_unit(10)
@@ -0,0 +1,112 @@
+"""Tests for the instrumentation of commands."""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Metrics, Rotator
+from elliptec.metrics import LatencyHistogram
+from elliptec.simulator import SimulatedDevice
+from elliptec.tools import Reply
+
+
+class TestLatencyHistogram:
+    def test_observe(self):
+        histogram = LatencyHistogram((0.01, 0.1))
+        for latency in (0.005, 0.01, 0.05, 1.0):
+            histogram.observe(latency)
+        # Bounds are inclusive
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.mean == pytest.approx(1.065 / 4)
+        assert histogram.snapshot()["buckets"] == [[0.01, 2], [0.1, 3], ["+Inf", 4]]
+
+    def test_quantile(self):
+        histogram = LatencyHistogram((0.01, 0.02))
+        assert histogram.quantile(0.5) is None
+        for _ in range(10):
+            histogram.observe(0.015)
+        assert histogram.quantile(0.5) == pytest.approx(0.015)
+        histogram.observe(5)
+        assert histogram.quantile(1) == 0.02
+
+
+class TestMetrics:
+    def test_record(self):
+        metrics = Metrics()
+        metrics.record("COM7", "0", b"ma", 0.5, 11, Reply("0", "PO", 100))
+        metrics.record("COM7", "0", b"ma", 0.1, 11, Reply("0", "GS", "9"))
+        metrics.record("COM7", "0", b"ho0", 0.1, 4, None)
+        stats = metrics.get("0", "ma")
+        assert stats.count == 2
+        assert stats.bytes_sent == 22
+        assert stats.errors == {"Busy": 1}
+        assert stats.timeouts == 0
+        assert metrics.get("0", "ho", port="COM7").timeouts == 1
+        assert metrics.get("0", "ho", port="COM8") is None
+
+    def test_hooks(self):
+        metrics = Metrics()
+        events = []
+        metrics.add_hook(events.append)
+        metrics.record("COM7", "1", b"gs", 0.01, 3, Reply("1", "GS", "2"))
+        assert len(events) == 1
+        assert events[0].command == "gs"
+        assert events[0].error == "Mechanical Timeout"
+        assert not events[0].timed_out
+
+    def test_json(self):
+        metrics = Metrics()
+        metrics.record("COM7", "0", b"gp", 0.01, 3, Reply("0", "PO", 0))
+        metrics.record_sent("COM7", 3)
+        metrics.record_received("COM7", 13)
+        snapshot = json.loads(metrics.to_json())
+        assert snapshot["commands"][0]["count"] == 1
+        assert snapshot["commands"][0]["latency"]["count"] == 1
+        assert snapshot["wire"] == [{"port": "COM7", "bytes_sent": 3, "bytes_received": 13}]
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.record("COM7", "0", b"ma", 0.05, 11, Reply("0", "GS", "4"))
+        text = metrics.to_prometheus()
+        assert "# TYPE elliptec_commands_total counter" in text
+        assert 'elliptec_commands_total{port="COM7",address="0",command="ma"} 1' in text
+        assert ('elliptec_command_errors_total{port="COM7",address="0",command="ma",error="Value Out of Range"} 1'
+                in text)
+        assert 'elliptec_command_latency_seconds_bucket{port="COM7",address="0",command="ma",le="0.01"} 0' in text
+        assert 'elliptec_command_latency_seconds_bucket{port="COM7",address="0",command="ma",le="+Inf"} 1' in text
+        assert 'elliptec_command_latency_seconds_count{port="COM7",address="0",command="ma"} 1' in text
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.record("COM7", "0", b"gp", 0.01, 3, None)
+        metrics.reset()
+        assert metrics.snapshot() == {"commands": [], "wire": []}
+
+
+class TestControllerMetrics:
+    def test_commands_and_wire(self):
+        metrics = Metrics()
+        ctrl = make_sim_controller(SimulatedDevice(14), timeout=0.05, metrics=metrics)
+        bus = ctrl.s
+        rotator = Rotator(ctrl)
+        rotator.set_angle(90)
+        rotator.get_angle()
+        ctrl.send_instruction(b"gs", address="5")
+        assert metrics.get("0", "in").count == 1
+        assert metrics.get("0", "ma").count == 1
+        assert metrics.get("0", "gp").count == 1
+        assert metrics.get("5", "gs").timeouts == 1
+        assert metrics.bytes_sent["sim://"] == bus.bytes_written
+        assert metrics.bytes_received["sim://"] == bus.bytes_read
+
+    def test_send_many_and_background_moves(self):
+        metrics = Metrics()
+        ctrl = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(14, address="2"), metrics=metrics)
+        ctrl.send_many([("1", b"gp", None), ("2", b"gs", None)])
+        assert metrics.get("1", "gp").count == 1
+        assert metrics.get("2", "gs").count == 1
+        rotator = Rotator(ctrl, address="1")
+        rotator.move("absolute", 1000, wait=False).wait()
+        assert metrics.get("1", "ma").count == 1
@@ -0,0 +1,150 @@
+"""Tests for moves running in the background (MoveHandle), on the simulated bus."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import AsyncController, Linear, MoveHandle, Rotator, Slider
+from elliptec.simulator import SimulatedDevice
+
+# Simulated time runs this much slower than real time
+TIME_SCALE = 0.1
+
+HALF_TURN = 131072  # ELL18 pulses
+
+
+class TestMoveHandle:
+    def test_returns_before_the_move_finishes(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        assert isinstance(handle, MoveHandle)
+        assert not handle.done()
+        assert ctrl.moves == {"0": handle}
+        assert handle.result(timeout=1) == ("0", "PO", HALF_TURN)
+        assert handle.done()
+        assert ctrl.moves == {}
+
+    def test_in_flight_until_done(self):
+        # Background moves are tracked like all others, so that a safety request can stop them
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        assert ctrl._in_flight == {"0": b"ma"}
+        handle.result(timeout=1)
+        assert ctrl._in_flight == {}
+
+    def test_outlasts_read_timeout(self):
+        # The move takes longer than the read timeout of the port
+        ctrl = make_sim_controller(SimulatedDevice(18), timeout=0.2, time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        assert handle.result(timeout=1) == ("0", "PO", HALF_TURN)
+        # A blocking move is waited for as long as it takes as well (see Motor.timeout_for())
+        assert rotator.move("absolute", 0) == ("0", "PO", 0)
+
+    def test_several_motors(self):
+        ctrl = make_sim_controller(SimulatedDevice(18, address="1"), SimulatedDevice(14, address="2"), time_scale=TIME_SCALE)
+        first = Rotator(ctrl, address="1", debug=False)
+        second = Rotator(ctrl, address="2", debug=False)
+        handles = [first.move("absolute", HALF_TURN, wait=False), second.move("absolute", 1000, wait=False)]
+        assert set(ctrl.moves) == {"1", "2"}
+        assert [handle.result(timeout=1) for handle in handles] == [("1", "PO", HALF_TURN), ("2", "PO", 1000)]
+
+    def test_command_waits_for_move(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        assert rotator.get("position") == ("0", "PO", HALF_TURN)
+        assert handle.done()
+
+    def test_cancel(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=1)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        assert not handle.wait(timeout=0.1)
+        assert handle.cancel()
+        address, code, position = handle.status
+        assert (address, code) == ("0", "PO")
+        assert 0 < position < HALF_TURN
+        assert rotator.get("position") == ("0", "PO", position)
+        assert not handle.cancel()
+
+    def test_stop(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=1)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        rotator.stop()
+        assert handle.done()
+        assert handle.status[2] < HALF_TURN
+
+    def test_refused_move(self):
+        ctrl = make_sim_controller(SimulatedDevice(20), time_scale=TIME_SCALE)
+        linear = Linear(ctrl, debug=False)
+        handle = linear.move("absolute", -1, wait=False)
+        assert handle.result(timeout=1) == ("0", "GS", "4")
+
+    def test_result_timeout(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=1)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", HALF_TURN, wait=False)
+        with pytest.raises(TimeoutError):
+            handle.result(timeout=0.01)
+        handle.cancel()
+
+    def test_invalid_command(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        assert rotator.move("sideways", wait=False) is False
+        with pytest.raises(ValueError):
+            MoveHandle(rotator, "sideways")
+
+
+class TestStreamPositions:
+    def test_follows_move(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), time_scale=1)
+        rotator = Rotator(ctrl, debug=False)
+        handle = rotator.move("absolute", rotator.angle_to_pos(90), wait=False)
+        samples = list(rotator.stream_positions(until=handle))
+        times = [t for t, _ in samples]
+        angles = [angle for _, angle in samples]
+        assert len(samples) > 5
+        assert times == sorted(times)
+        assert angles == sorted(angles)
+        assert 0 < angles[len(angles) // 2] < 90
+        assert angles[-1] == pytest.approx(90, abs=0.01)
+        assert handle.result() == ("0", "PO", rotator.angle_to_pos(90))
+
+    def test_backs_off_when_idle(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), time_scale=1)
+        rotator = Rotator(ctrl, debug=False)
+        samples = list(rotator.stream_positions(rate=1000, until=0.3, idle_interval=0.1))
+        # 1 ms while the position seems to change, then 10, 20, 40, 80 and 100 ms
+        assert 3 < len(samples) < 10
+        assert {angle for _, angle in samples} == {0}
+
+    def test_until_callable(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, debug=False)
+        samples = []
+        for sample in rotator.stream_positions(until=lambda: len(samples) == 3):
+            samples.append(sample)
+        # The sample taken when the condition is met is the last one
+        assert len(samples) == 4
+
+    def test_pulses_for_slider(self):
+        ctrl = make_sim_controller(SimulatedDevice(9, position=62), time_scale=TIME_SCALE)
+        slider = Slider(ctrl, debug=False)
+        assert [position for _, position in slider.stream_positions(until=0)] == [62]
+
+    def test_async(self):
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14), time_scale=1, controller_class=AsyncController), debug=False)
+
+        async def collect():
+            return [sample async for sample in rotator.stream_positions_async(rate=100, until=0.05)]
+
+        samples = asyncio.run(collect())
+        assert len(samples) > 1
+        assert all(angle == 0 for _, angle in samples)
@@ -0,0 +1,98 @@
+"""Tests for ordering the points of sweeps, using the simulated bus."""
+from __future__ import annotations
+
+import itertools
+import random
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Linear, MoveModel, Rotator, Slider, plan_visits
+from elliptec.calibration import MoveFit
+from elliptec.planner import shortest_step
+from elliptec.simulator import SimulatedDevice
+
+
+def make_motor(cls, motor_type: int):
+    device = SimulatedDevice(motor_type)
+    return cls(make_sim_controller(device), debug=False), device
+
+
+def travel(start: int, positions: list[int], period: int | None = None) -> int:
+    """Total distance travelled through the positions, the shorter way round with a period."""
+    total = 0
+    for position in positions:
+        step = position - start
+        total += abs(shortest_step(step, period) if period else step)
+        start = position
+    return total
+
+
+def test_shortest_step():
+    assert shortest_step(10, 360) == 10
+    assert shortest_step(350, 360) == -10
+    assert shortest_step(-350, 360) == 10
+    assert shortest_step(180, 360) == -180
+
+
+def test_linear_sweeps_to_nearer_end_first():
+    linear, _ = make_motor(Linear, 20)
+    plan = plan_visits(linear, [500, 100, 900, 300], start=400)
+    assert plan.positions == [300, 100, 500, 900]
+    assert plan.order == [3, 1, 0, 2]
+    assert plan.reorder(["a", "b", "c", "d"]) == ["d", "b", "a", "c"]
+    assert plan.duration < plan.given_duration
+
+
+def test_rotator_passes_through_zero():
+    rotator, _ = make_motor(Rotator, 14)
+    plan = rotator.plan_trajectory([350, 10, 340, 30], start=0)
+    # Back to 340 degrees and forwards again is shorter than to 30 degrees and back
+    assert plan.order == [0, 2, 1, 3]
+
+
+@pytest.mark.parametrize("motor_type", [14, 20])
+def test_shortest_travel(motor_type):
+    motor, _ = make_motor(Rotator if motor_type == 14 else Linear, motor_type)
+    period = motor.pulse_per_rev if motor_type == 14 else None
+    rng = random.Random(motor_type)
+    for _ in range(30):
+        positions = [rng.randrange(motor.max_position) for _ in range(rng.randint(1, 6))]
+        start = rng.randrange(motor.max_position)
+        plan = plan_visits(motor, positions, start=start)
+        assert sorted(plan.order) == list(range(len(positions)))
+        best = min(travel(start, list(order), period) for order in itertools.permutations(positions))
+        assert travel(start, plan.positions, period) == best
+
+
+def test_duration():
+    rotator, _ = make_motor(Rotator, 14)
+    plan = plan_visits(rotator, [100, 200], start=0)
+    assert plan.duration == pytest.approx(2 * rotator.move_duration(100))
+    rotator.calibration = MoveModel("0", 14, None, 0.001, 0.0, {"mr": MoveFit(0.05, 1e-5, 0.0, 10)})
+    plan = plan_visits(rotator, [100, 200], start=0)
+    assert plan.duration == pytest.approx(2 * (0.05 + 100 * 1e-5))
+
+
+def test_run_trajectory_optimized():
+    rotator, device = make_motor(Rotator, 14)
+    rotator.set_angle(0)
+    visited = []
+    points = rotator.run_trajectory([350, 10, 340, 30], callback=lambda i, t, r: visited.append((i, t, r)),
+                                    optimize=True)
+    assert [point.index for point in points] == [0, 2, 1, 3]
+    assert [(i, t) for i, t, _ in visited] == [(0, 350), (2, 340), (1, 10), (3, 30)]
+    assert [point.reached for point in points] == pytest.approx([350, 340, 10, 30], abs=0.003)
+    assert rotator.get_angle() == pytest.approx(30, abs=0.003)
+    # Relative moves the shorter way round, never across the whole revolution
+    assert abs(device.move_target - device.move_origin) < rotator.pulse_per_rev / 2
+
+
+def test_run_sequence_optimized():
+    slider, _ = make_motor(Slider, 9)
+    slider.set_slot(2)
+    plan = slider.plan_sequence([4, 1, 3, 2])
+    assert plan.reorder([4, 1, 3, 2]) == [2, 1, 3, 4]
+    points = slider.run_sequence([4, 1, 3, 2], optimize=True)
+    assert [point.index for point in points] == [3, 1, 2, 0]
+    assert [point.reached for point in points] == [2, 1, 3, 4]
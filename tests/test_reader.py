@@ -0,0 +1,89 @@
+"""Tests for the reader thread of the Controller, on the simulated bus."""
+from __future__ import annotations
+
+import asyncio
+
+import serial
+
+from conftest import make_sim_controller
+from elliptec import AsyncController, Rotator
+from elliptec.simulator import SimulatedBus, SimulatedDevice
+
+HALF_TURN = 131072  # ELL18 pulses
+
+
+class TestReaderThread:
+    def test_start_and_stop(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), reader_thread=True)
+        assert ctrl.reader_running
+        assert ctrl.send_instruction(b"gp", address="0") == ("0", "PO", 0)
+        ctrl.stop_reader()
+        assert not ctrl.reader_running
+        # Without the thread, the port is read directly again
+        assert ctrl.send_instruction(b"gs", address="0") == ("0", "GS", "0")
+        ctrl.start_reader()
+        ctrl.close_connection()
+        assert not ctrl.reader_running
+
+    def test_late_response_not_misattributed(self):
+        ctrl = make_sim_controller(SimulatedDevice(18, address="1"), SimulatedDevice(14, address="2"),
+                               time_scale=0.1, timeout=0.05, reader_thread=True)
+        # The move outlasts the read timeout, its response arrives later
+        assert ctrl.send_instruction(b"ma", address="1", message=HALF_TURN) is None
+        assert ctrl.send_instruction(b"gp", address="2") == ("2", "PO", 0)
+        ctrl.close_connection()
+
+    def test_missing_address_times_out(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), timeout=0.05, reader_thread=True)
+        assert ctrl.send_instruction(b"gs", address="5") is None
+        ctrl.close_connection()
+
+    def test_malformed_response_dropped(self):
+        ctrl = make_sim_controller(SimulatedDevice(14), reader_thread=True)
+        # Line noise arrives ahead of the response
+        ctrl.s._rx_buffer += b"\x00\r\n"
+        assert ctrl.send_instruction(b"gp", address="0") == ("0", "PO", 0)
+        assert ctrl.reader_running
+        ctrl.close_connection()
+
+    def test_reader_stopped_by_port_error(self, monkeypatch):
+        ctrl = make_sim_controller(SimulatedDevice(14), reader_thread=True)
+        reader = ctrl._reader
+
+        def fail(bus):
+            raise serial.SerialException("device disconnected")
+
+        monkeypatch.setattr(SimulatedBus, "in_waiting", property(fail))
+        reader.join(timeout=1)
+        assert not ctrl.reader_running
+        monkeypatch.undo()
+        # The port is read directly again
+        assert ctrl.send_instruction(b"gp", address="0") == ("0", "PO", 0)
+        ctrl.close_connection()
+
+    def test_send_many(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(6, address="2"), timeout=0.05, reader_thread=True)
+        result = ctrl.send_many([("1", b"ma", 1000), ("2", b"fw", None), ("3", b"gs", None)])
+        assert result == [("1", "PO", 1000), ("2", "PO", 31), None]
+        ctrl.close_connection()
+
+    def test_read_response_in_order_of_arrival(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(14, address="2"), reader_thread=True)
+        ctrl.write_command(b"2gs1gs")
+        assert ctrl.read_response() == ("2", "GS", "0")
+        assert ctrl.read_response() == ("1", "GS", "0")
+        ctrl.close_connection()
+
+    def test_background_moves(self):
+        ctrl = make_sim_controller(SimulatedDevice(18, address="1"), SimulatedDevice(18, address="2"), time_scale=0.1, reader_thread=True)
+        first = Rotator(ctrl, address="1", debug=False)
+        second = Rotator(ctrl, address="2", debug=False)
+        handles = [first.move("absolute", HALF_TURN, wait=False), second.move("absolute", 1000, wait=False)]
+        assert [handle.result(timeout=1) for handle in handles] == [("1", "PO", HALF_TURN), ("2", "PO", 1000)]
+        ctrl.close_connection()
+
+    def test_async(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, address="1"), controller_class=AsyncController, reader_thread=True)
+        rotator = Rotator(ctrl, address="1", debug=False)
+        assert asyncio.run(rotator.move_async("absolute", 1000)) == ("1", "PO", 1000)
+        ctrl.close_connection()
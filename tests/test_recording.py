@@ -0,0 +1,112 @@
+"""Tests for recording the traffic on a port and replaying it."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Controller, ReplayPort, Rotator, TrafficRecorder, read_recording
+from elliptec.recording import RX, TX, Frame
+from elliptec.simulator import SimulatedDevice
+
+
+def record_session(path, time_scale: float = 0.0) -> None:
+    """Records a short session with a rotator on the simulated bus."""
+    with make_sim_controller(SimulatedDevice(18), time_scale=time_scale, record=path) as ctrl:
+        rotator = Rotator(ctrl)
+        rotator.home()
+        rotator.set_angle(90)
+
+
+class TestTrafficRecorder:
+    def test_frames(self, tmp_path):
+        path = tmp_path / "session.ellrec"
+        ticks = iter(range(100, 1000, 100))
+        recorder = TrafficRecorder(path, clock=lambda: next(ticks))
+        recorder.record(TX, b"0gp")
+        recorder.record(RX, b"")
+        recorder.record(RX, b"0PO00000000\r\n")
+        recorder.close()
+        assert recorder.closed
+        assert read_recording(path) == [Frame(100, TX, b"0gp"), Frame(200, RX, b"0PO00000000\r\n")]
+
+    def test_append(self, tmp_path):
+        path = tmp_path / "session.ellrec"
+        for data in (b"0gs", b"1gs"):
+            recorder = TrafficRecorder(path)
+            recorder.record(TX, data)
+            recorder.close()
+        assert [frame.data for frame in read_recording(path)] == [b"0gs", b"1gs"]
+
+    def test_truncated_record(self, tmp_path):
+        path = tmp_path / "session.ellrec"
+        recorder = TrafficRecorder(path)
+        recorder.record(TX, b"0gs")
+        recorder.record(RX, b"0GS00\r\n")
+        recorder.close()
+        path.write_bytes(path.read_bytes()[:-2])
+        assert [frame.data for frame in read_recording(path)] == [b"0gs"]
+
+    def test_not_a_recording(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"something else entirely")
+        with pytest.raises(ValueError):
+            read_recording(path)
+        with pytest.raises(ValueError):
+            TrafficRecorder(path)
+
+
+class TestControllerRecording:
+    def test_records_traffic(self, tmp_path):
+        path = tmp_path / "session.ellrec"
+        record_session(path)
+        frames = read_recording(path)
+        assert frames[0] == Frame(frames[0].timestamp_ns, TX, b"0in")
+        assert frames[1].direction == RX and frames[1].data.startswith(b"0IN12")
+        assert Frame(frames[-1].timestamp_ns, RX, b"0PO00010000\r\n") in frames
+        timestamps = [frame.timestamp_ns for frame in frames]
+        assert timestamps == sorted(timestamps)
+
+    def test_settings_reach_the_port(self, tmp_path):
+        ctrl = make_sim_controller(SimulatedDevice(14), record=tmp_path / "session.ellrec")
+        bus = ctrl.s
+        with ctrl.read_timeout(0.5):
+            assert bus.timeout == 0.5
+        assert bus.timeout == 2
+        ctrl.close_connection()
+        assert ctrl.s.recorder.closed
+
+
+class TestReplayPort:
+    def test_replay(self, tmp_path):
+        path = tmp_path / "session.ellrec"
+        record_session(path)
+        replay = ReplayPort(path, speed=None)
+        with Controller(transport=replay, debug=False) as ctrl:
+            rotator = Rotator(ctrl)
+            rotator.home()
+            assert rotator.set_angle(90) == pytest.approx(90)
+        assert replay.finished
+
+    def test_recorded_speed(self, tmp_path):
+        frames = [Frame(0, TX, b"0gp"), Frame(100_000_000, RX, b"0PO00000000\r\n")]
+        for speed, delay in ((1.0, 0.1), (10.0, 0.01)):
+            ctrl = Controller(transport=ReplayPort(frames, speed=speed), debug=False)
+            sent = time.monotonic()
+            assert ctrl.send_instruction(b"gp", address="0") == ("0", "PO", 0)
+            assert time.monotonic() - sent == pytest.approx(delay, abs=0.05)
+
+    def test_mismatch(self):
+        frames = [Frame(0, TX, b"0gp"), Frame(1, RX, b"0PO00000000\r\n")]
+        with pytest.raises(ValueError):
+            ReplayPort(frames, speed=None).write(b"0gs")
+        # Not strict: the recorded responses are replayed regardless
+        ctrl = Controller(transport=ReplayPort(frames, speed=None, strict=False), debug=False)
+        assert ctrl.send_instruction(b"gs", address="0") == ("0", "PO", 0)
+        assert ctrl.s.finished
+        assert ctrl.send_instruction(b"gs", address="0") is None
+
+    def test_invalid_speed(self):
+        with pytest.raises(ValueError):
+            ReplayPort([], speed=0)
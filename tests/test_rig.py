@@ -0,0 +1,82 @@
+"""Tests for driving devices on several simulated buses with a Rig."""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Controller, Rig, Rotator, Shutter
+from elliptec.simulator import SimulatedDevice
+
+
+def make_controllers(count: int = 2, time_scale: float = 0.0) -> list[Controller]:
+    """Controllers for simulated buses, each with a rotator at address 0 and a shutter at address 1."""
+    controllers = []
+    for index in range(count):
+        devices = [SimulatedDevice(14, address="0", serial_no=f"1140000{index}", position=131072),
+                   SimulatedDevice(6, address="1", serial_no=f"1060000{index}")]
+        controllers.append(make_sim_controller(*devices, time_scale=time_scale, port=f"sim://{index}"))
+    return controllers
+
+
+class TestRig:
+    def test_from_controllers(self):
+        with Rig.from_controllers(make_controllers(), names={"11400001": "polarizer"}) as rig:
+            assert len(rig) == 4
+            assert list(rig.devices) == ["sim://0:0", "sim://0:1", "polarizer", "sim://1:1"]
+            assert isinstance(rig["sim://0:0"], Rotator)
+            assert isinstance(rig[("sim://1", "1")], Shutter)
+            assert rig["11400001"] is rig["polarizer"] is rig["sim://1:0"]
+            assert "polarizer" in rig and "nothing" not in rig
+            with pytest.raises(KeyError):
+                rig["nothing"]
+
+    def test_one_probe_per_bus(self):
+        controllers = make_controllers()
+        with Rig.from_controllers(controllers) as rig:
+            # The devices are created from the probed info, nothing is sent but the probe
+            assert [controller.s.bytes_written for controller in controllers] == [16 * 3, 16 * 3]
+            assert all(device.info_validated for device in rig.devices.values())
+            assert rig["sim://1:0"].serial_no == "11400001"
+
+    def test_duplicate_name(self):
+        controller = make_controllers(1)[0]
+        rig = Rig()
+        rig.add(Rotator(controller), "stage")
+        with pytest.raises(ValueError):
+            rig.add(Shutter(controller, address="1"), "stage")
+        rig.close()
+
+    def test_positions(self):
+        with Rig.from_controllers(make_controllers()) as rig:
+            rig["sim://1:0"].move("absolute", 1000)
+            positions = rig.positions()
+            assert positions == {"sim://0:0": ("0", "PO", 131072), "sim://0:1": ("1", "PO", 0),
+                                 "sim://1:0": ("0", "PO", 1000), "sim://1:1": ("1", "PO", 0)}
+            assert rig.positions(["sim://1:0"]) == {"sim://1:0": ("0", "PO", 1000)}
+
+    def test_home_buses_in_parallel(self):
+        with Rig.from_controllers(make_controllers(3, time_scale=1.0)) as rig:
+            start = time.monotonic()
+            responses = rig.home()
+            elapsed = time.monotonic() - start
+            assert all(status[1] == "PO" and status[2] == 0 for status in responses.values())
+        # Homing takes about 0.8 s on one bus, on one bus after another it would take three times as long
+        assert elapsed < 1.2
+
+    def test_run_on_workers(self):
+        with Rig.from_controllers(make_controllers()) as rig:
+            threads = rig.run(lambda device: threading.current_thread().name)
+            assert threads["sim://0:0"] == threads["sim://0:1"] != threads["sim://1:0"]
+            assert rig.submit("sim://1:1", lambda: threading.current_thread().name).result() == threads["sim://1:0"]
+
+    def test_stop_all(self):
+        with Rig.from_controllers(make_controllers(2, time_scale=1.0)) as rig:
+            homing = rig.submit("sim://0:0", rig.home)
+            time.sleep(0.1)
+            responses = rig.stop_all()
+            # Stopped on their way home
+            assert all(0 < status[2] < 131072 for status in homing.result().values() if status[0] == "0")
+            assert set(responses) == set(rig.devices)
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from unittest.mock import MagicMock, patch
 
-from conftest import make_info_response
+from conftest import make_info_response, make_sim_controller
 
 
 class TestFindPorts:
@@ -87,3 +87,127 @@ class TestScanForDevices:
 
         result = scan_for_devices(mock_ctrl, start_address=0, stop_address=2, debug=True)
         assert len(result) == 2
+
+
+class TestDiscovery:
+    @staticmethod
+    def simulated_ports(buses=None):
+        """Patches serial.Serial so that every port opens a different simulated bus."""
+        from elliptec.simulator import SimulatedBus, SimulatedDevice
+
+        if buses is None:
+            buses = {
+                "/dev/ttyUSB0": [SimulatedDevice(14, address="0", serial_no="11400001"),
+                                 SimulatedDevice(6, address="3", serial_no="10600001")],
+                "/dev/ttyUSB1": [SimulatedDevice(20, address="A", serial_no="12000001")],
+            }
+        else:
+            buses = {port: [SimulatedDevice(motor_type) for motor_type in types] for port, types in buses.items()}
+
+        def open_port(port, **kwargs):
+            return SimulatedBus(buses[port], time_scale=0, timeout=kwargs["timeout"], port=port)
+
+        return patch("elliptec.controller.serial.Serial", side_effect=open_port)
+
+    def test_probe_bus(self):
+        from elliptec.scan import probe_bus
+        from elliptec.simulator import SimulatedDevice
+
+        controller = make_sim_controller(SimulatedDevice(14, address="2"), SimulatedDevice(9, address="5"))
+        bus = controller.s
+        records = probe_bus(controller)
+        assert [(r.address, r.model) for r in records] == [("2", "ELL14"), ("5", "ELL9")]
+        # All probes went out in a single write and the timeout was restored
+        assert bus.bytes_written == 16 * 3
+        assert bus.timeout == 2
+
+    def test_probe_bus_in_real_time(self):
+        from elliptec.scan import probe_bus
+        from elliptec.simulator import SimulatedDevice
+
+        # The responses of a full bus take far longer to arrive than the probe timeout
+        for addresses in ("01234567", "89ABCDEF"):
+            devices = [SimulatedDevice(14, address=address) for address in addresses]
+            controller = make_sim_controller(*devices, time_scale=1.0)
+            records = probe_bus(controller)
+            assert [record.address for record in records] == list(addresses)
+
+    def test_discover_devices(self):
+        from elliptec.scan import discover_devices
+
+        with self.simulated_ports():
+            records = discover_devices(ports=["/dev/ttyUSB0", "/dev/ttyUSB1"])
+        assert [(r.port, r.address, r.motor_type, r.serial_no) for r in records] == [
+            ("/dev/ttyUSB0", "0", 14, "11400001"),
+            ("/dev/ttyUSB0", "3", 6, "10600001"),
+            ("/dev/ttyUSB1", "A", 20, "12000001"),
+        ]
+        assert records[0].firmware == "01"
+
+    def test_discover_devices_unavailable_port(self):
+        from elliptec.scan import discover_devices
+        import serial
+
+        with patch("elliptec.controller.serial.Serial", side_effect=serial.SerialException):
+            assert discover_devices(ports=["/dev/noexist"]) == []
+
+    def test_discover_devices_no_ports(self):
+        from elliptec.scan import discover_devices
+
+        with patch("elliptec.scan.listports.comports", return_value=[]):
+            assert discover_devices() == []
+
+
+class TestProbePorts:
+    @staticmethod
+    def usb_port(device: str, serial_number: str, vid: int = 0x0403, pid: int = 0x6015):
+        port = MagicMock()
+        port.device = device
+        port.serial_number = serial_number
+        port.vid = vid
+        port.pid = pid
+        return port
+
+    def test_filters_and_probes(self):
+        from elliptec.scan import clear_port_cache, probe_ports
+
+        clear_port_cache()
+        ports = [
+            self.usb_port("/dev/ttyUSB0", "DK0AHAJZ"),
+            self.usb_port("/dev/ttyUSB1", "A1B2C3", vid=0x2341, pid=0x0043),  # not an Elliptec board
+            self.usb_port("/dev/ttyUSB2", "DK0AHAK0"),  # Elliptec board without devices
+        ]
+        with patch("elliptec.scan.listports.comports", return_value=ports), \
+             TestDiscovery.simulated_ports(buses={"/dev/ttyUSB0": [14], "/dev/ttyUSB2": []}) as serial_cls:
+            result = probe_ports()
+        assert list(result) == ["/dev/ttyUSB0"]
+        assert result["/dev/ttyUSB0"][0].model == "ELL14"
+        assert sorted(call.args[0] for call in serial_cls.call_args_list) == ["/dev/ttyUSB0", "/dev/ttyUSB2"]
+
+    def test_devices_at_any_address(self):
+        from elliptec.scan import clear_port_cache, probe_ports
+
+        clear_port_cache()
+        ports = [self.usb_port("/dev/ttyUSB0", "DK0AHAJZ"), self.usb_port("/dev/ttyUSB1", "DK0AHAK0")]
+        with patch("elliptec.scan.listports.comports", return_value=ports), TestDiscovery.simulated_ports():
+            result = probe_ports()
+        assert [record.address for record in result["/dev/ttyUSB0"]] == ["0", "3"]
+        # The only device of the bus is not at address 0
+        assert [record.address for record in result["/dev/ttyUSB1"]] == ["A"]
+        clear_port_cache()
+
+    def test_cache_by_usb_serial_number(self):
+        from elliptec.scan import clear_port_cache, probe_ports
+
+        clear_port_cache()
+        with patch("elliptec.scan.listports.comports", return_value=[self.usb_port("/dev/ttyUSB0", "DK0AHAJZ")]), \
+             TestDiscovery.simulated_ports(buses={"/dev/ttyUSB0": [14]}):
+            probe_ports(use_cache=True)
+
+        # The board shows up under a different name and is not probed again
+        with patch("elliptec.scan.listports.comports", return_value=[self.usb_port("/dev/ttyUSB3", "DK0AHAJZ")]), \
+             patch("elliptec.controller.serial.Serial") as serial_cls:
+            result = probe_ports(use_cache=True)
+        serial_cls.assert_not_called()
+        assert result["/dev/ttyUSB3"][0].port == "/dev/ttyUSB3"
+        clear_port_cache()
@@ -0,0 +1,150 @@
+"""Tests for timed opening and closing of shutters, on the simulated bus in real time."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Shutter
+from elliptec.simulator import SimulatedBus, SimulatedDevice
+from elliptec.timing import SPIN_TIME, START_MARGIN, Exposure, ShutterTiming, byte_time, sleep_until
+
+
+# Tests that run in real time only check what holds on a busy machine as well
+REAL_TIME_TOLERANCE = 0.05
+
+
+class TickingClock:
+    """A clock that moves by a microsecond whenever it is read, and by the time slept on it."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        self.now += 1e-6
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_shutter(time_scale: float = 1.0) -> tuple[Shutter, SimulatedDevice]:
+    """A shutter on the simulated bus, with the simulated device."""
+    device = SimulatedDevice(6)
+    return Shutter(make_sim_controller(device, time_scale=time_scale)), device
+
+
+def make_clocked_shutter(open_latency: float = 0.2, close_latency: float = 0.15) -> tuple[Shutter, TickingClock, list]:
+    """A shutter with the given latencies, timed by a TickingClock, and the writes to its bus as (time, data)."""
+    shutter, _ = make_shutter(time_scale=0.0)
+    clock = TickingClock()
+    shutter.timing = ShutterTiming(0.2, clock=clock, sleep=clock.sleep)
+    shutter.timing.record("open", open_latency)
+    shutter.timing.record("close", close_latency)
+    writes = []
+    bus = shutter.controller.s
+    write = bus.write
+    bus.write = lambda data: writes.append((clock.now, data)) or write(data)
+    shutter.get_slot()
+    writes.clear()
+    return shutter, clock, writes
+
+
+def test_sleep_until():
+    clock = TickingClock()
+    deadline = clock.now + 0.5
+    sleep_until(deadline, clock, clock.sleep)
+    # Sleeps until shortly before the deadline, and spins for the rest
+    assert clock.sleeps == [pytest.approx(0.5 - SPIN_TIME, abs=1e-5)]
+    assert deadline <= clock.now < deadline + 1e-5
+
+
+def test_sleep_until_real_time():
+    deadline = time.monotonic() + 0.02
+    sleep_until(deadline)
+    assert 0 <= time.monotonic() - deadline < REAL_TIME_TOLERANCE
+
+
+def test_byte_time():
+    assert byte_time(None) == pytest.approx(10 / 9600)
+    assert byte_time(SimulatedBus(time_scale=0.5)) == pytest.approx(5 / 9600)
+
+
+class TestShutterTiming:
+    def test_latency(self):
+        timing = ShutterTiming(0.2, window=3)
+        assert timing.latency("open") == 0.2
+        for latency in (0.1, 0.3, 0.11, 0.12):
+            timing.record("open", latency)
+        assert timing.latency("open") == pytest.approx(0.12)
+        assert timing.jitter("open") > 0
+        assert timing.latency("close") == 0.2
+
+    def test_statistics(self):
+        timing = ShutterTiming(0.2)
+        assert timing.statistics() == {"count": 0}
+        timing.exposures += [Exposure(0.0, 1.0, 0.0, 1.01), Exposure(2.0, 1.0, 2.0, 2.99), Exposure(4.0, 1.0, None, 5.0)]
+        stats = timing.statistics()
+        assert stats["count"] == 2
+        assert stats["mean_error"] == pytest.approx(0.0)
+        assert stats["min_error"] == pytest.approx(-0.01)
+        assert stats["max_error"] == pytest.approx(0.01)
+
+
+class TestTimedShutter:
+    def test_open_at_deadline(self):
+        shutter, clock, writes = make_clocked_shutter(open_latency=0.2)
+        deadline = clock.now + 1.0
+        opened = shutter.open_at(deadline)
+        # The command was written the latency of opening ahead of the deadline
+        assert [data for _, data in writes] == [b"0fw"]
+        assert writes[0][0] == pytest.approx(deadline - 0.2, abs=1e-4)
+        assert opened == pytest.approx(writes[0][0], abs=1e-4)
+        assert shutter.is_open()
+
+    def test_expose(self):
+        shutter, clock, writes = make_clocked_shutter(open_latency=0.2, close_latency=0.15)
+        start = clock.now + 1.0
+        exposure = shutter.expose(0.3, start=start)
+        assert exposure.start == start
+        assert [data for _, data in writes] == [b"0fw", b"0bw"]
+        assert writes[0][0] == pytest.approx(start - 0.2, abs=1e-4)
+        assert writes[1][0] == pytest.approx(start + 0.3 - 0.15, abs=1e-4)
+        assert shutter.timing.exposures == [exposure]
+        assert shutter.timing.statistics()["count"] == 1
+        assert shutter.is_closed()
+
+    def test_expose_as_soon_as_possible(self):
+        shutter, clock, writes = make_clocked_shutter(open_latency=0.2)
+        before = clock.now
+        exposure = shutter.expose(0.3)
+        assert exposure.start == pytest.approx(before + 0.2 + START_MARGIN, abs=1e-4)
+        assert writes[0][0] == pytest.approx(before + START_MARGIN, abs=1e-4)
+
+    def test_calibrate(self):
+        shutter, _ = make_shutter()
+        latencies = shutter.calibrate_timing(cycles=2)
+        # The rated travel time, plus the command
+        assert latencies["open"] == pytest.approx(0.2 + 0.002 + 3 * 10 / 9600, abs=REAL_TIME_TOLERANCE)
+        assert latencies["close"] == pytest.approx(latencies["open"], abs=REAL_TIME_TOLERANCE)
+        assert len(shutter.timing.samples["open"]) == 2
+        assert shutter.is_closed()
+
+    def test_open_at_deadline_real_time(self):
+        shutter, device = make_shutter()
+        shutter.calibrate_timing(cycles=1)
+        deadline = time.monotonic() + 0.3
+        opened = shutter.open_at(deadline)
+        # The simulated shutter finished its move at the deadline, as estimated
+        assert device.busy_until == pytest.approx(deadline, abs=REAL_TIME_TOLERANCE)
+        assert opened == pytest.approx(device.busy_until, abs=REAL_TIME_TOLERANCE)
+        assert shutter.is_open()
+
+    def test_short_exposure_ends_late(self):
+        shutter, _ = make_shutter()
+        exposure = shutter.expose(0.01)
+        # The shutter only closes once it has opened
+        assert exposure.duration > shutter.timing.latency("close")
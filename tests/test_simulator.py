@@ -0,0 +1,113 @@
+"""Tests for the simulated Elliptec bus, used through a real Controller."""
+from __future__ import annotations
+
+import time
+
+from conftest import make_sim_controller
+from elliptec import Iris, Linear, Rotator, Shutter, Slider
+from elliptec.simulator import BYTE_TIME, SimulatedBus, SimulatedDevice
+
+
+class TestSimulatedProtocol:
+    def test_info(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, serial_no="11400123"))
+        info = ctrl.send_instruction(b"in", address="0")
+        assert info["Motor Type"] == 14
+        assert info["Serial No."] == "11400123"
+        assert info["Range"] == 360
+        assert info["Pulse/Rev"] == 143360
+
+    def test_missing_address_times_out(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"in", address="5") is None
+
+    def test_unknown_command(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"zz", address="0") == ("0", "GS", "3")
+
+    def test_jog_step_and_home_offset(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"sj", address="0", message=100) == ("0", "GS", "0")
+        assert ctrl.send_instruction(b"gj", address="0") == ("0", "GJ", 100)
+        assert ctrl.send_instruction(b"so", address="0", message=50) == ("0", "GS", "0")
+        assert ctrl.send_instruction(b"go", address="0") == ("0", "HO", 50)
+        assert ctrl.send_instruction(b"ho0", address="0") == ("0", "PO", 50)
+
+    def test_velocity(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"gv", address="0") == ("0", "GV", 100)
+        assert ctrl.send_instruction(b"sv", address="0", message="32") == ("0", "GS", "0")
+        assert ctrl.send_instruction(b"gv", address="0") == ("0", "GV", 50)
+
+    def test_motor_info(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"i1", address="0")["Loop"] == "1"
+
+    def test_change_address(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"ca", address="0", message="3") == ("3", "GS", "0")
+        assert ctrl.send_instruction(b"gs", address="3") == ("3", "GS", "0")
+
+    def test_out_of_range(self):
+        ctrl = make_sim_controller(SimulatedDevice(20))
+        assert ctrl.send_instruction(b"ma", address="0", message=-1) == ("0", "GS", "4")
+
+    def test_rotator_wraps(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        assert ctrl.send_instruction(b"mr", address="0", message=-1) == ("0", "PO", 143359)
+
+    def test_send_many_splits_frames(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, address="1"), SimulatedDevice(6, address="2"))
+        result = ctrl.send_many([("1", b"ma", 1000), ("2", b"fw", None), ("1", b"gp", None)])
+        assert result == [("1", "PO", 1000), ("2", "PO", 31), ("1", "PO", 1000)]
+
+
+class TestSimulatedDevices:
+    def test_rotator(self):
+        ro = Rotator(make_sim_controller(SimulatedDevice(14)))
+        assert ro.set_angle(90) == 90.0
+        assert ro.shift_angle(45) == 135.0
+        assert ro.get_angle() == 135.0
+
+    def test_linear(self):
+        ls = Linear(make_sim_controller(SimulatedDevice(20)))
+        assert ls.set_distance(30) == 30.0
+
+    def test_iris(self):
+        iris = Iris(make_sim_controller(SimulatedDevice(15)))
+        assert iris.set_aperture(5) == 5.0
+        assert iris.shift_aperture(1) == 6.0
+
+    def test_slider(self):
+        sl = Slider(make_sim_controller(SimulatedDevice(9)))
+        assert sl.set_slot(3) == 3
+        assert sl.jog("forward") == 4
+        assert sl.jog("forward") == 4
+
+    def test_shutter(self):
+        sh = Shutter(make_sim_controller(SimulatedDevice(6)))
+        assert sh.open() == 2
+        assert sh.is_open()
+        assert sh.close() == 1
+        assert sh.is_closed()
+
+
+class TestSimulatedTiming:
+    def test_wire_time(self):
+        ctrl = make_sim_controller(SimulatedDevice(14, processing_time=0), time_scale=1.0)
+        start = time.perf_counter()
+        ctrl.send_instruction(b"gs", address="0")
+        elapsed = time.perf_counter() - start
+        # 3 bytes out and 6 bytes back
+        assert elapsed >= 9 * BYTE_TIME
+
+    def test_move_duration_and_busy(self):
+        device = SimulatedDevice(14, processing_time=0)
+        bus = SimulatedBus([device], time_scale=1.0)
+        bus.write(b"0ma00008C00")  # a quarter turn
+        bus.write(b"0gs")
+        assert bus.read_until(b"\r\n") == b"0GS09\r\n"
+        start = time.perf_counter()
+        assert bus.read_until(b"\r\n") == b"0PO00008C00\r\n"
+        elapsed = time.perf_counter() - start
+        assert device.move_duration(0x8C00) - 0.01 <= elapsed < device.move_duration(0x8C00) + 0.25
@@ -0,0 +1,122 @@
+"""Tests for the client-side state cache of motors."""
+from __future__ import annotations
+
+from conftest import make_sim_controller
+from elliptec import Iris, Rotator, Shutter, StateCache
+from elliptec.simulator import SimulatedDevice
+from elliptec.tools import Reply
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStateCache:
+    def test_disabled_by_default(self):
+        state = StateCache()
+        state.update(Reply("0", "PO", 100))
+        assert state.get("PO") is None
+
+    def test_max_age(self):
+        clock = FakeClock()
+        state = StateCache(max_age=1.0, clock=clock)
+        state.update(Reply("0", "PO", 100))
+        clock.now = 0.5
+        assert state.get("PO") == ("0", "PO", 100)
+        clock.now = 1.5
+        assert state.get("PO") is None
+
+    def test_no_expiry(self):
+        clock = FakeClock()
+        state = StateCache(max_age=None, clock=clock)
+        state.update(Reply("0", "GJ", 10))
+        clock.now = 1e6
+        assert state.get("GJ") == ("0", "GJ", 10)
+
+    def test_error_invalidates_everything(self):
+        state = StateCache(max_age=None)
+        state.update(Reply("0", "PO", 100))
+        state.update(Reply("0", "HO", 5))
+        state.update(Reply("0", "GS", "0"))
+        assert state.get("PO") is not None
+        state.update(Reply("0", "GS", "4"))
+        assert state.entries == {}
+
+    def test_missing_response_invalidates_everything(self):
+        state = StateCache(max_age=None)
+        state.update(Reply("0", "PO", 100))
+        state.update(None)
+        assert state.get("PO") is None
+
+
+class TestMotorState:
+    def test_position_after_move(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        bus = ctrl.s
+        rotator = Rotator(ctrl, debug=False, state_max_age=None)
+        rotator.set_angle(45)
+        written = bus.bytes_written
+        assert rotator.get_angle() == 45
+        assert bus.bytes_written == written
+
+    def test_queries_device_by_default(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        bus = ctrl.s
+        rotator = Rotator(ctrl, debug=False)
+        rotator.set_angle(45)
+        written = bus.bytes_written
+        assert rotator.get_angle() == 45
+        assert bus.bytes_written > written
+
+    def test_set_values_are_cached(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        bus = ctrl.s
+        rotator = Rotator(ctrl, debug=False, state_max_age=None)
+        rotator.set_jog_step(5)
+        rotator.set_home_offset(10)
+        written = bus.bytes_written
+        assert rotator.get_jog_step() == rotator.pos_to_angle(rotator.angle_to_pos(5))
+        assert rotator.get_home_offset() == rotator.pos_to_angle(rotator.angle_to_pos(10))
+        assert bus.bytes_written == written
+
+    def test_failed_move_invalidates(self):
+        ctrl = make_sim_controller(SimulatedDevice(15))
+        bus = ctrl.s
+        iris = Iris(ctrl, debug=False, state_max_age=None)
+        assert iris.get_aperture() == 0
+        iris.move("absolute", -1)
+        assert iris.state.entries == {}
+
+    def test_shift_aperture_single_transaction(self):
+        ctrl = make_sim_controller(SimulatedDevice(15))
+        bus = ctrl.s
+        iris = Iris(ctrl, debug=False, state_max_age=None)
+        iris.set_aperture(5)
+        written = bus.bytes_written
+        assert iris.shift_aperture(1) == 6
+        # Only the move was sent
+        assert bus.bytes_written == written + 11
+
+    def test_shutter_is_open(self):
+        ctrl = make_sim_controller(SimulatedDevice(6))
+        bus = ctrl.s
+        shutter = Shutter(ctrl, debug=False, state_max_age=None)
+        shutter.open()
+        written = bus.bytes_written
+        assert shutter.is_open()
+        assert not shutter.is_closed()
+        assert bus.bytes_written == written
+
+    def test_background_move(self):
+        ctrl = make_sim_controller(SimulatedDevice(14))
+        bus = ctrl.s
+        rotator = Rotator(ctrl, debug=False, state_max_age=None)
+        rotator.get_angle()
+        handle = rotator.move("absolute", rotator.angle_to_pos(90), wait=False)
+        assert rotator.state.get("PO") is None
+        handle.wait()
+        assert rotator.state.get("PO") == handle.status
@@ -0,0 +1,244 @@
+"""Tests for sharing one Controller between threads, on the simulated bus."""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Priority, Rotator, Shutter, Trajectory
+from elliptec.scheduler import RequestQueue
+from elliptec.simulator import SimulatedDevice
+
+# Simulated time runs this much slower than real time
+TIME_SCALE = 0.05
+
+
+class TestRequestQueue:
+    def test_same_address_in_order(self):
+        queue = RequestQueue()
+        order = []
+        with queue.hold(["1"]):
+            threads = []
+            for index in range(3):
+                def request(index=index):
+                    with queue.hold(["1"]):
+                        order.append(index)
+                threads.append(threading.Thread(target=request))
+                threads[-1].start()
+                # Let each thread queue up before the next one
+                while queue.waiting("1") < index + 2:
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        assert order == [0, 1, 2]
+        assert queue.waiting("1") == 0
+
+    def test_different_addresses_at_once(self):
+        queue = RequestQueue()
+        entered = threading.Event()
+        with queue.hold(["1"]):
+            def request():
+                with queue.hold(["2"]):
+                    entered.set()
+            thread = threading.Thread(target=request)
+            thread.start()
+            assert entered.wait(1)
+        thread.join()
+
+    def test_several_addresses_wait_for_their_turn(self):
+        queue = RequestQueue()
+        order = []
+
+        def request(addresses: list[str], name: str) -> threading.Thread:
+            def hold():
+                with queue.hold(addresses):
+                    order.append(name)
+            thread = threading.Thread(target=hold)
+            thread.start()
+            return thread
+
+        with queue.hold(["1"]):
+            group = request(["1", "2"], "group")
+            while queue.waiting("2") < 1:
+                time.sleep(0.001)
+            # The group keeps its turn at address 2 while it waits for address 1
+            single = request(["2"], "single")
+            time.sleep(0.05)
+            order.append("first")
+        group.join()
+        single.join()
+        assert order == ["first", "group", "single"]
+
+    def test_reentrant(self):
+        queue = RequestQueue()
+        with queue.hold(["1", "2"]):
+            with queue.hold(["1"]):
+                assert queue.waiting("1") == 1
+        assert queue.waiting("1") == 0
+
+    def test_priorities(self):
+        queue = RequestQueue()
+        order = []
+        threads = []
+        with queue.hold(["1"]):
+            for priority in (Priority.BACKGROUND, Priority.USER, Priority.BACKGROUND, Priority.SAFETY):
+                def request(priority=priority):
+                    with queue.hold(["1"], priority):
+                        order.append(priority)
+                threads.append(threading.Thread(target=request))
+                threads[-1].start()
+                while queue.waiting("1") < len(threads) + 1:
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        assert order == [Priority.SAFETY, Priority.USER, Priority.BACKGROUND, Priority.BACKGROUND]
+
+    def test_hold_available(self):
+        queue = RequestQueue()
+        with queue.hold(["1"]):
+            result = []
+
+            def request():
+                with queue.hold_available(["1", "2"]) as hold:
+                    result.append(hold.addresses)
+                    result.append(queue.holder("2") == threading.get_ident())
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+            assert queue.holder("1") == threading.get_ident()
+        assert result == [["2"], True]
+        assert queue.holder("2") is None
+
+
+@pytest.mark.parametrize("reader_thread", [False, True])
+class TestSharedController:
+    def test_threads_driving_different_devices(self, reader_thread):
+        ctrl = make_sim_controller(*(SimulatedDevice(14, address=str(n)) for n in range(1, 5)), reader_thread=reader_thread, time_scale=TIME_SCALE)
+        rotators = [Rotator(ctrl, address=str(n)) for n in range(1, 5)]
+
+        def drive(rotator: Rotator) -> list:
+            results = []
+            for step in range(1, 6):
+                position = int(rotator.address) * 1000 + step
+                results.append(rotator.move("absolute", position) == (rotator.address, "PO", position))
+                results.append(rotator.get("position") == (rotator.address, "PO", position))
+            return results
+
+        with ThreadPoolExecutor(len(rotators)) as pool:
+            outcomes = list(pool.map(drive, rotators))
+        assert all(all(results) for results in outcomes)
+        ctrl.close_connection()
+
+    def test_threads_sharing_a_device(self, reader_thread):
+        ctrl = make_sim_controller(SimulatedDevice(14), reader_thread=reader_thread, time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl)
+
+        def poll(_) -> bool:
+            return all(rotator.get("status") == ("0", "GS", "0") for _ in range(10))
+
+        def move(_) -> bool:
+            return all(rotator.move("relative", 100) is not None for _ in range(5))
+
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(poll, n) for n in range(3)] + [pool.submit(move, None)]
+            assert all(future.result() for future in futures)
+        assert rotator.get("position") == ("0", "PO", 500)
+        ctrl.close_connection()
+
+    def test_query_timeout_while_another_thread_reads(self, reader_thread):
+        ctrl = make_sim_controller(SimulatedDevice(18, address="1"), reader_thread=reader_thread, time_scale=TIME_SCALE)
+        rotator = Rotator(ctrl, address="1")
+        with ThreadPoolExecutor(2) as pool:
+            move = pool.submit(rotator.move, "relative", 131072)
+            time.sleep(0.01)
+            # Nothing answers at address 2, which does not delay the move
+            start = time.monotonic()
+            assert pool.submit(ctrl.send_instruction, b"gs", "2", None, 0.05).result() is None
+            assert time.monotonic() - start < 0.5
+            assert move.result() == ("1", "PO", 131072)
+        assert ctrl.timeout == 2
+        ctrl.close_connection()
+
+
+def slow_rotator(address: str = "0") -> SimulatedDevice:
+    """A rotator taking 4 s for a full revolution, in real time."""
+    device = SimulatedDevice(14, address=address)
+    device.velocity = 5
+    return device
+
+
+class TestSafety:
+    def test_stop_interrupts_move_in_flight(self):
+        ctrl = make_sim_controller(slow_rotator(), time_scale=1.0)
+        rotator = Rotator(ctrl)
+        with ThreadPoolExecutor(1) as pool:
+            move = pool.submit(rotator.move, "relative", 131072)
+            time.sleep(0.1)
+            start = time.monotonic()
+            rotator.stop()
+            assert time.monotonic() - start < 0.1
+            status = move.result()
+        assert status[1] == "PO" and 0 < status[2] < 131072
+        # Nothing is left over for the next request
+        assert rotator.get("status") == ("0", "GS", "0")
+        ctrl.close_connection()
+
+    def test_shutter_close_jumps_queue(self):
+        ctrl = make_sim_controller(SimulatedDevice(6))
+        bus = ctrl.s
+        shutter = Shutter(ctrl)
+        written = []
+        write = bus.write
+        bus.write = lambda data: written.append(data) or write(data)
+
+        with ThreadPoolExecutor(4) as pool:
+            with ctrl.requests.hold(["0"]):
+                polls = [pool.submit(shutter._sample_position) for _ in range(2)]
+                moves = pool.submit(shutter.open)
+                while ctrl.requests.waiting("0") < 4:
+                    time.sleep(0.001)
+                close = pool.submit(shutter.close)
+                while ctrl.requests.waiting("0") < 5:
+                    time.sleep(0.001)
+            assert close.result() == 1
+            assert moves.result() == 2
+            assert all(poll.result()[1] == "PO" for poll in polls)
+        # Nothing was in flight, the close went first, then the move and the polls
+        assert written == [b"0bw", b"0fw", b"0gp", b"0gp"]
+        ctrl.close_connection()
+
+    def test_stop_all(self):
+        devices = [slow_rotator(address) for address in "123"]
+        ctrl = make_sim_controller(*devices, time_scale=1.0)
+        rotators = [Rotator(ctrl, address=address) for address in "123"]
+        with ThreadPoolExecutor(2) as pool:
+            # A move in flight, a move in the background and an idle motor
+            move = pool.submit(rotators[0].move, "relative", 131072)
+            handle = rotators[1].move("relative", 131072, wait=False)
+            time.sleep(0.1)
+            start = time.monotonic()
+            responses = ctrl.stop_all()
+            assert time.monotonic() - start < 0.2
+            assert list(responses) == ["1", "2", "3"]
+            assert move.result()[1] == "PO" and 0 < move.result()[2] < 131072
+        assert handle.done() and responses["2"] == handle.status and 0 < handle.status[2] < 131072
+        assert responses["1"] == ("1", "GS", "0")
+        assert responses["3"] == ("3", "GS", "0")
+        assert not any(ctrl.stop_requested(address) for address in "123")
+        ctrl.close_connection()
+
+    def test_stop_ends_trajectory(self):
+        ctrl = make_sim_controller(slow_rotator(), time_scale=1.0)
+        rotator = Rotator(ctrl)
+        trajectory = Trajectory(rotator, [1, 2, 3], [32768, 65536, 98304], extract=lambda status: status[2])
+        with ThreadPoolExecutor(1) as pool:
+            points = pool.submit(trajectory.run)
+            time.sleep(0.05)
+            rotator.stop()
+            points = points.result()
+        assert len(points) == 1 and 0 < points[0].reached < 32768
+        assert rotator.get("status") == ("0", "GS", "0")
+        ctrl.close_connection()
@@ -0,0 +1,102 @@
+"""Tests for the read timeouts derived from the instruction, distance and velocity of moves."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Controller, Rotator, Slider
+from elliptec.motor import MOVE_TIMEOUT_FACTOR, QUERY_TIMEOUT
+from elliptec.simulator import SimulatedBus, SimulatedDevice
+
+HALF_TURN = 131072  # ELL18 pulses
+
+
+def make_rotator(time_scale: float = 0.0, timeout: float = 2) -> Rotator:
+    """An ELL18 rotator on a simulated bus."""
+    return Rotator(make_sim_controller(SimulatedDevice(18), time_scale=time_scale, timeout=timeout))
+
+
+class TestVelocity:
+    def test_get_and_set(self):
+        rotator = make_rotator()
+        assert rotator.velocity is None
+        assert rotator.get_velocity() == 100
+        assert rotator.velocity == 100
+        assert rotator.set_velocity(60) == 60
+        assert rotator.velocity == 60
+        assert rotator.get_velocity() == 60
+
+    def test_invalid(self):
+        rotator = make_rotator()
+        with pytest.raises(ValueError):
+            rotator.set_velocity(0)
+        with pytest.raises(ValueError):
+            rotator.set_velocity(101)
+
+
+class TestTimeouts:
+    def test_queries_fail_fast(self):
+        rotator = make_rotator()
+        assert rotator.timeout_for(b"gs") == QUERY_TIMEOUT
+        assert rotator.timeout_for(b"us") is None
+
+    def test_moves_scale_with_distance_and_velocity(self):
+        rotator = make_rotator()
+        rotator.get_velocity()
+        full_turn = QUERY_TIMEOUT + MOVE_TIMEOUT_FACTOR * 1.5  # travel_time of the ELL18
+        assert rotator.timeout_for(b"ho0") == pytest.approx(full_turn)
+        assert rotator.timeout_for(b"mr", HALF_TURN) == pytest.approx(QUERY_TIMEOUT + MOVE_TIMEOUT_FACTOR * 0.75)
+        rotator.set_velocity(50)
+        assert rotator.timeout_for(b"mr", HALF_TURN) == pytest.approx(full_turn)
+
+    def test_absolute_moves_use_last_position(self):
+        rotator = make_rotator()
+        rotator.get_velocity()
+        assert rotator.timeout_for(b"ma", HALF_TURN) == pytest.approx(QUERY_TIMEOUT + MOVE_TIMEOUT_FACTOR * 1.5)
+        rotator.move("absolute", HALF_TURN)
+        assert rotator.timeout_for(b"ma", HALF_TURN + 100) < 2 * QUERY_TIMEOUT
+
+    def test_unknown_velocity_keeps_port_timeout(self):
+        rotator = make_rotator(timeout=5)
+        assert rotator.timeout_for(b"mr", 100) == 5
+
+    def test_slider(self):
+        slider = Slider(make_sim_controller(SimulatedDevice(9)))
+        assert slider.max_position == 96
+        assert slider.move_duration(32, velocity=100) == pytest.approx(0.2)
+
+    def test_dead_device_fails_fast(self):
+        ctrl = make_sim_controller(SimulatedDevice(18), time_scale=1.0)
+        bus = ctrl.s
+        rotator = Rotator(ctrl)
+        bus.devices.clear()
+        start = time.monotonic()
+        assert rotator.get("status") is None
+        assert time.monotonic() - start < 1
+        assert bus.timeout == 2
+
+    def test_long_move_not_cut_off(self):
+        # At half speed, a half turn takes 1.5 s, longer than the timeout of the port
+        rotator = make_rotator(time_scale=0.05, timeout=1.0)
+        rotator.set_velocity(50)
+        assert rotator.move("relative", HALF_TURN) == ("0", "PO", HALF_TURN)
+
+    def test_port_timeout_left_alone(self):
+        # Changing the timeout reconfigures a real port, each command keeps its own deadline instead
+        assignments = []
+
+        class Bus(SimulatedBus):
+            def __setattr__(self, name, value):
+                if name == "timeout":
+                    assignments.append(value)
+                super().__setattr__(name, value)
+
+        bus = Bus([SimulatedDevice(18)], time_scale=0.05, timeout=1.0)
+        rotator = Rotator(Controller(transport=bus, debug=False))
+        assignments.clear()
+        rotator.set_velocity(50)
+        assert rotator.get("position") == ("0", "PO", 0)
+        assert rotator.move("relative", HALF_TURN) == ("0", "PO", HALF_TURN)
+        assert assignments == []
@@ -0,0 +1,63 @@
+"""Tests for the trajectory executor, using the simulated bus."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import make_sim_controller
+from elliptec import Rotator, Slider
+from elliptec.simulator import SimulatedDevice
+
+
+class TestRotatorTrajectory:
+    def test_reaches_all_points(self):
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14)), debug=False)
+        visited = []
+        points = rotator.run_trajectory([0, 45, 90, 45.5], callback=lambda i, target, reached: visited.append(reached))
+        # Within the resolution of the rotator (the conversion to pulses truncates)
+        assert visited == pytest.approx([0.0, 45.0, 90.0, 45.5], abs=0.003)
+        assert [p.reached for p in points] == visited
+        assert [p.index for p in points] == [0, 1, 2, 3]
+        assert all(p.arrived >= p.sent for p in points)
+
+    def test_numpy_targets(self):
+        np = pytest.importorskip("numpy")
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14)), debug=False)
+        points = rotator.run_trajectory(np.linspace(0, 90, 7))
+        assert [p.reached for p in points] == pytest.approx([0.0, 15.0, 30.0, 45.0, 60.0, 75.0, 90.0], abs=0.003)
+        assert isinstance(points[0].target, float)
+
+    def test_overlap_moves_during_callback(self):
+        device = SimulatedDevice(14)
+        rotator = Rotator(make_sim_controller(device), debug=False)
+        positions = []
+        rotator.run_trajectory([10, 20, 30], callback=lambda i, t, r: positions.append(device.position), overlap=True)
+        # The move to the next point has already been sent when the callback runs
+        assert positions == [rotator._unit_to_pos(20), rotator._unit_to_pos(30), rotator._unit_to_pos(30)]
+
+    def test_no_overlap_waits_at_point(self):
+        device = SimulatedDevice(14)
+        rotator = Rotator(make_sim_controller(device), debug=False)
+        positions = []
+        rotator.run_trajectory([10, 20], callback=lambda i, t, r: positions.append(device.position))
+        assert positions == [rotator._unit_to_pos(10), rotator._unit_to_pos(20)]
+
+    def test_move_duration(self):
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14), time_scale=1.0), debug=False)
+        points = rotator.run_trajectory([0, 36])
+        assert points[1].move_duration > points[0].move_duration
+
+    def test_empty(self):
+        rotator = Rotator(make_sim_controller(SimulatedDevice(14)), debug=False)
+        assert rotator.run_trajectory([]) == []
+
+
+class TestSliderSequence:
+    def test_slots(self):
+        slider = Slider(make_sim_controller(SimulatedDevice(9)), debug=False)
+        points = slider.run_sequence([4, 1, 3])
+        assert [p.reached for p in points] == [4, 1, 3]
+
+    def test_invalid_slot(self):
+        slider = Slider(make_sim_controller(SimulatedDevice(9)), debug=False)
+        with pytest.raises(ValueError):
+            slider.run_sequence([1, 7])
@@ -1,7 +1,7 @@
 """Unit tests for elliptec that can run without hardware (CI-safe)."""
 import pytest
 
-from elliptec.tools import parse, s32, is_metric, is_null_or_empty, error_check, move_check
+from elliptec.tools import Reply, parse, parse_many, s32, is_metric, is_null_or_empty, error_check, move_check, status_address
 from elliptec.cmd import commands, get_, set_, mov_, do_
 from elliptec.devices import devices
 from elliptec.errcodes import error_codes
@@ -27,6 +27,16 @@ class TestS32:
         assert s32(0x80000000) == -2147483648
 
 
+# ── tools.status_address ───────────────────────────────────────────────────
+
+class TestStatusAddress:
+    def test_tuple(self):
+        assert status_address(("A", "PO", 0)) == "A"
+
+    def test_info_dict(self):
+        assert status_address({"Address": "3", "Motor Type": 14}) == "3"
+
+
 # ── tools.is_metric ────────────────────────────────────────────────────────
 
 class TestIsMetric:
@@ -128,6 +138,18 @@ class TestParse:
         assert result["Forward frequency"] == pytest.approx(14740000 / 0x0E14)
         assert result["Current"] == pytest.approx(int("074A", 16) / 1866)
 
+    def test_parse_reply_fields(self):
+        result = parse(b"3PO00000064\r\n", debug=False)
+        assert isinstance(result, Reply)
+        assert (result.address, result.code, result.value) == ("3", "PO", 100)
+
+    def test_parse_memoryview(self):
+        assert parse(memoryview(b"0PO00000064\r\n"), debug=False) == ("0", "PO", 100)
+
+    def test_parse_lowercase_code(self):
+        # Parsed like upper case, but the code is reported as received
+        assert parse(b"0po00000064\r\n", debug=False) == ("0", "po", 100)
+
     def test_parse_motor_info_i2(self):
         msg = b"0I211074A010001000E140E14\r\n"
         result = parse(msg, debug=False)
@@ -135,6 +157,29 @@ class TestParse:
         assert result["Address"] == "0"
 
 
+# ── tools.parse_many ───────────────────────────────────────────────────────
+
+class TestParseMany:
+    def test_multiple_frames(self):
+        statuses, remainder = parse_many(b"0GS00\r\n1PO00000064\r\n2IN0E1234567820230101016800008000\r\n", debug=False)
+        assert statuses[:2] == [("0", "GS", "0"), ("1", "PO", 100)]
+        assert statuses[2]["Address"] == "2"
+        assert remainder == b""
+
+    def test_incomplete_tail(self):
+        statuses, remainder = parse_many(bytearray(b"0GS00\r\n1PO0000"), debug=False)
+        assert statuses == [("0", "GS", "0")]
+        assert remainder == b"1PO0000"
+
+    def test_empty(self):
+        assert parse_many(b"", debug=False) == ([], b"")
+
+    def test_same_as_parse(self):
+        frames = [b"0PO00000064\r\n", b"AGS09\r\n", b"5HOFFFFFF9C\r\n", b"0ZZ12345\r\n"]
+        statuses, _ = parse_many(b"".join(frames), debug=False)
+        assert statuses == [parse(frame, debug=False) for frame in frames]
+
+
 # ── tools.error_check / move_check ─────────────────────────────────────────
 
 class TestErrorCheck: